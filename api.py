@@ -1,19 +1,43 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Body
+from fastapi import FastAPI, Depends, HTTPException, status, Body, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 import os
 import datetime
+import hashlib
+import json
+import threading
+import time
 from jose import JWTError, jwt
 
 # Import existing logic
 import auth
 import database
+import db_async
+import llm
+import prompts
+import pw_hash
+import retention
 import services
 import utils
 from constants import MAIN_CATEGORIES, SUBCATS_FOOD_CAFE
 
-app = FastAPI(title="Owners API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 워커 시작: DB 마이그레이션 + 보관 스케줄러 / 종료: 스케줄러, DB 스레드풀, 해시 풀 정리
+    database.init_db()
+    retention.start_scheduler()
+    app.state.db_initialized = True
+    yield
+    retention.stop_scheduler()
+    db_async.shutdown()
+    pw_hash.shutdown()
+
+app = FastAPI(title="Owners API", lifespan=lifespan)
 
 # CORS Setup (Allow Next.js frontend)
 app.add_middleware(
@@ -24,10 +48,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# DB 대기열이 가득 차면 스레드를 더 쌓지 않고 바로 503 (클라이언트가 재시도)
+@app.exception_handler(db_async.DBBusy)
+async def db_busy_handler(request: Request, exc: db_async.DBBusy):
+    return JSONResponse(status_code=503, content={"detail": "Server busy, retry shortly"},
+                        headers={"Retry-After": "1"})
+
+# 로그인이 몰려 비밀번호 해시 대기열이 가득 찬 경우도 같은 방식
+@app.exception_handler(pw_hash.HashBusy)
+async def hash_busy_handler(request: Request, exc: pw_hash.HashBusy):
+    return JSONResponse(status_code=503, content={"detail": "Too many sign-ins in progress, retry shortly"},
+                        headers={"Retry-After": "1"})
+
 # JWT Configuration
 SECRET_KEY = os.environ.get("SECRET_KEY", "supersecretkey")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 1 day
+TOKEN_CACHE_SIZE = int(os.environ.get("OWNERS_TOKEN_CACHE_SIZE", "4096"))  # 0 이면 캐시 끔
+# /api/metrics 를 볼 수 있는 사용자 (쉼표 구분). 프로세스 전체 값이라 일반 사용자에게는 숨김
+METRICS_USERS = {u.strip() for u in os.environ.get("OWNERS_METRICS_USERS", "admin").split(",") if u.strip()}
 
 # --- Models ---
 class LoginRequest(BaseModel):
@@ -55,15 +94,81 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user_name(token: str):
+class TokenCache:
+    """
+    검증된 토큰 -> claims (LRU). 같은 클라이언트가 폴링할 때마다 서명 검증/디코드를 다시 하지 않게.
+    항목은 토큰의 exp 까지만 유효 (만료된 토큰은 캐시에 있어도 401).
+    """
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            claims = self._data.get(token)
+            if claims is None:
+                self.misses += 1
+                return None
+            if claims["exp"] <= time.time():
+                del self._data[token]
+                self.misses += 1
+                return None
+            self._data.move_to_end(token)
+            self.hits += 1
+            return claims
+
+    def put(self, token: str, claims: Dict[str, Any]):
+        if self.maxsize <= 0 or not isinstance(claims.get("exp"), (int, float)):
+            return
+        with self._lock:
+            self._data[token] = claims
+            self._data.move_to_end(token)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0}
+
+_token_cache = TokenCache()
+
+def decode_token(token: str) -> Dict[str, Any]:
+    claims = _token_cache.get(token)
+    if claims is not None:
+        return claims
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return username
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
-        raise HTTPException(status_code=401, detail="Could not validate credentials")
+        raise HTTPException(status_code=401, detail="Could not validate credentials",
+                            headers={"WWW-Authenticate": "Bearer"})
+    if claims.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Invalid token", headers={"WWW-Authenticate": "Bearer"})
+    _token_cache.put(token, claims)
+    return claims
+
+def get_current_user_name(token: str):
+    return decode_token(token)["sub"]
+
+class UserContext:
+    """요청마다 한 번 만들어져 같은 요청의 의존성/핸들러가 공유 (FastAPI 의존성 캐시)"""
+    def __init__(self, username: str, claims: Dict[str, Any]):
+        self.username = username
+        self.claims = claims
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+async def current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+                       token: Optional[str] = Query(None, deprecated=True)) -> UserContext:
+    """Authorization: Bearer <token>. ?token= 은 예전 클라이언트 호환용"""
+    raw = credentials.credentials if credentials else token
+    if not raw:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    claims = decode_token(raw)
+    return UserContext(claims["sub"], claims)
 
 # --- Endpoints ---
 
@@ -72,9 +177,9 @@ def read_root():
     return {"status": "ok", "message": "Owners API is running"}
 
 @app.post("/api/auth/login", response_model=Token)
-def login(req: LoginRequest):
+async def login(req: LoginRequest):
     # 1. Verify credentials
-    if not auth.verify_user(req.username, req.password):
+    if not await auth.verify_user_async(req.username, req.password):
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     
     # 2. Generate Token
@@ -82,48 +187,61 @@ def login(req: LoginRequest):
     return {"access_token": access_token, "token_type": "bearer", "username": req.username}
 
 @app.post("/api/auth/signup", response_model=Token)
-def signup(req: LoginRequest):
+async def signup(req: LoginRequest):
     username = req.username.strip()
     if not username:
         raise HTTPException(status_code=400, detail="Username required")
     if len(req.password) < 4:
          raise HTTPException(status_code=400, detail="Password too short")
     
-    if auth.username_exists(username):
+    if await db_async.run(auth.username_exists, username):
         raise HTTPException(status_code=400, detail="Username already exists")
     
-    auth.create_user(username, req.password)
+    if not await auth.create_user_async(username, req.password):
+        raise HTTPException(status_code=400, detail="Username already exists")
     
     access_token = create_access_token(data={"sub": username})
     return {"access_token": access_token, "token_type": "bearer", "username": username}
 
+def pending_items(az_res: dict) -> List[dict]:
+    return [{"label": label, "done": False} for label, is_done, _ in az_res['items'] if not is_done]
+
+# 대시보드 응답 형식/계산(services.calc_az_progress)을 바꾸면 올릴 것 -> 기존 ETag 전부 무효
+DASHBOARD_ETAG_VERSION = "1"
+
+def dashboard_etag(username: str, version: str) -> str:
+    digest = hashlib.sha256(f"{DASHBOARD_ETAG_VERSION}:{username}:{version}".encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    # GET 의 If-None-Match 는 약한 비교 (W/ 접두사 무시)
+    return "*" in tags or etag in [t[2:] if t.startswith("W/") else t for t in tags]
+
 @app.get("/api/dashboard")
-def get_dashboard(token: str):
+async def get_dashboard(request: Request, response: Response, user: UserContext = Depends(current_user)):
     # 1. Auth check
-    username = get_current_user_name(token)
+    username = user.username
     
-    # 2. Get User's First Store (Simplification for MVP)
-    stores = database.get_user_stores(username)
-    if not stores:
+    # 2. User's first store + checklist in one read (no writes; polled by mobile/Next.js)
+    found = await db_async.get_dashboard_row(username)
+    if not found:
         return {"has_store": False}
-    
-    store_id = stores[0]["store_id"]
-    
-    # 3. Get Store Logic (Reusing services.py)
-    data = database.get_store_info(username, store_id)
-    if not data:
-        return {"has_store": False} # Should not happen if get_user_stores returned true
-        
-    database.refresh_checklist_from_store(username, store_id)
-    ck = database.get_checklist(store_id)
+    data, ck, version = found
+
+    # 3. Unchanged since the client's copy -> 304 without recomputing
+    etag = dashboard_etag(username, version)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
     
     az_res = services.calc_az_progress(data, ck)
     
     # 4. Filter items for frontend
-    items_out = []
-    for label, is_done, _ in az_res['items']:
-         if not is_done:
-             items_out.append({"label": label, "done": False})
+    items_out = pending_items(az_res)
     
     return {
         "has_store": True,
@@ -135,6 +253,141 @@ def get_dashboard(token: str):
         "items": items_out
     }
 
-# Initialization on start
-database.init_db()
-app.state.db_initialized = True
+@app.get("/api/stores/dashboard")
+async def get_stores_dashboard(store_id: Optional[List[int]] = Query(None), user: UserContext = Depends(current_user)):
+    """All of the user's stores (or ?store_id=1&store_id=2, own stores only) in one response"""
+    username = user.username
+    rows = await db_async.get_store_dashboards(username, store_id)
+
+    stores_out = []
+    for data, ck in rows:
+        az_res = services.calc_az_progress(data, ck)
+        stores_out.append({
+            "store_id": data["store_id"],
+            "store_name": data["store_name"],
+            "category": data["category"],
+            "score": services.calc_operating_score(data, ck),
+            "progress": az_res['progress'],
+            "done": az_res['done'],
+            "total": az_res['total'],
+            "items": pending_items(az_res),
+        })
+    return {"has_store": bool(stores_out), "stores": stores_out}
+
+# --- Content generation (SSE) ---
+# 프롬프트는 prompts.py (views.py 와 같음). 토큰이 오는 대로 보내고, 끝까지 받은 뒤에만
+# history / 체크리스트 / todo 를 기록한다 (Streamlit 화면에서 생성한 것과 같은 효과).
+#   data: {"delta": "..."}                     조각
+#   event: done  / data: {"text": "..."}       완료 (전체 문장)
+#   event: error / data: {"detail": "..."}     실패 (기록 안 함)
+class GenerateBase(BaseModel):
+    store_id: Optional[int] = None  # 없으면 첫 매장
+
+class PlaceDescRequest(GenerateBase):
+    phone: str = ""
+    hours: str = ""
+
+class ReviewReplyRequest(GenerateBase):
+    review: str
+    tone: str = prompts.REVIEW_TONES[0]
+    length: str = prompts.REVIEW_LENGTHS[1]
+    keywords: str = ""
+
+class InstaCaptionRequest(GenerateBase):
+    description: str
+
+class EventPlanRequest(GenerateBase):
+    goal: str = ""
+    theme: str = ""
+    period: str = ""
+
+async def load_store(user: UserContext, store_id: Optional[int]) -> dict:
+    if store_id is None:
+        stores = await db_async.get_user_stores(user.username)
+        if not stores:
+            raise HTTPException(status_code=404, detail="No store")
+        store_id = stores[0]["store_id"]
+    store = await db_async.get_store_info(user.username, store_id)
+    if not store:
+        raise HTTPException(status_code=404, detail="Store not found")
+    return dict(store)
+
+def sse(data: dict, event: Optional[str] = None) -> str:
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def stream_generation(user: UserContext, store: dict, prompt: str, feature: str, title: str, input_text: str,
+                      flags: dict, todo: Optional[tuple] = None) -> StreamingResponse:
+    if not llm.available():
+        raise HTTPException(status_code=503, detail="LLM is not configured")
+    username, store_id = user.username, store["store_id"]
+
+    async def events():
+        parts = []
+        try:
+            async for delta in llm.achat_stream(prompts.messages(prompt)):
+                parts.append(delta)
+                yield sse({"delta": delta})
+        except llm.LLMError as e:
+            yield sse({"detail": str(e), "rate_limited": isinstance(e, llm.LLMRateLimited)}, "error")
+            return
+        text = "".join(parts)
+        # 기록 + 체크리스트 + 할일을 트랜잭션 1개로 (중간에 끊겨도 일부만 남지 않게)
+        try:
+            await db_async.save_history_batch(username, store_id, feature, title, [(input_text, text)], todo, **flags)
+        except db_async.DBBusy:
+            yield sse({"detail": "Server busy, result not saved", "text": text, "retry_after": 1}, "error")
+            return
+        yield sse({"text": text}, "done")
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/api/generate/keywords")
+async def generate_keywords(req: GenerateBase, user: UserContext = Depends(current_user)):
+    s = await load_store(user, req.store_id)
+    cat = prompts.category_label(s)
+    prompt = prompts.place_keywords(s["store_name"], s["address"], cat, s["signature"])
+    return stream_generation(user, s, prompt, "PLACE", "플레이스 키워드",
+                             f'{s["store_name"]} / {cat} / {s["address"]} / {s["signature"]}', {"has_keywords": 1})
+
+@app.post("/api/generate/place-description")
+async def generate_place_description(req: PlaceDescRequest, user: UserContext = Depends(current_user)):
+    s = await load_store(user, req.store_id)
+    prompt = prompts.place_description(s["store_name"], prompts.category_label(s), s["address"], req.phone, req.hours,
+                                       s["strengths"], s["signature"], s["target"])
+    return stream_generation(user, s, prompt, "PLACE", "플레이스 상세설명", f"전화:{req.phone} / 시간:{req.hours}",
+                             {"has_place_desc": 1})
+
+@app.post("/api/generate/review-reply")
+async def generate_review_reply(req: ReviewReplyRequest, user: UserContext = Depends(current_user)):
+    if not req.review.strip():
+        raise HTTPException(status_code=400, detail="Review text required")
+    s = await load_store(user, req.store_id)
+    prompt = prompts.review_reply(s["store_name"], prompts.category_label(s), s["signature"], req.review,
+                                  req.tone, req.length, req.keywords)
+    return stream_generation(user, s, prompt, "REVIEW", "리뷰 답글", req.review,
+                             {"last_review_reply_at": database.now_iso()}, ("review", "리뷰 답글 생성"))
+
+@app.post("/api/generate/insta-caption")
+async def generate_insta_caption(req: InstaCaptionRequest, user: UserContext = Depends(current_user)):
+    s = await load_store(user, req.store_id)
+    prompt = prompts.insta_caption(s["store_name"], prompts.category_label(s), req.description, s["signature"], s["address"])
+    flags = {"last_insta_caption_at": database.now_iso(), "has_insta_url": 1 if (s["insta_url"] or "").strip() else 0}
+    return stream_generation(user, s, prompt, "INSTA", "인스타 캡션", req.description, flags, ("insta", "인스타 캡션 생성"))
+
+@app.post("/api/generate/event-plan")
+async def generate_event_plan(req: EventPlanRequest, user: UserContext = Depends(current_user)):
+    s = await load_store(user, req.store_id)
+    prompt = prompts.event_plan(s["store_name"], prompts.category_label(s), s["address"], s["signature"],
+                                s["strengths"], s["target"], req.goal, req.theme, req.period)
+    return stream_generation(user, s, prompt, "EVENT", "이벤트 기획", f"{req.goal} / {req.theme} / {req.period}",
+                             {"last_event_plan_at": database.now_iso()}, ("event", "이벤트 기획 생성"))
+
+@app.get("/api/metrics")
+def get_metrics(user: UserContext = Depends(current_user)):
+    if user.username not in METRICS_USERS:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    # 프로세스(워커)별 값. 워커가 여러 개면 요청마다 다른 워커가 응답할 수 있음
+    return {"pid": os.getpid(), "row_cache": database.cache_stats(), "db_async": db_async.stats(),
+            "token_cache": _token_cache.stats(), "pw_hash": pw_hash.stats(), "llm": llm.stats()}
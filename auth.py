@@ -1,98 +1,102 @@
-import sqlite3
-import os
-import hashlib
-import hmac
-import base64
-from database import DB_PATH
+from typing import Optional
 
+import db_async
+import pw_hash
+from database import get_db
+
+# 해시 계산은 pw_hash 의 프로세스 풀에서 (대기열이 가득 차면 pw_hash.HashBusy)
 def _is_hashed_password(stored: str) -> bool:
-    # base64(salt16 + dk32) 형태면 보통 64~80자 사이
-    if not stored or len(stored) < 40:
-        return False
-    try:
-        raw = base64.b64decode(stored.encode("utf-8"))
-        return len(raw) >= 48  # salt(16) + dk(32)
-    except Exception:
-        return False
+    return pw_hash.is_hash(stored)
 
 def hash_password(pw: str) -> str:
-    salt = os.urandom(16)
-    dk = hashlib.pbkdf2_hmac("sha256", pw.encode("utf-8"), salt, 120_000)
-    return base64.b64encode(salt + dk).decode("utf-8")
+    return pw_hash.run(pw_hash.make_hash, pw, pw_hash.ITERATIONS)
 
 def verify_password(pw: str, stored: str) -> bool:
-    raw = base64.b64decode(stored.encode("utf-8"))
-    salt, dk = raw[:16], raw[16:]
-    new_dk = hashlib.pbkdf2_hmac("sha256", pw.encode("utf-8"), salt, 120_000)
-    return hmac.compare_digest(dk, new_dk)
+    return pw_hash.run(pw_hash.check_hash, pw, stored)
+
+def get_password_hash(username: str) -> Optional[str]:
+    with get_db() as conn:
+        row = conn.execute("SELECT password FROM users WHERE username=?", (username, )).fetchone()
+    return (row[0] or "") if row else None
+
+def _set_password_hash(username: str, hashed: str):
+    with get_db() as conn:
+        conn.execute("UPDATE users SET password=? WHERE username=?", (hashed, username))
+
+def _insert_user(username: str, hashed: str) -> bool:
+    with get_db() as conn:
+        c = conn.execute("INSERT OR IGNORE INTO users (username, password) VALUES (?, ?)", (username, hashed))
+    return c.rowcount > 0
 
 def username_exists(username: str) -> bool:
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT username FROM users WHERE username=?", (username, ))
-    ok = c.fetchone() is not None
-    conn.close()
-    return ok
+    with get_db() as conn:
+        row = conn.execute("SELECT username FROM users WHERE username=?", (username, )).fetchone()
+    return row is not None
 
 def create_user(username: str, password: str) -> bool:
     if username_exists(username):
         return False
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO users (username, password) VALUES (?, ?)",
-              (username, hash_password(password)))
-    conn.commit()
-    conn.close()
-    return True
+    return _insert_user(username, hash_password(password))
 
 def verify_user(username: str, password: str) -> bool:
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT password FROM users WHERE username=?", (username, ))
-    row = c.fetchone()
+    stored = get_password_hash(username)
+    if stored is None:
+        return False
+    ok = verify_password(password, stored)
+    if ok and pw_hash.needs_rehash(stored):
+        # 예전 형식/반복 횟수 -> 현재 설정으로 다시 저장 (평문은 로그인 때만 알 수 있음)
+        _set_password_hash(username, hash_password(password))
+    return ok
 
-    if not row:
-        conn.close()
+# api.py 용: DB 는 db_async 스레드, 해시는 프로세스 풀에서 기다림 (어느 쪽도 이벤트 루프를 막지 않음)
+async def create_user_async(username: str, password: str) -> bool:
+    if await db_async.run(username_exists, username):
         return False
+    hashed = await pw_hash.run_async(pw_hash.make_hash, password, pw_hash.ITERATIONS)
+    return await db_async.run(_insert_user, username, hashed)
 
-    stored = row[0] or ""
-    return verify_password(password, stored)
+async def verify_user_async(username: str, password: str) -> bool:
+    stored = await db_async.run(get_password_hash, username)
+    if stored is None:
+        return False
+    ok = await pw_hash.run_async(pw_hash.check_hash, password, stored)
+    if ok and pw_hash.needs_rehash(stored):
+        hashed = await pw_hash.run_async(pw_hash.make_hash, password, pw_hash.ITERATIONS)
+        await db_async.run(_set_password_hash, username, hashed)
+    return ok
 
 def seed_admin():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-
-    c.execute("SELECT username, password FROM users WHERE username='admin'")
-    row = c.fetchone()
-    if not row:
-        c.execute("INSERT INTO users (username, password) VALUES (?, ?)",
-                  ("admin", hash_password("1234")))
-    else:
-        # 혹시 평문이면 자동 해시로 교체
-        stored = row[1] or ""
-        if not _is_hashed_password(stored):
-            c.execute("UPDATE users SET password=? WHERE username='admin'",
-                      (hash_password(stored or "1234"), ))
+    with get_db() as conn:
+        c = conn.cursor()
 
-    c.execute("SELECT store_id FROM stores WHERE username='admin'")
-    if not c.fetchone():
-        c.execute(
-            """
-            INSERT INTO stores (username, store_name, category, sub_category, address, target, signature, strengths, keywords, review_url, insta_url)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-            ("admin", "영일만", "음식점/카페", "한식", "서울 동작구 남부순환로271길 27",
-             "직장인 회식, 로컬 찐단골, 소주파", "자연산 막회, 과메기, 물회",
-             "가성비 최고, 웨이팅 맛집, 신선한 자연산, 노포 감성", "사당 맛집, 사당역 횟집, 사당 막회, 사당 과메기",
-             "https://new.smartplace.naver.com/bizes/place/8073311/reviews?bookingBusinessId=925655&menu=visitor",
-             "https://www.instagram.com"))
-        c.execute(
-            """
-            INSERT INTO stores (username, store_name, category, sub_category, address, target, signature, strengths, keywords, review_url, insta_url)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, ("admin", "두번째매장(샘플)", "음식점/카페", "카페/디저트", "서울 강남구 테헤란로 123",
-              "점심 직장인, 테이크아웃", "시그니처 커피, 샌드위치", "빠른 제공, 깔끔한 매장, 좌석 여유",
-              "강남 카페, 테헤란로 커피, 점심 맛집", "", "https://www.instagram.com"))
+        c.execute("SELECT username, password FROM users WHERE username='admin'")
+        row = c.fetchone()
+        if not row:
+            c.execute("INSERT INTO users (username, password) VALUES (?, ?)",
+                      ("admin", hash_password("1234")))
+        else:
+            # 혹시 평문이면 자동 해시로 교체
+            stored = row[1] or ""
+            if not _is_hashed_password(stored):
+                c.execute("UPDATE users SET password=? WHERE username='admin'",
+                          (hash_password(stored or "1234"), ))
 
-    conn.commit()
-    conn.close()
+        c.execute("SELECT store_id FROM stores WHERE username='admin'")
+        if not c.fetchone():
+            c.execute(
+                """
+                INSERT INTO stores (username, store_name, category, sub_category, address, target, signature, strengths, keywords, review_url, insta_url)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                ("admin", "영일만", "음식점/카페", "한식", "서울 동작구 남부순환로271길 27",
+                 "직장인 회식, 로컬 찐단골, 소주파", "자연산 막회, 과메기, 물회",
+                 "가성비 최고, 웨이팅 맛집, 신선한 자연산, 노포 감성", "사당 맛집, 사당역 횟집, 사당 막회, 사당 과메기",
+                 "https://new.smartplace.naver.com/bizes/place/8073311/reviews?bookingBusinessId=925655&menu=visitor",
+                 "https://www.instagram.com"))
+            c.execute(
+                """
+                INSERT INTO stores (username, store_name, category, sub_category, address, target, signature, strengths, keywords, review_url, insta_url)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, ("admin", "두번째매장(샘플)", "음식점/카페", "카페/디저트", "서울 강남구 테헤란로 123",
+                  "점심 직장인, 테이크아웃", "시그니처 커피, 샌드위치", "빠른 제공, 깔끔한 매장, 좌석 여유",
+                  "강남 카페, 테헤란로 커피, 점심 맛집", "", "https://www.instagram.com"))
@@ -0,0 +1,150 @@
+"""
+멀티 프로세스 동시성 벤치마크 (API 워커 N개 + Streamlit 1개 흉내).
+
+    python bench_db.py --writers 4 --readers 2 --seconds 5
+
+각 모드마다 임시 DB 를 만들고 프로세스별로 database.py 헬퍼를 그대로 호출한다.
+- writer i: 계정 bench{i} 로 save_history + set_review_sync_pending + update_checklist_flags 반복 (API 워커)
+- reader: writer 중 하나의 매장을 get_store_info + get_checklist + get_recent_history 반복 (대시보드 렌더)
+
+legacy = 예전 기본값 (rollback journal, synchronous=FULL, python 기본 5초 timeout)
+wal    = db_pool 기본값 (WAL, synchronous=NORMAL, busy_timeout=5000)
+shard  = wal + OWNERS_DB_SHARDS=user (계정별 파일, 쓰기 락도 계정별)
+(DB 자체를 재기 위해 row_cache 는 끈다: OWNERS_CACHE_SIZE=0)
+
+참고 측정치 (4 writers + 2 readers, 5초, 1 vCPU 컨테이너, history FTS 트리거 포함):
+
+    mode      write/s   read/s  read p50(ms)  read p99(ms)  locked errors
+    legacy        458      244           0.1         138.0              0
+    wal          1054     2288           0.2          12.5              0
+    shard        1785     1284           0.2          24.5              0
+
+legacy 에서는 읽기가 쓰기 락 뒤에서 기다린다. WAL 에서는 읽기가 쓰기를 기다리지 않고
+(p99 는 CPU 1개를 6개 프로세스가 나눠 쓰는 스케줄링 지연), 커밋마다 fsync 하지 않아
+쓰기 처리량도 높다. shard 는 서로 다른 계정의 쓰기가 락을 나눠 갖지 않아서 쓰기가
+더 늘어난다 (CPU 1개라 그만큼 읽기 몫이 줄어듦, 코어가 많으면 읽기도 유지됨).
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+MODES = {
+    "legacy": {
+        "OWNERS_DB_JOURNAL_MODE": "DELETE",
+        "OWNERS_DB_SYNCHRONOUS": "FULL",
+        "OWNERS_DB_BUSY_TIMEOUT_MS": "5000",
+        "OWNERS_DB_MMAP_SIZE": "0",
+        "OWNERS_DB_CACHE_SIZE_KB": "2000",
+        "OWNERS_CACHE_SIZE": "0",
+    },
+    "wal": {
+        "OWNERS_DB_JOURNAL_MODE": "WAL",
+        "OWNERS_DB_SYNCHRONOUS": "NORMAL",
+        "OWNERS_DB_BUSY_TIMEOUT_MS": "5000",
+        "OWNERS_DB_MMAP_SIZE": str(256 * 1024 * 1024),
+        "OWNERS_DB_CACHE_SIZE_KB": "16384",
+        "OWNERS_CACHE_SIZE": "0",
+    },
+}
+# wal + 사용자별 샤드 (프로세스마다 다른 사장님 계정, database.py 0. 저장소 라우팅)
+MODES["shard"] = dict(MODES["wal"], OWNERS_DB_SHARDS="user")
+
+
+def _setup(db_path: str, env: dict):
+    os.environ.update(env)
+    os.environ["OWNERS_DB_SHARD_DIR"] = os.path.join(os.path.dirname(db_path), "shards")
+    import database
+    database.DB_PATH = db_path
+    return database
+
+
+def _init(db_path: str, env: dict, users: int):
+    database = _setup(db_path, env)
+    database.init_db()
+    for i in range(users):
+        database.add_store(f"bench{i}", "벤치매장", "음식점/카페", "한식", "서울", "", "", "", "", "", "")
+
+
+def _worker(role: str, idx: int, db_path: str, env: dict, seconds: float, out):
+    database = _setup(db_path, env)
+    # writer i 는 계정 bench{i}, reader 는 writer 중 하나의 매장을 본다 (대시보드)
+    # 샤드 모드가 아니면 모든 계정이 같은 파일을 쓴다
+    user, store_id = f"bench{idx}", idx + 1
+    database.set_tenant(user)
+    ops, errors, lat = 0, 0, []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            if role == "writer":
+                database.save_history(user, store_id, "REVIEW", "리뷰 답글", "입력" * 50, "출력" * 200)
+                database.set_review_sync_pending(store_id)
+                database.update_checklist_flags(store_id, has_keywords=1)
+            else:
+                database.get_store_info(user, store_id)
+                database.get_checklist(store_id)
+                database.get_recent_history(user, store_id, None, "", 20)
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        lat.append(time.perf_counter() - t0)
+        ops += 1
+    out.put((role, ops, errors, lat))
+
+
+def run(mode: str, writers: int, readers: int, seconds: float) -> dict:
+    env = MODES[mode]
+    tmp = tempfile.mkdtemp(prefix=f"owners_bench_{mode}_")
+    db_path = os.path.join(tmp, "bench.db")
+
+    # 모드별 PRAGMA 가 섞이지 않도록 초기화/측정 모두 새 프로세스에서
+    ctx = mp.get_context("spawn")
+    init = ctx.Process(target=_init, args=(db_path, env, max(writers, 1)))
+    init.start()
+    init.join()
+
+    out = ctx.Queue()
+    jobs = [("writer", i) for i in range(writers)] + [("reader", i % max(writers, 1)) for i in range(readers)]
+    procs = [ctx.Process(target=_worker, args=(role, i, db_path, env, seconds, out)) for role, i in jobs]
+    for p in procs:
+        p.start()
+    results = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    w_ops = sum(r[1] for r in results if r[0] == "writer")
+    r_ops = sum(r[1] for r in results if r[0] == "reader")
+    errors = sum(r[2] for r in results)
+    r_lat = sorted(x for r in results if r[0] == "reader" for x in r[3])
+    p99 = r_lat[int(len(r_lat) * 0.99) - 1] * 1000 if r_lat else 0.0
+    return {
+        "mode": mode,
+        "write/s": w_ops / seconds,
+        "read/s": r_ops / seconds,
+        "read p50(ms)": statistics.median(r_lat) * 1000 if r_lat else 0.0,
+        "read p99(ms)": p99,
+        "locked errors": errors,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--writers", type=int, default=4)
+    ap.add_argument("--readers", type=int, default=2)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--mode", choices=list(MODES) + ["all"], default="all")
+    args = ap.parse_args()
+
+    modes = list(MODES) if args.mode == "all" else [args.mode]
+    print(f"{'mode':<8} {'write/s':>8} {'read/s':>8} {'read p50(ms)':>13} {'read p99(ms)':>13} {'locked errors':>14}")
+    for m in modes:
+        r = run(m, args.writers, args.readers, args.seconds)
+        print(f"{r['mode']:<8} {r['write/s']:>8.0f} {r['read/s']:>8.0f} {r['read p50(ms)']:>13.1f} {r['read p99(ms)']:>13.1f} {r['locked errors']:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+render_order 프롬프트 벤치마크: 거래처/링크 전부 넣기(before) vs order_match 후보만(after).
+
+    python bench_order.py                       # 목록 크기별 프롬프트 크기 + 후보 검색 시간
+    python bench_order.py --sizes 50 500 --live # + 실제 LLM 호출 지연 (OPENAI_API_KEY 필요, 비용 발생)
+
+가상의 매장 목록(거래처 = 목록 크기의 1/4, 각 취급품목 4개 / 링크 = 목록 크기)과
+주문 1건(5줄)으로 비교한다. 토큰 수는 tiktoken 이 있으면 o200k_base (gpt-4o 계열) 로 세고,
+없으면 UTF-8 바이트 / 3 으로 어림한다 (한글 위주 텍스트 기준).
+
+참고 측정치 (1 vCPU 컨테이너, tiktoken 없음 = 어림값, --live 없음):
+
+    items   before tok   after tok   retrieval ms
+       20         1315         498            0.3
+      200        10300        2154            1.9
+     2000       100930        2402           18.7
+    10000       505098        2388          111.5
+
+before 는 목록 크기에 비례해서 늘고 (2500개쯤에서 gpt-4o-mini 128k 컨텍스트를 넘음),
+after 는 주문 줄 수 x TOP_K (거래처/링크 각각) 로 묶여서 목록 크기와 무관하다. 후보 검색은 목록을 매번 색인하는
+비용이라 10000개에서도 LLM 왕복 (수 초) 에 비하면 무시할 만하다.
+"""
+import argparse
+import random
+import time
+
+import order_match
+import prompts
+
+ORDER_TEXT = "참이슬 3박스, 생연어 2kg, 대파 1단\n쿠팡에서 위생장갑 링크 찾아줘, 키친타올 2팩"
+
+_BASE = ["연어", "광어", "우럭", "참이슬", "카스", "대파", "양파", "마늘", "위생장갑", "키친타올", "종이컵",
+         "냅킨", "소고기", "돼지고기", "닭가슴살", "두부", "계란", "쌀", "식용유", "간장", "고추장", "된장",
+         "설탕", "소금", "밀가루", "새우", "오징어", "김", "단무지", "랩", "호일", "세제", "물티슈", "빨대"]
+_PREFIX = ["", "국산 ", "수입 ", "냉동 ", "생", "프리미엄 ", "업소용 ", "대용량 ", "유기농 ", "특대 "]
+
+
+def make_catalog(n: int, seed: int = 0):
+    rnd = random.Random(seed)
+
+    def name():
+        return rnd.choice(_PREFIX) + rnd.choice(_BASE) + f" {rnd.randint(1, 999)}"
+
+    suppliers = [{"name": f"거래처{i}", "items": ", ".join(name() for _ in range(4)), "phone": f"010-0000-{i:04d}"}
+                 for i in range(max(1, n // 4))]
+    links = [{"alias": name(), "mall_name": rnd.choice(["쿠팡", "네이버", "11번가"]),
+              "last_confirmed_price": rnd.randint(1000, 90000), "url": f"https://example.com/p/{i}"}
+             for i in range(n)]
+    return suppliers, links
+
+
+def _tokenizer():
+    try:
+        import tiktoken
+        enc = tiktoken.get_encoding("o200k_base")
+        return (lambda s: len(enc.encode(s))), "o200k_base"
+    except ImportError:
+        return (lambda s: len(s.encode("utf-8")) // 3), "approx (utf-8 bytes / 3)"
+
+
+def _live(prompt: str) -> float:
+    import llm
+    started = time.perf_counter()
+    llm.ask(prompt)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[20, 200, 2000, 10000])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--live", action="store_true", help="실제 LLM 호출 지연도 측정 (목록 크기별 before/after 1회씩)")
+    args = ap.parse_args()
+
+    count, tok_name = _tokenizer()
+    print(f"tokens: {tok_name}, TOP_K={order_match.TOP_K}, order lines={len(order_match.split_lines(ORDER_TEXT))}")
+    head = f"{'items':>7} {'before tok':>12} {'after tok':>11} {'retrieval ms':>14}"
+    print(head + (f" {'before llm ms':>14} {'after llm ms':>13}" if args.live else ""))
+    for n in args.sizes:
+        suppliers, links = make_catalog(n)
+        before = prompts.order_parse(ORDER_TEXT, suppliers, links)
+        took = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            cand_sups, cand_links = order_match.select_candidates(ORDER_TEXT, suppliers, links)
+            took.append((time.perf_counter() - started) * 1000)
+        after = prompts.order_parse(ORDER_TEXT, cand_sups, cand_links)
+        line = f"{n:>7} {count(before):>12} {count(after):>11} {min(took):>14.1f}"
+        if args.live:
+            line += f" {_live(before):>14.0f} {_live(after):>13.0f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+거래처 / 온라인 링크 일괄 등록 (엑셀 복사-붙여넣기, CSV, pandas DataFrame).
+
+    results = import_online_items(store_id, raw_text)      # "상품명 [탭] 쇼핑몰 [탭] 링크"
+    results = import_suppliers(store_id, df)               # DataFrame 도 가능
+
+파싱/정규화는 여기서, 중복 확인 + INSERT 는 database.bulk_add_* 에서 트랜잭션 1개로 처리한다.
+반환값은 입력 행마다 {"row", "status", "reason", ...필드} (status: added / duplicate / invalid).
+"""
+import csv
+import io
+from typing import Any, Dict, List, Sequence
+
+from database import bulk_add_online_items, bulk_add_suppliers
+
+# 컬럼 순서 + 헤더로 인식할 이름 (엑셀 첫 줄이 헤더여도 되고 없어도 됨)
+ONLINE_ITEM_COLUMNS = ["alias", "mall_name", "url"]
+SUPPLIER_COLUMNS = ["name", "phone", "items"]
+_HEADER_NAMES = {
+    "alias": {"alias", "상품명", "품목", "상품"},
+    "mall_name": {"mall_name", "mall", "쇼핑몰", "몰"},
+    "url": {"url", "링크", "주소", "link"},
+    "name": {"name", "거래처", "상호", "이름", "거래처명"},
+    "phone": {"phone", "전화", "전화번호", "연락처"},
+    "items": {"items", "취급품목", "품목", "취급 품목"},
+}
+
+
+def _clean(v: Any) -> str:
+    if v is None:
+        return ""
+    s = str(v)
+    if s.lower() == "nan":  # pandas 빈 칸
+        return ""
+    return s.replace("\u00a0", " ").strip().strip('"').strip()
+
+
+def _is_header(cells: Sequence[str], columns: List[str]) -> bool:
+    names = [_clean(c).lower() for c in cells[:len(columns)]]
+    return sum(1 for col, n in zip(columns, names) if n in _HEADER_NAMES[col]) >= 2
+
+
+def _rows_from_text(text: str, columns: List[str]):
+    text = text.replace("\r\n", "\n")
+    delimiter = "\t" if "\t" in text else ","
+    reader = csv.reader(io.StringIO(text), delimiter=delimiter)
+    for i, cells in enumerate(reader, start=1):
+        if not any(c.strip() for c in cells):
+            continue
+        if i == 1 and _is_header(cells, columns):
+            continue
+        # 마지막 컬럼(링크/품목)에 구분자가 섞여 있으면 다시 합친다
+        if len(cells) > len(columns):
+            sep = "," if delimiter == "," else " "
+            cells = cells[:len(columns) - 1] + [sep.join(cells[len(columns) - 1:])]
+        yield i, dict(zip(columns, cells))
+
+
+def _rows_from_frame(df, columns: List[str]):
+    # 헤더 이름으로 찾고, 못 찾으면 앞에서부터 순서대로
+    lookup = {}
+    for col in columns:
+        for c in df.columns:
+            if _clean(c).lower() in _HEADER_NAMES[col] and c not in lookup.values():
+                lookup[col] = c
+                break
+    if len(lookup) < 2:
+        lookup = dict(zip(columns, df.columns))
+    for i, rec in enumerate(df.to_dict("records"), start=2):  # 엑셀 기준 행 번호 (1행 = 헤더)
+        yield i, {col: rec.get(lookup[col]) if col in lookup else "" for col in columns}
+
+
+def parse_rows(data: Any, columns: List[str]):
+    """TSV/CSV 문자열 또는 DataFrame → (행번호, {컬럼: 값}) 목록"""
+    if data is None:
+        return []
+    if isinstance(data, str):
+        return list(_rows_from_text(data, columns))
+    if hasattr(data, "to_dict") and hasattr(data, "columns"):
+        return list(_rows_from_frame(data, columns))
+    raise TypeError(f"지원하지 않는 입력 형식: {type(data).__name__}")
+
+
+def _normalize_url(url: str) -> str:
+    url = "".join(url.split())
+    if url and "://" not in url:
+        url = "https://" + url.lstrip("/")
+    return url
+
+
+def _normalize_items(items: str) -> str:
+    out = []
+    for part in items.replace("\n", ",").replace("·", ",").split(","):
+        p = part.strip()
+        if p and p not in out:
+            out.append(p)
+    return ",".join(out)
+
+
+def _run(parsed, normalize, bulk_add, store_id: int) -> List[Dict[str, Any]]:
+    results, valid = [], []
+    for row_no, raw in parsed:
+        rec = {k: _clean(v) for k, v in raw.items()}
+        reason = normalize(rec)
+        res = {"row": row_no, "status": "invalid" if reason else "", "reason": reason or "", **rec}
+        results.append(res)
+        if not reason:
+            valid.append(res)
+    if valid:
+        for res, status in zip(valid, bulk_add(store_id, valid)):
+            res["status"] = status
+            if status == "duplicate":
+                res["reason"] = "이미 등록됨"
+    return results
+
+
+def _normalize_online_item(rec: Dict[str, str]):
+    rec["alias"] = " ".join(rec["alias"].split())
+    rec["url"] = _normalize_url(rec["url"])
+    if not rec["alias"]:
+        return "상품명 없음"
+    if not rec["url"]:
+        return "링크 없음"
+    return None
+
+
+def _normalize_supplier(rec: Dict[str, str]):
+    rec["name"] = " ".join(rec["name"].split())
+    rec["items"] = _normalize_items(rec["items"])
+    if not rec["name"]:
+        return "이름 없음"
+    if not rec["phone"]:
+        return "전화번호 없음"
+    return None
+
+
+def import_online_items(store_id: int, data: Any) -> List[Dict[str, Any]]:
+    return _run(parse_rows(data, ONLINE_ITEM_COLUMNS), _normalize_online_item, bulk_add_online_items, store_id)
+
+
+def import_suppliers(store_id: int, data: Any) -> List[Dict[str, Any]]:
+    return _run(parse_rows(data, SUPPLIER_COLUMNS), _normalize_supplier, bulk_add_suppliers, store_id)
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, int]:
+    out = {"added": 0, "duplicate": 0, "invalid": 0}
+    for r in results:
+        out[r["status"]] = out.get(r["status"], 0) + 1
+    return out
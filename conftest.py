@@ -0,0 +1,48 @@
+"""
+pytest 공통 fixture: 테스트마다 임시 폴더에 새 DB (단일 파일 / 샤드 모드).
+
+    python -m pytest -q
+"""
+import os
+
+# 해시 프로세스 풀 대신 호출한 스레드에서 바로 계산 (pw_hash 문서 참고)
+os.environ.setdefault("OWNERS_HASH_WORKERS", "0")
+os.environ.setdefault("OWNERS_PBKDF2_ITERATIONS", "1000")
+
+import pytest
+
+import database
+import db_pool
+import row_cache
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "owners.db"))
+    monkeypatch.setattr(database, "SHARD_MODE", "")
+    monkeypatch.setattr(database, "_shard_paths", {})
+    database.set_tenant(None)
+    database.init_db()
+    yield database
+    database.set_tenant(None)
+    row_cache.clear_all()
+    db_pool.close_all_pools()
+
+
+@pytest.fixture
+def sharded_db(tmp_path, monkeypatch):
+    """OWNERS_DB_SHARDS=4 와 같은 상태"""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "owners.db"))
+    monkeypatch.setattr(database, "SHARD_MODE", "4")
+    monkeypatch.setattr(database, "SHARD_DIR", str(tmp_path / "shards"))
+    monkeypatch.setattr(database, "_shard_paths", {})
+    database.set_tenant(None)
+    database.init_db()
+    yield database
+    database.set_tenant(None)
+    row_cache.clear_all()
+    db_pool.close_all_pools()
+
+
+def new_store(db, username: str = "kim", name: str = "테스트매장") -> int:
+    return db.add_store(username, name, "음식점/카페", "한식", "서울", "", "연어덮밥", "", "", "", "")
@@ -1,647 +1,798 @@
+import logging
+import os
 import sqlite3
-import streamlit as st
-from datetime import datetime
-from typing import Optional, Dict, List, Any
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List, Any, Iterator, Tuple
 import secrets
 
-DB_PATH = "owners_v9.db"
+import db_pool
+import history_blobs
+import migrations
+import row_cache
+from url_canon import canonical_url, online_item_key
 
-def now_iso():
-    return datetime.now().isoformat()
+log = logging.getLogger(__name__)
 
-def has_column(conn, table: str, column: str) -> bool:
-    cur = conn.cursor()
-    cur.execute(f"PRAGMA table_info({table})")
-    cols = [r[1] for r in cur.fetchall()]
-    return column in cols
-
-def fix_database_schema():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+DB_PATH = "owners_v9.db"
 
+# 0. 저장소 라우팅 (샤드)
+# users / app_state / stores 는 항상 DB_PATH (메인 DB, store_id 도 여기서 발급).
+# 매장 데이터(체크리스트, 히스토리, 거래처, 링크, 할일)는 샤드 모드면 사용자별 파일로 나뉘어서
+# 서로 다른 사장님의 쓰기가 같은 쓰기 락을 기다리지 않는다.
+#   OWNERS_DB_SHARDS      ""(기본) = 단일 파일 / "user" = 사용자별 파일 / 숫자 N = 해시 버킷 N개
+#   OWNERS_DB_SHARD_DIR   샤드 파일 폴더 (기본 owners_shards)
+#   OWNERS_DB_SHARD_POOL  샤드 1개당 커넥션 풀 크기 (기본 2, 파일이 많아서 작게)
+SHARD_MODE = os.environ.get("OWNERS_DB_SHARDS", "").strip().lower()
+SHARD_DIR = os.environ.get("OWNERS_DB_SHARD_DIR", "owners_shards")
+SHARD_POOL_SIZE = int(os.environ.get("OWNERS_DB_SHARD_POOL", "2"))
+
+_tenant: ContextVar[Optional[str]] = ContextVar("owners_tenant", default=None)
+_shard_paths: Dict[str, str] = {}
+
+def sharding_enabled() -> bool:
+    return SHARD_MODE not in ("", "0", "off")
+
+def shard_name(username: str) -> str:
+    h = zlib.crc32(username.encode("utf-8"))
+    if SHARD_MODE == "user":
+        safe = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in username)[:40]
+        return f"u_{safe}_{h:08x}.db"
+    return f"b{h % int(SHARD_MODE):03d}.db"
+
+def tenant_path(username: Optional[str] = None) -> str:
+    """매장 데이터가 들어 있는 DB 파일 (username 이 없으면 현재 tenant)"""
+    if not sharding_enabled():
+        return DB_PATH
+    username = username or _tenant.get()
+    if not username:
+        raise RuntimeError("샤드 모드: tenant(username) 또는 set_tenant() 안에서 호출해야 합니다")
+    path = _shard_paths.get(username)
+    if path is None:
+        os.makedirs(SHARD_DIR, exist_ok=True)
+        path = os.path.join(SHARD_DIR, shard_name(username))
+        migrations.ensure_schema(path)
+        _shard_paths[username] = path
+    return path
+
+def set_tenant(username: Optional[str]):
+    """현재 실행 흐름(Streamlit 스크립트 실행 1번 등)의 사용자 지정"""
+    _tenant.set(username)
+
+@contextmanager
+def tenant(username: str):
+    token = _tenant.set(username)
     try:
-        # 1. 'online_items' 테이블 확인
-        c.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name='online_items'"
-        )
-        if c.fetchone():
-            c.execute("PRAGMA table_info(online_items)")
-            columns = [info[1] for info in c.fetchall()]
-
-            # 2. 날짜 칸 없으면 추가
-            if 'last_updated' not in columns:
-                c.execute(
-                    "ALTER TABLE online_items ADD COLUMN last_updated TEXT")
-                now_str = datetime.now().isoformat()
-                c.execute(
-                    "UPDATE online_items SET last_updated = ? WHERE last_updated IS NULL",
-                    (now_str, ))
-                st.toast("✅ 장부 업데이트: 날짜 기능 추가")
-
-            # 3. [NEW] '고정(is_fixed)' 칸 없으면 추가
-            if 'is_fixed' not in columns:
-                try:
-                    c.execute("ALTER TABLE online_items ADD COLUMN is_fixed INTEGER DEFAULT 0")
-                    c.execute("UPDATE online_items SET is_fixed = 0 WHERE is_fixed IS NULL")
-                    conn.commit()
-                except sqlite3.OperationalError: pass
-
-                # 4. [NEW] 가격 스캔(B안) 컬럼들 추가
-                if 'price_sync_at' not in columns:
-                    try:
-                        c.execute("ALTER TABLE online_items ADD COLUMN price_sync_at TEXT")
-                        conn.commit()
-                    except sqlite3.OperationalError: pass
-
-                if 'price_sync_status' not in columns:
-                    try:
-                        c.execute("ALTER TABLE online_items ADD COLUMN price_sync_status TEXT")
-                        conn.commit()
-                    except sqlite3.OperationalError: pass
-
-                if 'price_sync_nonce' not in columns:
-                    try:
-                        c.execute("ALTER TABLE online_items ADD COLUMN price_sync_nonce TEXT")
-                        c.execute("UPDATE online_items SET price_sync_nonce = NULL WHERE price_sync_nonce IS NULL")
-                        conn.commit()
-                    except sqlite3.OperationalError: pass
-
-                if 'last_confirmed_at' not in columns:
-                    try:
-                        c.execute("ALTER TABLE online_items ADD COLUMN last_confirmed_at TEXT")
-                        c.execute("UPDATE online_items SET last_confirmed_at = NULL WHERE last_confirmed_at IS NULL")
-                        conn.commit()
-                    except sqlite3.OperationalError: pass
-
-                if 'last_confirmed_price' not in columns:
-                    try:
-                        c.execute("ALTER TABLE online_items ADD COLUMN last_confirmed_price INTEGER")
-                        c.execute("UPDATE online_items SET last_confirmed_price = NULL WHERE last_confirmed_price IS NULL")
-                        conn.commit()
-                    except sqlite3.OperationalError: pass
-
-                if 'last_confirmed_title' not in columns:
-                    try:
-                        c.execute("ALTER TABLE online_items ADD COLUMN last_confirmed_title TEXT")
-                        c.execute("UPDATE online_items SET last_confirmed_title = NULL WHERE last_confirmed_title IS NULL")
-                        conn.commit()
-                    except sqlite3.OperationalError: pass
-
-                if 'last_confirmed_url' not in columns:
-                    try:
-                        c.execute("ALTER TABLE online_items ADD COLUMN last_confirmed_url TEXT")
-                        c.execute("UPDATE online_items SET last_confirmed_url = NULL WHERE last_confirmed_url IS NULL")
-                        conn.commit()
-                    except sqlite3.OperationalError: pass
-
-                if 'last_opened_at' not in columns:
-                    try:
-                        c.execute("ALTER TABLE online_items ADD COLUMN last_opened_at TEXT")
-                        c.execute("UPDATE online_items SET last_opened_at = NULL WHERE last_opened_at IS NULL")
-                        conn.commit()
-                    except sqlite3.OperationalError: pass
-
-    except Exception as e:
-        print(f"DB 수리 중 경고: {e}")
+        yield
     finally:
-        conn.close()
-
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            username TEXT PRIMARY KEY,
-            password TEXT
-        )
-    """)
-
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS stores (
-            store_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT,
-            store_name TEXT,
-            category TEXT,
-            sub_category TEXT,
-            address TEXT,
-            target TEXT,
-            signature TEXT,
-            strengths TEXT,
-            keywords TEXT,
-            review_url TEXT,
-            insta_url TEXT,
-            FOREIGN KEY(username) REFERENCES users(username)
-        )
-    """)
-
-    # 테이블 구조 보정 (sub_category 없으면 추가)
-    if not has_column(conn, "stores", "sub_category"):
-        c.execute("ALTER TABLE stores ADD COLUMN sub_category TEXT")
-
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT,
-            store_id INTEGER,
-            feature TEXT,
-            title TEXT,
-            input_text TEXT,
-            output_text TEXT,
-            created_at TEXT
-        )
-    """)
-
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS store_checklist (
-            store_id INTEGER PRIMARY KEY,
-            has_keywords INTEGER DEFAULT 0,
-            has_review_url INTEGER DEFAULT 0,
-            has_insta_url INTEGER DEFAULT 0,
-            has_place_desc INTEGER DEFAULT 0,
-            has_menu_guide INTEGER DEFAULT 0,
-            has_way_guide INTEGER DEFAULT 0,
-            has_parking_guide INTEGER DEFAULT 0,
-            has_hours INTEGER DEFAULT 0,
-            has_phone INTEGER DEFAULT 0,
-            has_address INTEGER DEFAULT 0,
-            has_news INTEGER DEFAULT 0,
-            last_review_reply_at TEXT,
-            last_insta_caption_at TEXT,
-            last_blog_post_at TEXT,
-            last_event_plan_at TEXT,
-            last_place_qa_at TEXT
-        )
-    """)
-
-    # 🔥 [핵심] 여기서 누락된 컬럼들을 강제로 추가합니다!
-    if not has_column(conn, "store_checklist", "review_sync_at"):
-        c.execute("ALTER TABLE store_checklist ADD COLUMN review_sync_at TEXT")
-
-    if not has_column(conn, "store_checklist", "review_unreplied_count"):
-        c.execute(
-            "ALTER TABLE store_checklist ADD COLUMN review_unreplied_count INTEGER DEFAULT -1"
-        )
+        _tenant.reset(token)
+
+def get_db():
+    """메인 DB 커넥션 (with get_db() as conn: ...) - 블록 종료 시 commit"""
+    return db_pool.connection(DB_PATH)
+
+def get_tenant_db(username: Optional[str] = None):
+    """매장 데이터 커넥션. 단일 파일 모드에서는 get_db() 와 같은 커넥션"""
+    path = tenant_path(username)
+    return db_pool.connection(path, SHARD_POOL_SIZE if path != DB_PATH else None)
+
+def iter_shard_paths() -> Iterator[str]:
+    if not sharding_enabled():
+        yield DB_PATH
+        return
+    if not os.path.isdir(SHARD_DIR):
+        return
+    for fn in sorted(os.listdir(SHARD_DIR)):
+        if fn.endswith(".db"):
+            yield os.path.join(SHARD_DIR, fn)
+
+def iter_all_shards(sql: str, params=()) -> Iterator[sqlite3.Row]:
+    """
+    관리자/전체 통계용: 모든 샤드에 같은 SELECT 를 실행해서 행을 이어서 돌려준다.
+    샤드마다 커넥션을 바로 반납하도록 샤드 단위로 fetchall 한다.
+    """
+    for path in iter_shard_paths():
+        migrations.ensure_schema(path)
+        with db_pool.connection(path, SHARD_POOL_SIZE if path != DB_PATH else None) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        yield from rows
+
+def fleet_table_counts() -> Dict[str, int]:
+    """전체 샤드 합계 행 수 (관리자 화면/모니터링용)"""
+    out: Dict[str, int] = {}
+    for table in ("store_checklist", "history", "todo_events", "suppliers", "online_items"):
+        out[table] = sum(r[0] for r in iter_all_shards(f"SELECT COUNT(*) FROM {table}"))
+    return out
+
+# 1. 조회 캐시 (row_cache.py, LRU + TTL)
+# 키에 DB_PATH 를 넣어서 다른 DB 파일(점검/벤치용 임시 DB)과 섞이지 않게 한다.
+# writer 는 트랜잭션이 끝난 직후(db_pool.after_transaction) 자기가 바꾼 키만 지운다.
+_store_cache = row_cache.cache("stores")            # store_id -> stores 행
+_user_stores_cache = row_cache.cache("user_stores")  # username -> [(store_id, store_name)]
+_checklist_cache = row_cache.cache("checklist")      # store_id -> 체크리스트 dict
+_supplier_cache = row_cache.cache("suppliers")       # store_id -> 거래처 목록
+_online_cache = row_cache.cache("online_items")      # (store_id, order) -> 링크 목록
+_price_cache = row_cache.cache("price_stats")        # store_id -> {item_id: 기간별 가격 통계}
+
+def _cached(cache: row_cache.RowCache, path: str, key, loader):
+    # 쓰기 트랜잭션 안에서는 캐시를 거치지 않음 (방금 쓴 값을 읽어야 하고, 커밋 전 값을 남기면 안 됨)
+    if db_pool.in_transaction(path):
+        return loader()
+    return cache.get_or_load((DB_PATH, key), loader)
+
+def _invalidate(cache: row_cache.RowCache, path: str, *keys):
+    db_pool.after_transaction(path, lambda: [cache.invalidate((DB_PATH, k)) for k in keys])
+
+def _invalidate_online_items(store_id: int):
+    _invalidate(_online_cache, tenant_path(), *[(store_id, o) for o in (None, *ONLINE_ITEM_ORDERS)])
+
+def _store_id_of(conn, table: str, row_id: int) -> Optional[int]:
+    row = conn.execute(f"SELECT store_id FROM {table} WHERE id=?", (row_id, )).fetchone()
+    return row[0] if row else None
 
-    if not has_column(conn, "store_checklist", "review_sync_status"):
-        try:
-            c.execute("ALTER TABLE store_checklist ADD COLUMN review_sync_status TEXT")
-            conn.commit()
-        except sqlite3.OperationalError: pass
-
-    if not has_column(conn, "store_checklist", "review_sync_nonce"):
-        try:
-            c.execute("ALTER TABLE store_checklist ADD COLUMN review_sync_nonce TEXT")
-            conn.commit()
-        except sqlite3.OperationalError: pass
-
-    # [NEW] 광고/소식 주기 관리용
-    if not has_column(conn, "store_checklist", "last_ad_analysis_at"):
-        try:
-            c.execute("ALTER TABLE store_checklist ADD COLUMN last_ad_analysis_at TEXT")
-            conn.commit()
-        except sqlite3.OperationalError: pass
-    
-    if not has_column(conn, "store_checklist", "last_place_news_at"):
-        try:
-            c.execute("ALTER TABLE store_checklist ADD COLUMN last_place_news_at TEXT")
-            conn.commit()
-        except sqlite3.OperationalError: pass
-
-    if not has_column(conn, "store_checklist", "has_menu_guide"):
-        try:
-            c.execute("ALTER TABLE store_checklist ADD COLUMN has_menu_guide INTEGER DEFAULT 0")
-            conn.commit()
-        except sqlite3.OperationalError: pass
-
-    # [NEW] 비즈니스 감사 항목 (영업시간, 전화번호, 주소, 소식)
-    for col in ["has_hours", "has_phone", "has_address", "has_news"]:
-        if not has_column(conn, "store_checklist", col):
-            try:
-                c.execute(f"ALTER TABLE store_checklist ADD COLUMN {col} INTEGER DEFAULT 0")
-                conn.commit()
-            except sqlite3.OperationalError: pass
-
-    # [NEW] 상세 점검 결과 데이터 (JSON 저장용)
-    if not has_column(conn, "store_checklist", "audit_json"):
-        try:
-            c.execute("ALTER TABLE store_checklist ADD COLUMN audit_json TEXT")
-            conn.commit()
-        except sqlite3.OperationalError: pass
-
-    # [NEW] 스캔 시점 기록용 (최초 스캔 여부 판단)
-    if not has_column(conn, "store_checklist", "last_scout_at"):
-        try:
-            c.execute("ALTER TABLE store_checklist ADD COLUMN last_scout_at TEXT")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass # Already exists
-
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS favorites (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT,
-            store_id INTEGER,
-            group_name TEXT,
-            title TEXT,
-            content TEXT,
-            created_at TEXT
-        )
-    """)
-
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS todo_events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT,
-            store_id INTEGER,
-            todo_group TEXT,
-            todo_text TEXT,
-            status TEXT,      -- DONE / SKIP
-            created_at TEXT
-        )
-    """)
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return row_cache.stats()
 
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS app_state (
-            k TEXT PRIMARY KEY,
-            v TEXT
-        )
-    """)
-
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS suppliers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            store_id INTEGER,
-            name TEXT,
-            phone TEXT,
-            items TEXT,
-            created_at TEXT
-        )
-    """)
-
-    # [기존 suppliers 테이블 생성 코드 아래에 추가]
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS online_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            store_id INTEGER,
-            alias TEXT,       -- 예: 칵테일새우
-            mall_name TEXT,   -- 예: 쿠팡, 배민상회
-            url TEXT,         -- 상품 링크
-            memo TEXT,        -- 예: 2만원 이하면 사기
-            created_at TEXT
-        )
-    """)
+def now_iso():
+    return datetime.now().isoformat()
 
-    conn.commit()
-    conn.close()
+def init_db():
+    """스키마를 최신 버전으로 (프로세스당 1회, 이후 호출은 비용 없음)"""
+    migrations.ensure_schema(DB_PATH)
 
 def set_app_state(key: str, value: str):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(
-        "INSERT INTO app_state (k, v) VALUES (?, ?) ON CONFLICT(k) DO UPDATE SET v=excluded.v",
-        (key, value))
-    conn.commit()
-    conn.close()
+    with get_db() as conn:
+        conn.execute(
+            "INSERT INTO app_state (k, v) VALUES (?, ?) ON CONFLICT(k) DO UPDATE SET v=excluded.v",
+            (key, value))
 
 def get_app_state(key: str):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT v FROM app_state WHERE k=?", (key, ))
-    row = c.fetchone()
-    conn.close()
+    with get_db() as conn:
+        row = conn.execute("SELECT v FROM app_state WHERE k=?", (key, )).fetchone()
     return row[0] if row else None
 
 # 2. 체크리스트 & DB 도구
+_checklist_defaults: Dict[str, Dict[str, Any]] = {}
+
+def _parse_sql_default(v):
+    if v is None or v.upper() == "NULL":
+        return None
+    try: return int(v)
+    except ValueError: return v.strip("'")
+
+def checklist_defaults() -> Dict[str, Any]:
+    """아직 행이 없는 매장의 체크리스트 (컬럼 DEFAULT 값). DB 파일당 1회만 조회."""
+    if DB_PATH not in _checklist_defaults:
+        with get_tenant_db() as conn:
+            cols = conn.execute("PRAGMA table_info(store_checklist)").fetchall()
+        _checklist_defaults[DB_PATH] = {c["name"]: _parse_sql_default(c["dflt_value"]) for c in cols}
+    return dict(_checklist_defaults[DB_PATH])
+
+def _checklist_upsert_sql(columns) -> str:
+    for k in columns:
+        if not k.isidentifier():
+            raise ValueError(f"잘못된 체크리스트 컬럼: {k}")
+    cols = ", ".join(columns)
+    marks = ", ".join("?" for _ in columns)
+    sets = ", ".join(f"{k}=excluded.{k}" for k in columns)
+    # 값이 하나도 안 바뀌면 UPDATE 를 건너뜀: rev(ETag) 가 그대로 남고 쓰기 락도 잡지 않음
+    # (refresh_checklist_from_store 는 Streamlit 실행마다 같은 값을 다시 씀)
+    changed = " OR ".join(f"store_checklist.{k} IS NOT excluded.{k}" for k in columns)
+    return f"""
+        INSERT INTO store_checklist (store_id, {cols}) VALUES (?, {marks})
+        ON CONFLICT(store_id) DO UPDATE SET {sets} WHERE {changed}
+    """
+
 def ensure_checklist_row(store_id: int):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT store_id FROM store_checklist WHERE store_id=?", (store_id, ))
-    if not c.fetchone():
-        c.execute("INSERT INTO store_checklist (store_id) VALUES (?)", (store_id, ))
-    conn.commit()
-    conn.close()
+    with get_tenant_db() as conn:
+        conn.execute("INSERT INTO store_checklist (store_id) VALUES (?) ON CONFLICT(store_id) DO NOTHING", (store_id, ))
+        _invalidate(_checklist_cache, tenant_path(), store_id)
 
 def update_checklist_flags(store_id: int, **flags):
-    ensure_checklist_row(store_id)
-    cols, vals = [], []
-    for k, v in flags.items():
-        cols.append(f"{k}=?")
-        vals.append(v)
-    vals.append(store_id)
-    q = f"UPDATE store_checklist SET {', '.join(cols)} WHERE store_id=?"
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(q, tuple(vals))
-    conn.commit()
-    conn.close()
+    """여러 플래그를 UPSERT 한 문장으로 기록 (행이 없으면 생성)"""
+    if not flags:
+        return ensure_checklist_row(store_id)
+    cols = list(flags.keys())
+    with get_tenant_db() as conn:
+        conn.execute(_checklist_upsert_sql(cols), (store_id, *flags.values()))
+        _invalidate(_checklist_cache, tenant_path(), store_id)
+
+def update_checklist_flags_many(updates: Dict[int, Dict[str, Any]]):
+    """{store_id: {컬럼: 값}} 를 트랜잭션 1개로 기록 (같은 컬럼 묶음끼리 executemany)"""
+    groups: Dict[tuple, List[tuple]] = {}
+    for store_id, flags in updates.items():
+        if not flags:
+            continue
+        cols = tuple(flags.keys())
+        groups.setdefault(cols, []).append((store_id, *flags.values()))
+    with get_tenant_db() as conn:
+        for cols, rows in groups.items():
+            conn.executemany(_checklist_upsert_sql(cols), rows)
+        _invalidate(_checklist_cache, tenant_path(), *updates.keys())
+
+def _load_checklist(store_id: int) -> Dict[str, Any]:
+    with get_tenant_db() as conn:
+        row = conn.execute("SELECT * FROM store_checklist WHERE store_id=?", (store_id, )).fetchone()
+    if row:
+        return dict(row)
+    ck = checklist_defaults()
+    ck["store_id"] = store_id
+    return ck
 
 def get_checklist(store_id: int):
-    ensure_checklist_row(store_id)
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT * FROM store_checklist WHERE store_id=?", (store_id, ))
-    row = c.fetchone()
-    conn.close()
-    return dict(row) if row else {}
+    """읽기 전용: 행이 없으면 기본값 dict 반환 (INSERT 하지 않음). 캐시된 값의 복사본."""
+    return dict(_cached(_checklist_cache, tenant_path(), store_id, lambda: _load_checklist(store_id)))
 
 def set_review_sync_pending(store_id: int) -> str:
     nonce = secrets.token_urlsafe(8)
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-        UPDATE store_checklist 
-        SET review_sync_status='PENDING', review_sync_at=?, review_sync_nonce=? 
-        WHERE store_id=?
-    """, (now_iso(), nonce, store_id))
-    conn.commit()
-    conn.close()
+    update_checklist_flags(store_id, review_sync_status='PENDING', review_sync_at=now_iso(), review_sync_nonce=nonce)
     return nonce
 
 def set_review_sync_result(store_id: int, nonce: str, status: str, unreplied_count: int):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT review_sync_nonce FROM store_checklist WHERE store_id=?", (store_id,))
-    row = c.fetchone()
-    if not row or row['review_sync_nonce'] != nonce:
-        conn.close()
-        return False
     try: cnt = int(unreplied_count)
     except: cnt = -1
-    c.execute("""
-        UPDATE store_checklist 
-        SET review_sync_status=?, review_unreplied_count=?, review_sync_at=? 
-        WHERE store_id=?
-    """, (status, cnt, now_iso(), store_id))
-    conn.commit()
-    conn.close()
-    return True
+    # nonce 비교 + 갱신을 한 문장으로 (중간에 다른 sync 가 끼어들 틈 없음)
+    with get_tenant_db() as conn:
+        c = conn.execute("""
+            UPDATE store_checklist 
+            SET review_sync_status=?, review_unreplied_count=?, review_sync_at=? 
+            WHERE store_id=? AND review_sync_nonce=?
+        """, (status, cnt, now_iso(), store_id, nonce))
+        _invalidate(_checklist_cache, tenant_path(), store_id)
+    return c.rowcount > 0
 
 # 3. 매장(Store) 관리 도구
 def get_user_stores(username):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT store_id, store_name FROM stores WHERE username=? ORDER BY store_id ASC", (username, ))
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    def load():
+        with get_db() as conn:
+            return conn.execute("SELECT store_id, store_name FROM stores WHERE username=? ORDER BY store_id ASC", (username, )).fetchall()
+    return list(_cached(_user_stores_cache, DB_PATH, username, load))
+
+def _store_row(store_id: int):
+    def load():
+        with get_db() as conn:
+            return conn.execute("SELECT * FROM stores WHERE store_id=?", (store_id, )).fetchone()
+    return _cached(_store_cache, DB_PATH, store_id, load)
 
 def get_store_info(username, store_id):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT * FROM stores WHERE store_id=? AND username=?", (store_id, username))
-    row = c.fetchone()
-    conn.close()
-    return row
+    row = _store_row(store_id)
+    return row if row is not None and row["username"] == username else None
 
 def get_store(store_id: int):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT * FROM stores WHERE store_id=?", (store_id, ))
-    row = c.fetchone()
-    conn.close()
+    row = _store_row(store_id)
     return dict(row) if row else {}
 
+def store_owner(store_id: int) -> Optional[str]:
+    """매장 주인 계정 (확장 프로그램 콜백처럼 로그인 세션 밖에서 tenant 를 정할 때)"""
+    row = _store_row(store_id)
+    return row["username"] if row is not None else None
+
 def refresh_checklist_from_store(username: str, store_id: int):
     store = get_store_info(username, store_id)
     if not store: return
-    update_checklist_flags(
-        store_id,
-        # has_keywords=1 if (store["keywords"] or "").strip() else 0, # DO NOT SYNC: Scanner is truth
-        has_review_url=1 if (store["review_url"] or "").strip() else 0,
-        has_insta_url=1 if (store["insta_url"] or "").strip() else 0,
-    )
+    with tenant(username):
+        update_checklist_flags(
+            store_id,
+            # has_keywords=1 if (store["keywords"] or "").strip() else 0, # DO NOT SYNC: Scanner is truth
+            has_review_url=1 if (store["review_url"] or "").strip() else 0,
+            has_insta_url=1 if (store["insta_url"] or "").strip() else 0,
+        )
+
+def get_dashboard_row(username: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any], str]]:
+    """
+    /api/dashboard 용 읽기 전용 조회: 사용자의 첫 매장 + 체크리스트 + 버전 문자열.
+    쓰기 없음 (체크리스트 행이 없으면 기본값). 버전은 두 행의 rev (migrations 0010) 로 만든다.
+    단일 파일 모드는 JOIN 1번, 샤드 모드는 메인 DB / 샤드 각 1번.
+    """
+    with tenant(username):
+        defaults = checklist_defaults()
+    ck_cols = list(defaults)
+    if not sharding_enabled():
+        sel = ", ".join(f"c.{k} AS ck_{k}" for k in ck_cols)
+        with get_db() as conn:
+            row = conn.execute(f"""
+                SELECT s.*, c.store_id IS NOT NULL AS ck_exists, {sel}
+                FROM stores s LEFT JOIN store_checklist c ON c.store_id = s.store_id
+                WHERE s.username=? ORDER BY s.store_id ASC LIMIT 1
+            """, (username, )).fetchone()
+        if not row:
+            return None
+        row = dict(row)
+        ck_row = {k: row.pop(f"ck_{k}") for k in ck_cols} if row.pop("ck_exists") else None
+    else:
+        with get_db() as conn:
+            row = conn.execute("SELECT * FROM stores WHERE username=? ORDER BY store_id ASC LIMIT 1",
+                               (username, )).fetchone()
+        if not row:
+            return None
+        row = dict(row)
+        with get_tenant_db(username) as conn:
+            r = conn.execute("SELECT * FROM store_checklist WHERE store_id=?", (row["store_id"], )).fetchone()
+        ck_row = dict(r) if r else None
+    if ck_row is None:
+        ck = defaults
+        ck["store_id"] = row["store_id"]
+        version = f'{row["store_id"]}.{row["rev"]}.-'
+    else:
+        ck = ck_row
+        version = f'{row["store_id"]}.{row["rev"]}.{ck["rev"]}'
+    return row, ck, version
+
+def get_store_dashboards(username: str, store_ids: Optional[List[int]] = None) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    사용자의 매장 전체(또는 store_ids 중 본인 매장만) + 체크리스트를 쿼리 2번으로. 읽기 전용.
+    반환: [(매장 dict, 체크리스트 dict), ...] store_id 순. 체크리스트 행이 없으면 기본값.
+    """
+    where, params = "WHERE username=?", [username]
+    if store_ids is not None:
+        if not store_ids:
+            return []
+        where += f" AND store_id IN ({', '.join('?' for _ in store_ids)})"
+        params.extend(int(i) for i in store_ids)
+    with get_db() as conn:
+        stores = [dict(r) for r in conn.execute(f"SELECT * FROM stores {where} ORDER BY store_id ASC", params)]
+    if not stores:
+        return []
+    ids = [s["store_id"] for s in stores]
+    with tenant(username):
+        defaults = checklist_defaults()
+        with get_tenant_db() as conn:
+            cks = {r["store_id"]: dict(r) for r in conn.execute(
+                f"SELECT * FROM store_checklist WHERE store_id IN ({', '.join('?' for _ in ids)})", ids)}
+    return [(s, cks.get(s["store_id"]) or {**defaults, "store_id": s["store_id"]}) for s in stores]
 
 def add_store(username: str, store_name: str, category: str, sub_category: str, address: str, target: str, signature: str, strengths: str, keywords: str, review_url: str, insta_url: str) -> int:
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO stores (username, store_name, category, sub_category, address, target, signature, strengths, keywords, review_url, insta_url)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (username, store_name, category, sub_category, address, target, signature, strengths, keywords, review_url, insta_url))
-    conn.commit()
-    store_id = c.lastrowid
-    conn.close()
-    ensure_checklist_row(store_id)
-    refresh_checklist_from_store(username, store_id)
+    with get_db() as conn:
+        c = conn.cursor()
+        c.execute("""
+            INSERT INTO stores (username, store_name, category, sub_category, address, target, signature, strengths, keywords, review_url, insta_url)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (username, store_name, category, sub_category, address, target, signature, strengths, keywords, review_url, insta_url))
+        store_id = c.lastrowid
+        _invalidate(_store_cache, DB_PATH, store_id)
+        _invalidate(_user_stores_cache, DB_PATH, username)
+        refresh_checklist_from_store(username, store_id)
     return store_id
 
 def update_store(username: str, store_id: int, store_name: str, category: str, sub_category: str, address: str, target: str, signature: str, strengths: str, keywords: str, review_url: str, insta_url: str) -> bool:
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-        UPDATE stores
-        SET store_name=?, category=?, sub_category=?, address=?, target=?, signature=?, strengths=?, keywords=?, review_url=?, insta_url=?
-        WHERE store_id=? AND username=?
-    """, (store_name, category, sub_category, address, target, signature, strengths, keywords, review_url, insta_url, store_id, username))
-    conn.commit()
-    changed = (c.rowcount > 0)
-    conn.close()
-    if changed:
-        refresh_checklist_from_store(username, store_id)
+    with get_db() as conn:
+        c = conn.cursor()
+        c.execute("""
+            UPDATE stores
+            SET store_name=?, category=?, sub_category=?, address=?, target=?, signature=?, strengths=?, keywords=?, review_url=?, insta_url=?
+            WHERE store_id=? AND username=?
+        """, (store_name, category, sub_category, address, target, signature, strengths, keywords, review_url, insta_url, store_id, username))
+        changed = (c.rowcount > 0)
+        if changed:
+            _invalidate(_store_cache, DB_PATH, store_id)
+            _invalidate(_user_stores_cache, DB_PATH, username)
+            refresh_checklist_from_store(username, store_id)
     return changed
 
 def save_history(username: str, store_id: int, feature: str, title: str, input_text: str, output_text: str):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO history (username, store_id, feature, title, input_text, output_text, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (username, store_id, feature, title, input_text, output_text, now_iso()))
-    conn.commit()
-    conn.close()
-
-def get_recent_history(username: str, store_id: int, feature: Optional[str], keyword: str, limit: int):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
+    # 본문은 history_blobs 에 (같은 본문은 한 번만), history 에는 해시만
+    with get_tenant_db(username) as conn:
+        input_ref = history_blobs.put(conn, input_text)
+        output_ref = history_blobs.put(conn, output_text)
+        cur = conn.execute("""
+            INSERT INTO history (username, store_id, feature, title, input_ref, output_ref, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (username, store_id, feature, title, input_ref, output_ref, now_iso()))
+        # 색인은 트리거 대신 여기서 (본문을 이미 알고 있으니 풀 필요 없음, migrations 0012)
+        if has_history_fts(username):
+            conn.execute("INSERT INTO history_fts(rowid, title, input_text, output_text, scope) VALUES (?, ?, ?, ?, ?)",
+                         (cur.lastrowid, title, input_text, output_text, _history_scope(username, store_id)))
+
+def save_history_batch(username: str, store_id: int, feature: str, title: str, pairs: List[Tuple[str, str]],
+                       todo: Optional[Tuple[str, str]] = None, **flags):
+    """(입력, 결과) 여러 개 + 할일 완료 + 체크리스트 플래그를 트랜잭션 1개로 (리뷰 답글 일괄 생성)"""
+    # 안쪽 헬퍼들은 같은 스레드의 바깥 커넥션/트랜잭션을 그대로 씀 (db_pool.connection 중첩)
+    with tenant(username), get_tenant_db(username):
+        for input_text, output_text in pairs:
+            save_history(username, store_id, feature, title, input_text, output_text)
+        if todo:
+            save_todo_event(username, store_id, todo[0], todo[1], "DONE")
+        if flags:
+            update_checklist_flags(store_id, **flags)
+
+def get_recent_history(username: str, store_id: int, feature: Optional[str], keyword: str, limit: int,
+                       include_archive: bool = False):
+    """include_archive=True 면 최근 행이 limit 보다 적을 때 보관함(history_archive)까지 이어서 찾는다."""
+    rows = _get_hot_history(username, store_id, feature, keyword, limit)
+    if include_archive and len(rows) < limit:
+        rows = sorted(rows + get_archived_history(username, store_id, feature, keyword, limit),
+                      key=lambda r: r["id"], reverse=True)[:limit]
+    return rows
+
+def _get_hot_history(username: str, store_id: int, feature: Optional[str], keyword: str, limit: int):
     where = "WHERE username=? AND store_id=?"
     params = [username, store_id]
     if feature and feature != "ALL":
         where += " AND feature=?"
         params.append(feature)
-    if keyword.strip():
+    kw = keyword.strip()
+    if kw and _use_history_fts(kw, username):
+        where += " AND id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?)"
+        params.append(_history_match_expr(username, store_id, kw))
+    elif kw:
         where += " AND (title LIKE ? OR input_text LIKE ? OR output_text LIKE ?)"
-        k = f"%{keyword.strip()}%"
+        k = f"%{kw}%"
         params.extend([k, k, k])
-    q = f"SELECT * FROM history {where} ORDER BY id DESC LIMIT ?"
+    # history_full: 본문을 history_blobs 에서 풀어 예전 history 와 같은 컬럼으로 (migrations 0007)
+    q = f"SELECT * FROM history_full {where} ORDER BY id DESC LIMIT ?"
     params.append(limit)
-    c.execute(q, tuple(params))
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    with get_tenant_db(username) as conn:
+        return conn.execute(q, tuple(params)).fetchall()
+
+# 3-1. 히스토리 보관함 (history_archive, migrations 0006 / retention.py)
+# 본문은 history_blobs 참조 (0007 이전 보관분은 zlib 압축 BLOB). history_archive_full 뷰가 풀어서
+# history 와 같은 컬럼 이름의 행으로 돌려준다.
+def get_archived_history(username: str, store_id: int, feature: Optional[str], keyword: str, limit: int):
+    where = "WHERE username=? AND store_id=?"
+    params: List[Any] = [username, store_id]
+    if feature and feature != "ALL":
+        where += " AND feature=?"
+        params.append(feature)
+    kw = keyword.strip()
+    if kw:
+        # 보관함은 색인이 없어서 매장 범위 안에서 풀어 보며 찾는다 (요청할 때만)
+        where += " AND (title LIKE ? OR input_text LIKE ? OR output_text LIKE ?)"
+        k = f"%{kw}%"
+        params.extend([k, k, k])
+    params.append(limit)
+    with get_tenant_db(username) as conn:
+        return conn.execute(f"SELECT * FROM history_archive_full {where} ORDER BY id DESC LIMIT ?",
+                            tuple(params)).fetchall()
+
+# 3-2. 히스토리 전문 검색 (history_fts, migrations 0004)
+# trigram 색인은 3글자 이상만 찾을 수 있어서, 2글자 이하(예: '맛집')는 매장 범위 LIKE 로 처리
+FTS_MIN_CHARS = 3
+SEARCH_CANDIDATES = 500
+SNIPPET_WIDTH = 40
+_SNIPPET_COLUMNS = ("title", "input_text", "output_text")
+_fts_ready: Dict[str, bool] = {}
+
+def has_history_fts(username: Optional[str] = None) -> bool:
+    path = tenant_path(username)
+    if path not in _fts_ready:
+        with get_tenant_db(username) as conn:
+            row = conn.execute("SELECT 1 FROM sqlite_master WHERE name='history_fts'").fetchone()
+        _fts_ready[path] = row is not None
+    return _fts_ready[path]
+
+def _use_history_fts(keyword: str, username: Optional[str] = None) -> bool:
+    return len(keyword) >= FTS_MIN_CHARS and has_history_fts(username)
+
+def _fts_exists(conn) -> bool:
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name='history_fts'").fetchone() is None:
+        return False
+    history_blobs.require_codec(conn)  # history_fts_src 뷰가 본문을 풀어서 읽음
+    return True
+
+def unindex_history(conn, ids: List[int]):
+    """history 행을 지우기 전에 색인에서 뺌 (retention). 같은 트랜잭션에서 DELETE 할 것"""
+    if ids and _fts_exists(conn):
+        conn.execute(f"""
+            INSERT INTO history_fts(history_fts, rowid, title, input_text, output_text, scope)
+            SELECT 'delete', id, title, input_text, output_text, scope FROM history_fts_src
+            WHERE id IN ({", ".join("?" for _ in ids)})
+        """, ids)
+
+def rebuild_history_fts(conn):
+    """history 전체로 색인을 다시 만듦 (shard_tool split 처럼 행을 직접 복사한 뒤)"""
+    if _fts_exists(conn):
+        conn.execute("INSERT INTO history_fts(history_fts) VALUES ('rebuild')")
+
+def _fts_phrase(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+def _history_scope(username: str, store_id: int) -> str:
+    # migrations.HISTORY_SCOPE_SQL 과 같은 형태여야 함
+    return f"\x1f{username}\x1e{store_id}\x1f"
+
+def _history_match_expr(username: str, store_id: int, keyword: str) -> str:
+    scope = _history_scope(username, store_id)
+    return f"scope : {_fts_phrase(scope)} AND {{title input_text output_text}} : {_fts_phrase(keyword)}"
+
+def _plain_snippet(text: str, keyword: str, mark_open: str, mark_close: str, width: int) -> Optional[str]:
+    pos = (text or "").lower().find(keyword.lower())
+    if pos < 0:
+        return None
+    start = max(0, pos - width)
+    end = min(len(text), pos + len(keyword) + width)
+    return ("…" if start > 0 else "") + text[start:pos] + mark_open + text[pos:pos + len(keyword)] + mark_close \
+        + text[pos + len(keyword):end] + ("…" if end < len(text) else "")
+
+def _keyword_score(row: Dict[str, Any], keyword: str) -> int:
+    k = keyword.lower()
+    return 3 * (row["title"] or "").lower().count(k) \
+        + (row["input_text"] or "").lower().count(k) \
+        + (row["output_text"] or "").lower().count(k)
+
+def search_history(username: str, store_id: int, keyword: str, feature: Optional[str] = None,
+                   limit: int = 20, mark_open: str = "<mark>", mark_close: str = "</mark>",
+                   include_archive: bool = False) -> List[Dict[str, Any]]:
+    """
+    히스토리 키워드 검색 (관련도순: 제목 적중 가중치 3배, 동점이면 최신순).
+    반환: history 컬럼 + snippet(검색어 하이라이트) 을 가진 dict 목록
+
+    bm25(ORDER BY rank)는 전체 문서 기준 통계를 매번 계산해서 흔한 단어일수록 느려지므로,
+    색인으로 매장 범위 후보(최신 SEARCH_CANDIDATES 건)만 뽑은 뒤 파이썬에서 점수를 매긴다.
+    """
+    kw = keyword.strip()
+    if not kw:
+        return []
+    rows = get_recent_history(username, store_id, feature, kw, SEARCH_CANDIDATES, include_archive)
+    scored = sorted((dict(r) for r in rows), key=lambda d: (-_keyword_score(d, kw), -d["id"]))[:limit]
+    for d in scored:
+        d["snippet"] = next(filter(None, (
+            _plain_snippet(d[c], kw, mark_open, mark_close, SNIPPET_WIDTH) for c in _SNIPPET_COLUMNS)), "")
+    return scored
 
 # 4. 거래처(Supplier) 관리 도구
 def get_suppliers(store_id: int):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT * FROM suppliers WHERE store_id=? ORDER BY id DESC", (store_id, ))
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    def load():
+        with get_tenant_db() as conn:
+            return conn.execute("SELECT * FROM suppliers WHERE store_id=? ORDER BY id DESC", (store_id, )).fetchall()
+    return list(_cached(_supplier_cache, tenant_path(), store_id, load))
 
 def add_supplier(store_id: int, name: str, phone: str, items: str):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(
-        "INSERT INTO suppliers (store_id, name, phone, items, created_at) VALUES (?, ?, ?, ?, ?)",
-        (store_id, name, phone, items, now_iso()))
-    conn.commit()
-    conn.close()
+    with get_tenant_db() as conn:
+        conn.execute(
+            "INSERT INTO suppliers (store_id, name, phone, items, created_at) VALUES (?, ?, ?, ?, ?)",
+            (store_id, name, phone, items, now_iso()))
+        _invalidate(_supplier_cache, tenant_path(), store_id)
+
+def supplier_key(name: str, phone: str):
+    # 같은 거래처 판단: 이름(공백 무시) + 전화번호 숫자만
+    return ("".join((name or "").split()), "".join(ch for ch in (phone or "") if ch.isdigit()))
+
+def bulk_add_suppliers(store_id: int, rows: List[Dict[str, str]]) -> List[str]:
+    """
+    rows: [{"name", "phone", "items"}] (정규화된 값). 기존 거래처/입력 내 중복은 건너뛰고
+    나머지를 트랜잭션 1개(executemany)로 INSERT. 행별 결과 "added" / "duplicate" 를 입력 순서대로 반환.
+    """
+    now = now_iso()
+    status, params = [], []
+    with get_tenant_db() as conn:
+        seen = {supplier_key(r["name"], r["phone"]) for r in
+                conn.execute("SELECT name, phone FROM suppliers WHERE store_id=?", (store_id, ))}
+        for r in rows:
+            k = supplier_key(r["name"], r["phone"])
+            if k in seen:
+                status.append("duplicate")
+                continue
+            seen.add(k)
+            status.append("added")
+            params.append((store_id, r["name"], r["phone"], r["items"], now))
+        if params:
+            conn.executemany(
+                "INSERT INTO suppliers (store_id, name, phone, items, created_at) VALUES (?, ?, ?, ?, ?)", params)
+            _invalidate(_supplier_cache, tenant_path(), store_id)
+    return status
 
 def update_supplier(supplier_id: int, name: str, phone: str, items: str):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("UPDATE suppliers SET name=?, phone=?, items=? WHERE id=?",
-              (name, phone, items, supplier_id))
-    conn.commit()
-    conn.close()
+    with get_tenant_db() as conn:
+        _invalidate(_supplier_cache, tenant_path(), _store_id_of(conn, "suppliers", supplier_id))
+        conn.execute("UPDATE suppliers SET name=?, phone=?, items=? WHERE id=?",
+                     (name, phone, items, supplier_id))
 
 def delete_supplier(supplier_id: int):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("DELETE FROM suppliers WHERE id=?", (supplier_id, ))
-    conn.commit()
-    conn.close()
+    with get_tenant_db() as conn:
+        _invalidate(_supplier_cache, tenant_path(), _store_id_of(conn, "suppliers", supplier_id))
+        conn.execute("DELETE FROM suppliers WHERE id=?", (supplier_id, ))
 
 # 5. 온라인 링크 도구
-def get_online_items(store_id: int):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT * FROM online_items WHERE store_id=?", (store_id, ))
-    rows = c.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
-
-def add_online_item(store_id, alias, mall_name, url):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    now_str = datetime.now().isoformat()
+# 화면별 정렬 (SQL 에 직접 끼워 넣으므로 화이트리스트로만 허용)
+ONLINE_ITEM_ORDERS = {
+    "alias": "is_fixed DESC, alias ASC",
+    "recent": "is_fixed DESC, id DESC",
+}
+
+def get_online_items(store_id: int, order: Optional[str] = None):
+    order = order if order in ONLINE_ITEM_ORDERS else None
+    def load():
+        q = "SELECT * FROM online_items WHERE store_id=?"
+        if order:
+            q += f" ORDER BY {ONLINE_ITEM_ORDERS[order]}"
+        with get_tenant_db() as conn:
+            return [dict(row) for row in conn.execute(q, (store_id, )).fetchall()]
+    # 화면에서 dict 를 고쳐 써도 캐시가 바뀌지 않도록 복사해서 반환
+    return [dict(d) for d in _cached(_online_cache, tenant_path(), (store_id, order), load)]
+
+def count_online_items(store_id: int) -> int:
+    with get_tenant_db() as conn:
+        return conn.execute("SELECT COUNT(*) FROM online_items WHERE store_id=?", (store_id, )).fetchone()[0]
+
+# 같은 매장에 canonical_url 이 같은 링크는 UNIQUE 인덱스가 막는다 (migrations 0005)
+_INSERT_ONLINE_ITEM = """
+    INSERT INTO online_items (store_id, alias, mall_name, url, canonical_url, last_updated)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(store_id, canonical_url) DO NOTHING
+"""
+
+def add_online_item(store_id, alias, mall_name, url) -> bool:
+    """등록되면 True, 이미 같은 링크가 있으면 False"""
+    with get_tenant_db() as conn:
+        c = conn.execute(_INSERT_ONLINE_ITEM,
+                         (store_id, alias, mall_name, url, online_item_key(alias, url), now_iso()))
+        _invalidate_online_items(store_id)
+    return c.rowcount > 0
+
+def bulk_add_online_items(store_id: int, rows: List[Dict[str, str]]) -> List[str]:
+    """
+    rows: [{"alias", "mall_name", "url"}] (정규화된 값). 트랜잭션 1개 안에서 행마다
+    UNIQUE 인덱스로 중복을 거른다. 행별 결과 "added" / "duplicate" 를 입력 순서대로 반환.
+    """
+    now = now_iso()
+    status = []
+    with get_tenant_db() as conn:
+        # bulk_add_suppliers 와 달리 executemany 를 쓰지 않음: 중복 판단을 UNIQUE(store_id, canonical_url) +
+        # ON CONFLICT DO NOTHING 에 맡기고, 행마다 rowcount 로 added / duplicate 를 알아내야 해서
+        # (executemany 의 rowcount 는 합계뿐). 미리 SELECT 해 두는 방식은 첫 INSERT 전까지 쓰기 락이 없어서
+        # 다른 프로세스가 그 사이 넣은 링크를 added 로 잘못 보고할 수 있음. 트랜잭션은 여전히 1개
+        for r in rows:
+            c = conn.execute(_INSERT_ONLINE_ITEM,
+                             (store_id, r["alias"], r["mall_name"], r["url"], online_item_key(r["alias"], r["url"]), now))
+            status.append("added" if c.rowcount > 0 else "duplicate")
+        _invalidate_online_items(store_id)
+    return status
+
+def update_online_item(item_id: int, alias: str, mall_name: str, url: str, is_fixed: int) -> bool:
+    """같은 매장에 이미 같은 링크가 있으면 수정하지 않고 False"""
     try:
-        c.execute(
-            "INSERT INTO online_items (store_id, alias, mall_name, url, last_updated) VALUES (?, ?, ?, ?, ?)",
-            (store_id, alias, mall_name, url, now_str))
-        conn.commit()
-    except sqlite3.OperationalError as e:
-        if "no column named last_updated" in str(e):
-            c.execute("ALTER TABLE online_items ADD COLUMN last_updated TEXT")
-            conn.commit()
-            c.execute(
-                "INSERT INTO online_items (store_id, alias, mall_name, url, last_updated) VALUES (?, ?, ?, ?, ?)",
-                (store_id, alias, mall_name, url, now_str))
-            conn.commit()
-        else: raise e
-    conn.close()
-
-def ensure_online_items_price_columns():
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        def add_col_if_missing(col_name, ddl):
-            try:
-                c.execute(f"SELECT {col_name} FROM online_items LIMIT 1")
-            except sqlite3.OperationalError:
-                c.execute(ddl)
-                conn.commit()
-        add_col_if_missing("is_fixed", "ALTER TABLE online_items ADD COLUMN is_fixed INTEGER DEFAULT 0")
-        add_col_if_missing("last_updated", "ALTER TABLE online_items ADD COLUMN last_updated TEXT")
-        add_col_if_missing("mode", "ALTER TABLE online_items ADD COLUMN mode TEXT DEFAULT 'search'")
-        add_col_if_missing("query", "ALTER TABLE online_items ADD COLUMN query TEXT")
-        add_col_if_missing("price_sync_at", "ALTER TABLE online_items ADD COLUMN price_sync_at TEXT")
-        add_col_if_missing("price_sync_status", "ALTER TABLE online_items ADD COLUMN price_sync_status TEXT")
-        add_col_if_missing("price_sync_nonce", "ALTER TABLE online_items ADD COLUMN price_sync_nonce TEXT")
-        add_col_if_missing("last_opened_at", "ALTER TABLE online_items ADD COLUMN last_opened_at TEXT")
-        add_col_if_missing("last_confirmed_at", "ALTER TABLE online_items ADD COLUMN last_confirmed_at TEXT")
-        add_col_if_missing("last_confirmed_price", "ALTER TABLE online_items ADD COLUMN last_confirmed_price INTEGER")
-        add_col_if_missing("last_confirmed_title", "ALTER TABLE online_items ADD COLUMN last_confirmed_title TEXT")
-        add_col_if_missing("last_confirmed_url", "ALTER TABLE online_items ADD COLUMN last_confirmed_url TEXT")
-        conn.close()
-    except: pass
+        with get_tenant_db() as conn:
+            _invalidate_online_items(_store_id_of(conn, "online_items", item_id))
+            conn.execute("UPDATE online_items SET alias=?, mall_name=?, url=?, canonical_url=?, is_fixed=? WHERE id=?",
+                         (alias, mall_name, url, online_item_key(alias, url), is_fixed, item_id))
+        return True
+    except sqlite3.IntegrityError:
+        return False
+
+def update_online_item_url(item_id: int, url: str):
+    # 가격 확인 후 최종 URL 로 교체. 다른 링크와 겹치면 기존 URL 유지
+    with get_tenant_db() as conn:
+        _invalidate_online_items(_store_id_of(conn, "online_items", item_id))
+        conn.execute("""
+            UPDATE OR IGNORE online_items
+            SET url=?, canonical_url=COALESCE(NULLIF(?, ''), canonical_url)
+            WHERE id=?
+        """, (url, canonical_url(url), item_id))
+
+def delete_all_online_items(store_id: int):
+    with get_tenant_db() as conn:
+        conn.execute("DELETE FROM online_items WHERE store_id=?", (store_id, ))
+        _invalidate_online_items(store_id)
+
+def dedupe_online_items(store_id: int) -> int:
+    """
+    예전 DB 에서 넘어온 중복 링크 삭제 (SQL 1문장). 삭제 개수 반환.
+    새 링크는 UNIQUE 인덱스 때문에 중복이 생기지 않으므로, canonical_url 이 비어 있는 행
+    (0005 마이그레이션에서 더 최신 행에 밀린 중복)만 지우면 된다.
+    """
+    with get_tenant_db() as conn:
+        c = conn.execute("DELETE FROM online_items WHERE store_id=? AND canonical_url IS NULL", (store_id, ))
+        _invalidate_online_items(store_id)
+    return c.rowcount
 
 def mark_price_sync_fail(item_id: int):
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("UPDATE online_items SET price_sync_status='FAIL' WHERE id=?", (item_id,))
-        conn.commit()
-        conn.close()
+        with get_tenant_db() as conn:
+            _invalidate_online_items(_store_id_of(conn, "online_items", item_id))
+            conn.execute("UPDATE online_items SET price_sync_status='FAIL' WHERE id=?", (item_id,))
     except: pass
 
 def set_price_sync_pending(item_id: int) -> str:
     nonce = secrets.token_urlsafe(12)
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("UPDATE online_items SET price_sync_at=?, price_sync_status='PENDING', price_sync_nonce=? WHERE id=?",
-            (now_iso(), nonce, item_id))
-        conn.commit()
-        conn.close()
+        with get_tenant_db() as conn:
+            _invalidate_online_items(_store_id_of(conn, "online_items", item_id))
+            conn.execute("UPDATE online_items SET price_sync_at=?, price_sync_status='PENDING', price_sync_nonce=? WHERE id=?",
+                (now_iso(), nonce, item_id))
     except: pass
     return nonce
 
 def set_price_sync_result(item_id: int, nonce: str, price: Any, title: str, url: str) -> bool:
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        c.execute("SELECT price_sync_nonce FROM online_items WHERE id=?", (item_id,))
-        row = c.fetchone()
-        if not row:
-            conn.close()
-            return False
-        saved = (row["price_sync_nonce"] or "")
-        if not saved or not nonce or saved != nonce:
-            conn.close()
-            return False
-        p = None
-        try: p = int(str(price).replace(",", "").strip())
-        except: p = None
-        c.execute("""
-            UPDATE online_items
-            SET price_sync_at=?, price_sync_status='OK', last_confirmed_at=?,
-                last_confirmed_price=?, last_confirmed_title=?, last_confirmed_url=?, last_opened_at=?
-            WHERE id=?
-            """, (now_iso(), now_iso(), p, (title or "")[:200], (url or "")[:500], now_iso(), item_id))
-        conn.commit()
-        conn.close()
+        with get_tenant_db() as conn:
+            c = conn.cursor()
+            c.execute("SELECT store_id, price_sync_nonce FROM online_items WHERE id=?", (item_id,))
+            row = c.fetchone()
+            if not row:
+                return False
+            saved = (row["price_sync_nonce"] or "")
+            if not saved or not nonce or saved != nonce:
+                return False
+            p = None
+            try: p = int(str(price).replace(",", "").strip())
+            except (TypeError, ValueError): p = None
+            _invalidate_online_items(row["store_id"])
+            observed_at = now_iso()
+            c.execute("""
+                UPDATE online_items
+                SET price_sync_at=?, price_sync_status='OK', last_confirmed_at=?,
+                    last_confirmed_price=?, last_confirmed_title=?, last_confirmed_url=?, last_opened_at=?
+                WHERE id=?
+                """, (observed_at, observed_at, p, (title or "")[:200], (url or "")[:500], observed_at, item_id))
+            if p is not None:
+                # 이전 가격은 덮어쓰지 않고 시계열로 남김 (price_daily 는 트리거가 누적)
+                c.execute("""
+                    INSERT INTO price_observations (item_id, store_id, observed_at, price, title, url)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """, (item_id, row["store_id"], observed_at, p, (title or "")[:200], (url or "")[:500]))
+                _invalidate(_price_cache, tenant_path(), row["store_id"])
         return True
-    except: return False
+    except sqlite3.Error:
+        # 확장 프로그램 콜백이라 화면에 띄울 곳이 없음 → 로그만 남기고 실패로 돌려줌
+        log.exception("가격 스캔 결과 저장 실패 (item_id=%s)", item_id)
+        return False
 
 def delete_online_item(item_id: int):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("DELETE FROM online_items WHERE id=?", (item_id, ))
-    conn.commit()
-    conn.close()
+    with get_tenant_db() as conn:
+        _invalidate_online_items(_store_id_of(conn, "online_items", item_id))
+        conn.execute("DELETE FROM online_items WHERE id=?", (item_id, ))
+
+# 5-1. 가격 기록 (price_observations / price_daily, migrations 0009)
+PRICE_WINDOWS = (7, 30, 90)
+
+def get_price_stats(store_id: int) -> Dict[int, Dict[int, Dict[str, Any]]]:
+    """
+    매장 링크별 기간 가격 통계: {item_id: {7: {"min", "max", "avg", "n"}, 30: {...}, 90: {...}}}
+    하루 1행짜리 price_daily 만 읽으므로 관측이 많이 쌓여도 비용은 (링크 수 x 90일) 이하.
+    관측이 없는 기간은 빠진다.
+    """
+    def load():
+        today = datetime.now().date()
+        since = {w: (today - timedelta(days=w - 1)).isoformat() for w in PRICE_WINDOWS}
+        with get_tenant_db() as conn:
+            rows = conn.execute("""
+                SELECT item_id, day, min_price, max_price, sum_price, n
+                FROM price_daily WHERE store_id=? AND day >= ?
+            """, (store_id, min(since.values()))).fetchall()
+        acc: Dict[int, Dict[int, List[int]]] = {}
+        for r in rows:
+            for w in PRICE_WINDOWS:
+                if r["day"] < since[w]:
+                    continue
+                a = acc.setdefault(r["item_id"], {}).setdefault(w, [r["min_price"], r["max_price"], 0, 0])
+                a[0] = min(a[0], r["min_price"])
+                a[1] = max(a[1], r["max_price"])
+                a[2] += r["sum_price"]
+                a[3] += r["n"]
+        return {item_id: {w: {"min": a[0], "max": a[1], "avg": round(a[2] / a[3]), "n": a[3]}
+                          for w, a in by_w.items()}
+                for item_id, by_w in acc.items()}
+    # 캐시에 든 dict 를 그대로 주면 호출한 쪽이 고칠 때 캐시가 같이 바뀜
+    return {item_id: {w: dict(s) for w, s in by_w.items()}
+            for item_id, by_w in _cached(_price_cache, tenant_path(), store_id, load).items()}
+
+def get_price_history(item_id: int, limit: int = 30):
+    """링크 1개의 최근 관측 (최신순)"""
+    with get_tenant_db() as conn:
+        return conn.execute("""
+            SELECT observed_at, price, title, url FROM price_observations
+            WHERE item_id=? ORDER BY observed_at DESC LIMIT ?
+        """, (item_id, limit)).fetchall()
 
 # 6. Todo Helper
 def save_todo_event(username: str, store_id: int, todo_group: str, todo_text: str, status: str = "DONE"):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO todo_events (username, store_id, todo_group, todo_text, status, created_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (username, store_id, todo_group, todo_text, status, now_iso()))
-    conn.commit()
-    conn.close()
+    created_at = now_iso()
+    with get_tenant_db(username) as conn:
+        conn.execute("""
+            INSERT INTO todo_events (username, store_id, todo_group, todo_text, status, created_at, event_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (username, store_id, todo_group, todo_text, status, created_at, created_at[:10]))
 
 def get_today_done_groups(username: str, store_id: int) -> set:
+    # idx_todo_events_user_store_date (username, store_id, event_date, status) 로 바로 찾음
     today = datetime.now().date().isoformat()
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-        SELECT todo_group FROM todo_events
-        WHERE username=? AND store_id=? AND status='DONE' AND substr(created_at, 1, 10)=?
-    """, (username, store_id, today))
-    rows = c.fetchall()
-    conn.close()
+    with get_tenant_db(username) as conn:
+        rows = conn.execute("""
+            SELECT todo_group FROM todo_events
+            WHERE username=? AND store_id=? AND event_date=? AND status='DONE'
+        """, (username, store_id, today)).fetchall()
     return set([r[0] for r in rows])
 
 def apply_todo_done_effect(store_id: int, todo_group: str):
@@ -655,8 +806,6 @@ def apply_todo_done_effect(store_id: int, todo_group: str):
         update_checklist_flags(store_id, last_event_plan_at=now_iso())
 
 def mark_task_done(store_id: int, task_column: str):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
     # Security check: column name whitelist
     allowed = [
         "last_review_reply_at", "last_insta_caption_at", "last_blog_post_at",
@@ -667,10 +816,7 @@ def mark_task_done(store_id: int, task_column: str):
         
     now_str = now_iso()
     try:
-        c.execute(f"UPDATE store_checklist SET {task_column} = ? WHERE store_id = ?", (now_str, store_id))
-        conn.commit()
+        update_checklist_flags(store_id, **{task_column: now_str})
         return True
     except:
         return False
-    finally:
-        conn.close()
@@ -0,0 +1,115 @@
+"""
+api.py 용 비동기 DB 접근 (전용 스레드 + 대기열 상한).
+
+database.py / auth.py 의 함수는 sqlite3 를 직접 부르는 블로킹 함수라서, async 엔드포인트에서
+바로 부르면 이벤트 루프가 멈춘다. 여기서는 DB 전용 스레드 풀에서 실행하고 await 할 수 있게 한다.
+FastAPI 의 기본 스레드풀(sync def 엔드포인트용)을 DB 대기로 채우지 않기 위함.
+
+    await db_async.get_user_stores(username)       # database.py 의 함수 이름 그대로
+    await db_async.run(auth.verify_user, u, pw)    # 그 밖의 블로킹 함수
+
+    OWNERS_DB_ASYNC_WORKERS   8     DB 스레드 수 (기본: 커넥션 풀 크기와 같게)
+    OWNERS_DB_ASYNC_QUEUE     256   실행 중 + 대기 중 작업 상한. 넘으면 DBBusy (api.py 에서 503)
+
+- 호출한 쪽의 contextvars 를 그대로 들고 가므로 database.tenant(...) 안에서 await 해도 된다
+- 스레드 풀은 처음 쓸 때 만들고, fork 된 자식 프로세스에서는 새로 만든다 (db_pool 과 같은 방식)
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import database
+import db_pool
+
+WORKERS = int(os.environ.get("OWNERS_DB_ASYNC_WORKERS", str(db_pool.POOL_SIZE)))
+QUEUE_LIMIT = int(os.environ.get("OWNERS_DB_ASYNC_QUEUE", "256"))
+
+# 커넥션/컨텍스트 매니저를 돌려주는 함수는 스레드를 넘기면 의미가 없어서 제외
+_NOT_AWAITABLE = {"tenant", "get_db", "get_tenant_db", "iter_shard_paths", "iter_all_shards"}
+
+
+class DBBusy(RuntimeError):
+    """DB 대기열이 가득 참 (잠시 후 재시도)"""
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_lock = threading.Lock()
+_pending = 0
+_rejected = 0
+_completed = 0
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor, _executor_pid, _pending
+    if _executor is None or _executor_pid != os.getpid():
+        with _lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="owners-db")
+                _executor_pid = os.getpid()
+                _pending = 0
+    return _executor
+
+
+def _done(_fut):
+    global _pending, _completed
+    with _lock:
+        _pending -= 1
+        _completed += 1
+
+
+async def run(fn: Callable, *args, **kwargs) -> Any:
+    """블로킹 함수를 DB 스레드에서 실행하고 결과를 기다림"""
+    global _pending, _rejected
+    executor = _get_executor()
+    with _lock:
+        if _pending >= QUEUE_LIMIT:
+            _rejected += 1
+            raise DBBusy(f"DB 대기열 초과 ({QUEUE_LIMIT})")
+        _pending += 1
+    ctx = contextvars.copy_context()
+    try:
+        fut = executor.submit(ctx.run, functools.partial(fn, *args, **kwargs))
+    except BaseException:
+        _done(None)
+        raise
+    fut.add_done_callback(_done)
+    return await asyncio.wrap_future(fut)
+
+
+def awaitable(fn: Callable) -> Callable:
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run(fn, *args, **kwargs)
+    return wrapper
+
+
+_wrapped: Dict[str, Callable] = {}
+
+def __getattr__(name: str):
+    # db_async.get_checklist(...) -> database.get_checklist 를 DB 스레드에서
+    if name.startswith("_") or name in _NOT_AWAITABLE:
+        raise AttributeError(name)
+    fn = getattr(database, name, None)
+    if not callable(fn) or getattr(fn, "__module__", None) != database.__name__:
+        raise AttributeError(name)
+    if name not in _wrapped:
+        _wrapped[name] = awaitable(fn)
+    return _wrapped[name]
+
+
+def stats() -> Dict[str, int]:
+    return {"workers": WORKERS, "queue_limit": QUEUE_LIMIT, "pending": _pending,
+            "completed": _completed, "rejected": _rejected}
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        ex, _executor = _executor, None
+    if ex is not None:
+        ex.shutdown(wait=True)
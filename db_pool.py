@@ -0,0 +1,202 @@
+"""
+SQLite 커넥션 풀 + 동시성 설정.
+
+start.sh 는 uvicorn(api.py, 워커 여러 개)과 Streamlit 을 서로 다른 프로세스로 띄우고
+같은 owners_v9.db 를 공유한다. 그래서 모든 커넥션은 열릴 때 아래 PRAGMA 를 적용한다.
+
+    OWNERS_DB_JOURNAL_MODE      WAL      읽기는 쓰기를 기다리지 않음 (스냅샷 읽기)
+    OWNERS_DB_BUSY_TIMEOUT_MS   5000     쓰기 락 대기 시간 (즉시 "database is locked" 방지)
+    OWNERS_DB_SYNCHRONOUS       NORMAL   WAL 에서는 커밋마다 fsync 안 함 (체크포인트 때만)
+    OWNERS_DB_MMAP_SIZE         268435456  읽기를 mmap 으로 (256MB)
+    OWNERS_DB_CACHE_SIZE_KB     16384    커넥션당 페이지 캐시 (16MB)
+
+쓰기 트랜잭션은 BEGIN IMMEDIATE 로 시작한다. 읽고-쓰는 트랜잭션이 나중에 락 승격에
+실패(SQLITE_BUSY, busy_timeout 무시)하는 대신 처음부터 쓰기 락을 기다리게 하기 위함.
+
+권장 구성 (bench_db.py 로 측정, 결과는 bench_db.py 상단 참고):
+    API_WORKERS=4 + Streamlit 1개, 기본값(WAL/NORMAL/5000ms) 그대로 사용.
+    WAL 은 DB 파일과 같은 디렉터리의 -wal/-shm 파일을 쓰므로 로컬 디스크에 둘 것
+    (네트워크 파일시스템 X).
+"""
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+# 커넥션 풀 설정 (환경변수로 조정 가능)
+POOL_SIZE = int(os.environ.get("OWNERS_DB_POOL_SIZE", "8"))
+STATEMENT_CACHE_SIZE = int(os.environ.get("OWNERS_DB_STMT_CACHE", "256"))
+
+# 동시성/저장 모드 (설명은 모듈 상단 참고)
+JOURNAL_MODE = os.environ.get("OWNERS_DB_JOURNAL_MODE", "WAL").upper()
+BUSY_TIMEOUT_MS = int(os.environ.get("OWNERS_DB_BUSY_TIMEOUT_MS", "5000"))
+SYNCHRONOUS = os.environ.get("OWNERS_DB_SYNCHRONOUS", "NORMAL").upper()
+MMAP_SIZE = int(os.environ.get("OWNERS_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+CACHE_SIZE_KB = int(os.environ.get("OWNERS_DB_CACHE_SIZE_KB", "16384"))
+
+_JOURNAL_MODES = {"WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "OFF"}
+_SYNCHRONOUS_LEVELS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+if JOURNAL_MODE not in _JOURNAL_MODES:
+    raise ValueError(f"OWNERS_DB_JOURNAL_MODE 값 오류: {JOURNAL_MODE}")
+if SYNCHRONOUS not in _SYNCHRONOUS_LEVELS:
+    raise ValueError(f"OWNERS_DB_SYNCHRONOUS 값 오류: {SYNCHRONOUS}")
+
+
+def apply_pragmas(conn: sqlite3.Connection, set_journal_mode: bool = True):
+    # journal_mode 는 DB 파일에 영구 저장되므로 풀당 한 번이면 충분
+    if set_journal_mode:
+        try:
+            conn.execute(f"PRAGMA journal_mode={JOURNAL_MODE}")
+        except sqlite3.OperationalError:
+            # 다른 프로세스가 잡고 있으면 다음 커넥션에서 다시 시도됨
+            return False
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    return True
+
+
+# 새 커넥션마다 실행할 함수 (SQL 함수 등록 등). 모듈 import 시점에 등록할 것
+_connect_hooks: List[Callable[[sqlite3.Connection], None]] = []
+
+
+def add_connect_hook(fn: Callable[[sqlite3.Connection], None]):
+    if fn not in _connect_hooks:
+        _connect_hooks.append(fn)
+
+
+class ConnectionPool:
+    """
+    DB 파일 1개당 재사용 가능한 sqlite3 커넥션 묶음.
+    - 커넥션은 스레드 간 이동 가능(check_same_thread=False)하지만 동시에 한 스레드만 사용
+    - cached_statements 로 prepared statement 를 커넥션 단위로 재사용
+    """
+
+    def __init__(self, path: str, size: int = POOL_SIZE):
+        self.path = path
+        self.size = size
+        self.pid = os.getpid()
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=size)
+        self.opened = 0
+        self._journal_set = False
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            isolation_level="IMMEDIATE",
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = sqlite3.Row
+        if apply_pragmas(conn, set_journal_mode=not self._journal_set):
+            self._journal_set = True
+        else:
+            apply_pragmas(conn, set_journal_mode=False)
+        for hook in _connect_hooks:
+            hook(conn)
+        self.opened += 1
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._open()
+
+    def release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_pool(path: str, size: Optional[int] = None) -> ConnectionPool:
+    pool = _pools.get(path)
+    # fork 된 워커(uvicorn --workers)는 부모 커넥션을 물려받으면 안 됨
+    if pool is None or pool.pid != os.getpid():
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None or pool.pid != os.getpid():
+                pool = ConnectionPool(path, size or POOL_SIZE)
+                _pools[path] = pool
+    return pool
+
+
+def close_all_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+        _pools.clear()
+
+
+@contextmanager
+def connection(path: str, pool_size: Optional[int] = None) -> Iterator[sqlite3.Connection]:
+    """
+    풀에서 커넥션을 빌려 트랜잭션 1개로 실행한다.
+    - 정상 종료: commit / 예외: rollback
+    - 같은 스레드에서 중첩 호출하면 바깥 커넥션/트랜잭션을 그대로 재사용
+    - pool_size: 이 파일의 풀을 처음 만들 때만 적용 (샤드처럼 파일이 많을 때 작게)
+    """
+    held = getattr(_local, "held", None)
+    if held is None:
+        held = _local.held = {}
+
+    entry = held.get(path)
+    if entry is not None:
+        entry[1] += 1
+        try:
+            yield entry[0]
+        finally:
+            entry[1] -= 1
+        return
+
+    pool = get_pool(path, pool_size)
+    conn = pool.acquire()
+    entry = held[path] = [conn, 1, []]
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        del held[path]
+        pool.release(conn)
+        for fn in entry[2]:
+            fn()
+
+
+def in_transaction(path: str) -> bool:
+    """현재 스레드가 path 의 connection() 블록 안에 있는지"""
+    return path in getattr(_local, "held", {})
+
+
+def after_transaction(path: str, fn: Callable[[], None]):
+    """
+    현재 스레드의 path 트랜잭션이 끝난 뒤(커밋/롤백 모두) fn 실행. 트랜잭션 밖이면 바로 실행.
+    캐시 무효화용: 커밋 전에 지우면 다른 스레드가 옛 값을 다시 채울 수 있고,
+    롤백이면 트랜잭션 안에서 읽어 둔 값이 남지 않게 한 번 더 지운다.
+    """
+    entry = getattr(_local, "held", {}).get(path)
+    if entry is None:
+        fn()
+    else:
+        entry[2].append(fn)
@@ -0,0 +1,68 @@
+"""
+history 본문(input_text / output_text) 내용 주소 저장소.
+
+같은 키워드/설명/캡션을 여러 번 생성하면 같은 긴 문자열이 history 에 계속 쌓이므로,
+본문은 history_blobs (sha256 → zlib 압축 본문) 에 한 번만 저장하고 history 행에는 해시만 둔다.
+
+- refcount 는 history / history_archive 의 INSERT/DELETE 트리거가 맞춘다 (migrations 0007)
+- 참조가 0 이 된 본문은 바로 지우지 않고 gc() 가 모아서 지운다
+  (DELETE 트리거끼리 실행 순서에 기대지 않기 위해. FTS 삭제 트리거가 본문을 읽어야 함)
+- history_pack / history_unpack SQL 함수는 풀의 모든 커넥션에 등록된다 (뷰에서 사용).
+  history_full / history_archive_full / history_fts_src 뷰는 db_pool 로 연 커넥션에서만 읽을 수 있고,
+  sqlite3 CLI 같은 다른 커넥션에서는 "no such function: history_unpack" 이 난다.
+  트리거는 이 함수를 쓰지 않으므로 (migrations 0012) history INSERT/DELETE 는 어느 커넥션에서든 된다.
+  뷰를 읽는 도구(shard_tool / retention)는 require_codec() 으로 먼저 확인한다
+"""
+import hashlib
+import sqlite3
+import zlib
+from typing import Optional
+
+import db_pool
+
+COMPRESS_LEVEL = 6
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def history_pack(text: Optional[str]) -> Optional[bytes]:
+    return None if text is None else zlib.compress(text.encode("utf-8"), COMPRESS_LEVEL)
+
+
+def history_unpack(blob: Optional[bytes]) -> Optional[str]:
+    return None if blob is None else zlib.decompress(blob).decode("utf-8")
+
+
+def register_codec(conn: sqlite3.Connection):
+    conn.create_function("history_pack", 1, history_pack, deterministic=True)
+    conn.create_function("history_unpack", 1, history_unpack, deterministic=True)
+
+
+db_pool.add_connect_hook(register_codec)
+
+
+def require_codec(conn: sqlite3.Connection):
+    """history_unpack 이 없는 커넥션이면 RuntimeError (뷰를 읽다가 중간에 실패하지 않게)"""
+    try:
+        conn.execute("SELECT history_unpack(NULL)")
+    except sqlite3.OperationalError:
+        raise RuntimeError("history_unpack 이 등록되지 않은 커넥션입니다. db_pool.connection() 으로 여세요") from None
+
+
+def put(conn: sqlite3.Connection, text: Optional[str]) -> Optional[str]:
+    """본문 저장 후 해시 반환 (이미 있으면 압축도 안 함). refcount 는 트리거가 올린다."""
+    if text is None:
+        return None
+    h = text_hash(text)
+    if conn.execute("SELECT 1 FROM history_blobs WHERE hash=?", (h, )).fetchone() is None:
+        conn.execute(
+            "INSERT OR IGNORE INTO history_blobs (hash, body, raw_size, refcount) VALUES (?, ?, ?, 0)",
+            (h, history_pack(text), len(text)))
+    return h
+
+
+def gc(conn: sqlite3.Connection) -> int:
+    """참조가 없는 본문 삭제. 지운 개수 반환."""
+    return conn.execute("DELETE FROM history_blobs WHERE refcount <= 0").rowcount
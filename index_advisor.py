@@ -0,0 +1,149 @@
+"""
+인덱스 점검기: database.py 헬퍼가 실제로 실행하는 SQL 을 모아 EXPLAIN QUERY PLAN 으로 확인.
+
+    python index_advisor.py        # 풀 스캔이 있으면 목록 출력 후 exit 1
+
+임시 DB 에 마이그레이션을 적용하고 exercise() 에서 헬퍼들을 한 번씩 호출한다.
+그 동안 set_trace_callback 으로 실행된 SELECT/UPDATE/DELETE 를 수집해서,
+인덱스 없이 테이블 전체를 읽는 계획("SCAN <table>")이 나오면 실패로 본다.
+새 헬퍼를 추가했다면 exercise() 에도 호출을 추가할 것.
+"""
+import os
+import re
+import sys
+import tempfile
+from typing import List, Tuple
+
+import database
+import history_blobs
+import llm_cache
+import retention
+
+# 일부러 전체를 읽는 쿼리 (관리자/배치용). (테이블, SQL 일부) 로 등록
+ALLOWED_SCANS: List[Tuple[str, str]] = [
+    # 스키마 카탈로그 조회 (DB 파일당 1회 캐시됨)
+    ("sqlite_master", "FROM sqlite_master"),
+    # 관리자용 전체 샤드 합계 (database.fleet_table_counts)
+    ("store_checklist", "SELECT COUNT(*) FROM store_checklist"),
+]
+
+_SCAN_RE = re.compile(r"^SCAN (\w+)$")
+_CHECKED_VERBS = ("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")
+
+
+def exercise(username: str = "advisor"):
+    """database.py 의 조회/수정 헬퍼를 한 번씩 호출 (실행된 SQL 수집용)."""
+    database.set_app_state("advisor", "1")
+    database.get_app_state("advisor")
+
+    store_id = database.add_store(username, "점검매장", "음식점/카페", "한식", "서울", "", "", "", "", "", "")
+    database.get_user_stores(username)
+    database.get_store_info(username, store_id)
+    database.get_store(store_id)
+    database.update_store(username, store_id, "점검매장", "음식점/카페", "한식", "서울", "", "", "", "", "", "")
+    database.update_checklist_flags(store_id, has_keywords=1)
+    database.update_checklist_flags_many({store_id: {"has_news": 1}, store_id + 1: {"has_news": 0}})
+    database.get_checklist(store_id)
+    nonce = database.set_review_sync_pending(store_id)
+    database.set_review_sync_result(store_id, nonce, "OK", 0)
+    database.mark_task_done(store_id, "last_place_news_at")
+
+    database.save_history(username, store_id, "PLACE", "t", "in", "out")
+    database.save_history_batch(username, store_id, "REVIEW", "t", [("r1", "a1"), ("r2", "a2")],
+                                todo=("review", "t"), last_review_reply_at=database.now_iso())
+    database.get_recent_history(username, store_id, None, "", 10)
+    database.get_recent_history(username, store_id, "PLACE", "", 10)
+    database.get_recent_history(username, store_id, None, "키워드", 10)
+    database.search_history(username, store_id, "키워드")
+    database.search_history(username, store_id, "키")
+    retention.archive_shard(database.DB_PATH)
+    database.get_recent_history(username, store_id, "PLACE", "", 10, include_archive=True)
+    database.get_recent_history(username, store_id, None, "키워드", 10, include_archive=True)
+    with database.get_db() as conn:
+        history_blobs.gc(conn)
+
+    database.add_supplier(store_id, "수산", "010", "연어")
+    database.bulk_add_suppliers(store_id, [{"name": "정육", "phone": "02", "items": "소"}])
+    sup = database.get_suppliers(store_id)[0]
+    database.update_supplier(sup["id"], "수산", "010", "연어,광어")
+    database.delete_supplier(sup["id"])
+
+    database.add_online_item(store_id, "새우", "쿠팡", "https://example.com/a")
+    database.bulk_add_online_items(store_id, [{"alias": "연어", "mall_name": "쿠팡", "url": "https://example.com/c"}])
+    database.get_online_items(store_id)
+    database.get_online_items(store_id, order="alias")
+    item = database.get_online_items(store_id, order="recent")[0]
+    database.count_online_items(store_id)
+    database.update_online_item(item["id"], "새우", "쿠팡", "https://example.com/a", 1)
+    database.update_online_item_url(item["id"], "https://example.com/b")
+    nonce = database.set_price_sync_pending(item["id"])
+    database.set_price_sync_result(item["id"], nonce, "1,000", "새우", "https://example.com/b")
+    database.get_price_stats(store_id)
+    database.get_price_history(item["id"])
+    database.mark_price_sync_fail(item["id"])
+    database.dedupe_online_items(store_id)
+    database.delete_online_item(item["id"])
+    database.delete_all_online_items(store_id)
+
+    database.save_todo_event(username, store_id, "review", "리뷰 답글 생성")
+    database.get_today_done_groups(username, store_id)
+    database.get_dashboard_row(username)
+    database.get_store_dashboards(username)
+    database.get_store_dashboards(username, [store_id])
+
+    key = llm_cache.key("advisor", [{"role": "user", "content": "p"}], {})
+    llm_cache.get(key)
+    llm_cache.put(key, "place_keywords", "advisor", "out")
+    llm_cache.get(key)
+
+    database.fleet_table_counts()
+
+
+def _allowed(table: str, sql: str) -> bool:
+    return any(t == table and frag in sql for t, frag in ALLOWED_SCANS)
+
+
+def check() -> List[Tuple[str, str]]:
+    """(SQL, 문제 계획) 목록 반환. 비어 있으면 통과."""
+    tmp = tempfile.mkdtemp(prefix="owners_advisor_")
+    old_path = database.DB_PATH
+    database.DB_PATH = os.path.join(tmp, "advisor.db")
+    statements: List[str] = []
+    try:
+        database.init_db()
+        with database.get_db() as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                exercise()
+            finally:
+                conn.set_trace_callback(None)
+
+            problems = []
+            seen = set()
+            for sql in statements:
+                s = " ".join(sql.split())
+                if not s.upper().startswith(_CHECKED_VERBS) or s in seen:
+                    continue
+                seen.add(s)
+                for row in conn.execute(f"EXPLAIN QUERY PLAN {s}").fetchall():
+                    m = _SCAN_RE.match(row[3])
+                    if m and not _allowed(m.group(1), s):
+                        problems.append((s, row[3]))
+        return problems
+    finally:
+        database.DB_PATH = old_path
+
+
+def main():
+    problems = check()
+    if not problems:
+        print("OK: 모든 쿼리가 인덱스를 사용합니다.")
+        return 0
+    for sql, detail in problems:
+        print(f"[{detail}] {sql}")
+    print(f"FAIL: 풀 스캔 쿼리 {len(problems)}개")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
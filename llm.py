@@ -0,0 +1,283 @@
+"""
+LLM 호출 창구 (views.py / api.py 의 모든 생성 요청이 여기를 거친다).
+
+- OpenAI 클라이언트는 프로세스당 1개를 계속 씀 (HTTP keep-alive, 클릭마다 TLS 연결 X)
+- 호출마다 타임아웃
+- 429 / 5xx / 연결 오류는 지수 백오프 + 지터로 재시도 (Retry-After 가 있으면 따름)
+- 재시도해도 안 되면 LLMRateLimited / LLMError 로 올림 (화면에서 문구를 나눠 보여줄 수 있게)
+- chat / chat_stream(..., cache="기능이름") 이면 llm_cache.py 의 응답 캐시를 거침 (refresh=True 면 새로 생성)
+
+    OWNERS_LLM_TIMEOUT        60    초. 호출 1번의 최대 시간 (스트리밍은 조각 사이 간격)
+    OWNERS_LLM_RETRIES        3     재시도 횟수 (첫 시도 제외)
+    OWNERS_LLM_BACKOFF        0.5   첫 재시도 대기 (초). 이후 2배씩, 최대 OWNERS_LLM_BACKOFF_MAX
+    OWNERS_LLM_BACKOFF_MAX    8
+    OWNERS_LLM_CONCURRENCY    4     ask_many 의 동시 요청 수 (리뷰 답글 일괄 생성 등)
+
+API 키는 OPENAI_API_KEY 환경변수, 또는 configure(key) (Streamlit 은 st.secrets 값을 한 번 넘김).
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import openai
+from openai import AsyncOpenAI, OpenAI
+
+import llm_cache
+import prompts
+
+TIMEOUT = float(os.environ.get("OWNERS_LLM_TIMEOUT", "60"))
+RETRIES = int(os.environ.get("OWNERS_LLM_RETRIES", "3"))
+BACKOFF = float(os.environ.get("OWNERS_LLM_BACKOFF", "0.5"))
+BACKOFF_MAX = float(os.environ.get("OWNERS_LLM_BACKOFF_MAX", "8"))
+CONCURRENCY = int(os.environ.get("OWNERS_LLM_CONCURRENCY", "4"))
+
+_PLACEHOLDER_KEYS = {"", "여기에_키를_붙여넣으세요"}
+
+
+class LLMError(RuntimeError):
+    """LLM 호출 실패 (재시도 후)"""
+
+class LLMUnavailable(LLMError):
+    """API 키 없음"""
+
+class LLMRateLimited(LLMError):
+    """사용 한도 초과 (429 가 재시도 후에도 계속)"""
+
+
+_lock = threading.Lock()
+_api_key: Optional[str] = None
+_client: Optional[OpenAI] = None
+_async_client: Optional[AsyncOpenAI] = None
+_pid: Optional[int] = None
+_stats = {"calls": 0, "retries": 0, "rate_limited": 0, "errors": 0}
+
+
+def _count(name: str):
+    # ask_many 의 여러 스레드가 같이 올림
+    with _lock:
+        _stats[name] += 1
+
+
+def configure(api_key: Optional[str]):
+    """키를 지정 (바뀌었을 때만 클라이언트를 새로 만듦)"""
+    global _api_key, _client, _async_client
+    key = (api_key or "").strip()
+    if key in _PLACEHOLDER_KEYS:
+        return
+    with _lock:
+        if key != _api_key:
+            _api_key, _client, _async_client = key, None, None
+
+def _key() -> Optional[str]:
+    if _api_key:
+        return _api_key
+    key = (os.environ.get("OPENAI_API_KEY") or "").strip()
+    return None if key in _PLACEHOLDER_KEYS else key
+
+def available() -> bool:
+    return bool(_key())
+
+def _check_pid():
+    # fork 된 자식은 부모의 HTTP 연결을 같이 쓰면 안 됨
+    global _client, _async_client, _pid
+    if _pid != os.getpid():
+        _client, _async_client, _pid = None, None, os.getpid()
+
+def client() -> OpenAI:
+    global _client
+    key = _key()
+    if not key:
+        raise LLMUnavailable("OpenAI API Key 가 설정되지 않았습니다.")
+    with _lock:
+        _check_pid()
+        if _client is None:
+            # 재시도는 여기서 직접 (지터/통계), SDK 자체 재시도는 끔
+            _client = OpenAI(api_key=key, timeout=TIMEOUT, max_retries=0)
+        return _client
+
+def async_client() -> AsyncOpenAI:
+    global _async_client
+    key = _key()
+    if not key:
+        raise LLMUnavailable("OpenAI API Key 가 설정되지 않았습니다.")
+    with _lock:
+        _check_pid()
+        if _async_client is None:
+            _async_client = AsyncOpenAI(api_key=key, timeout=TIMEOUT, max_retries=0)
+        return _async_client
+
+
+# ---------------------------------------------------------------
+# 재시도 판단 / 대기 시간
+# ---------------------------------------------------------------
+def _retryable(e: Exception) -> bool:
+    if isinstance(e, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(e, openai.APIStatusError) and e.status_code >= 500
+
+def _delay(attempt: int, e: Exception) -> float:
+    retry_after = None
+    response = getattr(e, "response", None)
+    if response is not None:
+        try:
+            retry_after = float(response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            retry_after = None
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAX)
+    # full jitter: 여러 워커가 같은 순간에 다시 몰리지 않게
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF * (2 ** attempt)))
+
+def _fail(e: Exception) -> LLMError:
+    if isinstance(e, openai.RateLimitError):
+        _count("rate_limited")
+        return LLMRateLimited("AI 사용 한도가 초과되었습니다. 잠시 후 다시 시도해주세요.")
+    _count("errors")
+    return LLMError(str(e))
+
+def _params(model: Optional[str], timeout: Optional[float], params: Dict[str, Any]) -> Dict[str, Any]:
+    return {"model": model or prompts.MODEL, "timeout": timeout or TIMEOUT, **params}
+
+
+# ---------------------------------------------------------------
+# 호출
+# ---------------------------------------------------------------
+def _cache_key(cache: Optional[str], refresh: bool, model: Optional[str], messages, params) -> Optional[str]:
+    if not llm_cache.enabled(cache):
+        return None
+    if refresh:
+        llm_cache.bypassed()
+    return llm_cache.key(model or prompts.MODEL, messages, params)
+
+def chat(messages: List[Dict[str, str]], model: Optional[str] = None, timeout: Optional[float] = None,
+         cache: Optional[str] = None, refresh: bool = False, **params) -> str:
+    """완성된 답변 문자열"""
+    key = _cache_key(cache, refresh, model, messages, params)
+    if key and not refresh:
+        hit = llm_cache.get(key)
+        if hit is not None:
+            return hit
+    text = _chat(messages, model, timeout, params)
+    if key:
+        llm_cache.put(key, cache, model or prompts.MODEL, text)
+    return text
+
+def _chat(messages, model, timeout, params) -> str:
+    _count("calls")
+    kwargs = _params(model, timeout, params)
+    for attempt in range(RETRIES + 1):
+        try:
+            res = client().chat.completions.create(messages=messages, **kwargs)
+            return res.choices[0].message.content or ""
+        except LLMError:
+            raise
+        except Exception as e:
+            if attempt >= RETRIES or not _retryable(e):
+                raise _fail(e) from e
+            _count("retries")
+            time.sleep(_delay(attempt, e))
+
+def chat_stream(messages: List[Dict[str, str]], model: Optional[str] = None, timeout: Optional[float] = None,
+                cache: Optional[str] = None, refresh: bool = False, **params) -> Iterator[str]:
+    """답변 조각(delta)을 순서대로. 캐시 hit 이면 저장된 답변 전체가 조각 1개로 온다"""
+    key = _cache_key(cache, refresh, model, messages, params)
+    if key and not refresh:
+        hit = llm_cache.get(key)
+        if hit is not None:
+            yield hit
+            return
+    parts = []
+    for delta in _chat_stream(messages, model, timeout, params):
+        parts.append(delta)
+        yield delta
+    if key:
+        llm_cache.put(key, cache, model or prompts.MODEL, "".join(parts))
+
+def _chat_stream(messages, model, timeout, params) -> Iterator[str]:
+    # 첫 조각이 오기 전 실패만 재시도 (이미 보낸 글자는 되돌릴 수 없음)
+    _count("calls")
+    kwargs = _params(model, timeout, params)
+    for attempt in range(RETRIES + 1):
+        started = False
+        try:
+            for chunk in client().chat.completions.create(messages=messages, stream=True, **kwargs):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    started = True
+                    yield delta
+            return
+        except LLMError:
+            raise
+        except Exception as e:
+            if started or attempt >= RETRIES or not _retryable(e):
+                raise _fail(e) from e
+            _count("retries")
+            time.sleep(_delay(attempt, e))
+
+async def achat(messages: List[Dict[str, str]], model: Optional[str] = None, timeout: Optional[float] = None,
+                **params) -> str:
+    _count("calls")
+    kwargs = _params(model, timeout, params)
+    for attempt in range(RETRIES + 1):
+        try:
+            res = await async_client().chat.completions.create(messages=messages, **kwargs)
+            return res.choices[0].message.content or ""
+        except LLMError:
+            raise
+        except Exception as e:
+            if attempt >= RETRIES or not _retryable(e):
+                raise _fail(e) from e
+            _count("retries")
+            await asyncio.sleep(_delay(attempt, e))
+
+async def achat_stream(messages: List[Dict[str, str]], model: Optional[str] = None, timeout: Optional[float] = None,
+                       **params) -> AsyncIterator[str]:
+    _count("calls")
+    kwargs = _params(model, timeout, params)
+    for attempt in range(RETRIES + 1):
+        started = False
+        try:
+            stream = await async_client().chat.completions.create(messages=messages, stream=True, **kwargs)
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    started = True
+                    yield delta
+            return
+        except LLMError:
+            raise
+        except Exception as e:
+            if started or attempt >= RETRIES or not _retryable(e):
+                raise _fail(e) from e
+            _count("retries")
+            await asyncio.sleep(_delay(attempt, e))
+
+def ask(prompt: str, **kwargs) -> str:
+    """프롬프트 1개짜리 대화 (views.py 의 대부분)"""
+    return chat(prompts.messages(prompt), **kwargs)
+
+def ask_stream(prompt: str, **kwargs) -> Iterator[str]:
+    """ask 의 스트리밍 버전 (st.write_stream 에 그대로 넘김)"""
+    return chat_stream(prompts.messages(prompt), **kwargs)
+
+def ask_many(prompt_list: List[str], concurrency: Optional[int] = None,
+             **kwargs) -> Iterator[Tuple[int, Optional[str], Optional[LLMError]]]:
+    """여러 프롬프트를 최대 concurrency 개씩 동시에. 끝나는 순서대로 (번호, 답변, 오류)
+    중간에 그만 읽으면 (Streamlit 재실행 등) 아직 시작 안 한 요청은 취소한다."""
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency or CONCURRENCY), thread_name_prefix="owners-llm")
+    try:
+        futures = {executor.submit(ask, p, **kwargs): i for i, p in enumerate(prompt_list)}
+        for fut in as_completed(futures):
+            try:
+                yield futures[fut], fut.result(), None
+            except LLMError as e:
+                yield futures[fut], None, e
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def stats() -> Dict[str, Any]:
+    return {**_stats, "cache": llm_cache.stats()}
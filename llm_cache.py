@@ -0,0 +1,133 @@
+"""
+LLM 응답 캐시 (SQLite, 메인 DB 의 llm_cache 테이블 - migrations 0011).
+
+플레이스 키워드 / 길 안내 / 주차 안내처럼 같은 매장 정보로 글자 하나 다르지 않은 프롬프트를
+여러 번 생성하는 기능은, 같은 요청이면 저장해 둔 답변을 바로 돌려준다 (LLM 왕복 X).
+
+- 키: sha256(모델, 정규화한 메시지, 파라미터). 줄 끝 공백 / 줄바꿈 형식 차이는 같은 프롬프트로 본다
+- 기능별 opt-in: llm.chat(..., cache="place_keywords") 처럼 기능 이름을 넘기고,
+  그 이름이 OWNERS_LLM_CACHE_FEATURES 에 있을 때만 캐시를 쓴다
+- refresh=True ("다시 생성" 버튼) 는 캐시를 읽지 않고 새로 받아서 덮어쓴다
+- 캐시 DB 오류는 생성 실패로 만들지 않고 miss 로 처리
+- hit 은 읽기만 한다. last_hit_at 은 TOUCH 초보다 오래됐을 때만 갱신 (hit 마다 UPDATE 하면
+  여러 프로세스의 hit 이 전부 쓰기 락을 잡아서 직렬화됨). 그래서 last_hit_at / hits 컬럼은 TOUCH 단위
+  어림값이고, 정확한 hit 수는 stats() 를 볼 것
+
+    OWNERS_LLM_CACHE_FEATURES   place_keywords,way_guide,parking_guide   쉼표 구분, "*" = 전부, "" = 끔
+    OWNERS_LLM_CACHE_TTL        604800   초 (7일). 지나면 miss
+    OWNERS_LLM_CACHE_MAX        5000     최대 행 수. 넘으면 가장 오래 안 쓴 것부터 지움
+    OWNERS_LLM_CACHE_TOUCH      600      초. hit 때 last_hit_at 이 이보다 오래됐으면 갱신
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import database
+
+FEATURES = {f.strip() for f in os.environ.get(
+    "OWNERS_LLM_CACHE_FEATURES", "place_keywords,way_guide,parking_guide").split(",") if f.strip()}
+TTL = float(os.environ.get("OWNERS_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+MAX_ROWS = int(os.environ.get("OWNERS_LLM_CACHE_MAX", "5000"))
+TOUCH = float(os.environ.get("OWNERS_LLM_CACHE_TOUCH", "600"))
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "bypassed": 0, "stored": 0, "evicted": 0, "errors": 0, "touched": 0}
+_hit_ms_total = 0.0
+
+
+def enabled(feature: Optional[str]) -> bool:
+    return bool(feature) and MAX_ROWS > 0 and ("*" in FEATURES or feature in FEATURES)
+
+
+def _normalize(text: str) -> str:
+    return "\n".join(line.rstrip() for line in text.replace("\r\n", "\n").strip().split("\n"))
+
+
+def key(model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+    payload = {
+        "model": model,
+        "messages": [{"role": m["role"], "content": _normalize(m["content"] or "")} for m in messages],
+        "params": params,
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _count(name: str, n: int = 1):
+    with _lock:
+        _stats[name] += n
+
+
+def get(cache_key: str) -> Optional[str]:
+    global _hit_ms_total
+    started = time.perf_counter()
+    now = time.time()
+    try:
+        with database.get_db() as conn:
+            row = conn.execute("SELECT response, last_hit_at FROM llm_cache WHERE key=? AND created_at >= ?",
+                               (cache_key, now - TTL)).fetchone()
+            # SELECT 만 하면 쓰기 락을 안 잡음. 갱신은 TOUCH 에 한 번 (동시에 여러 곳이 hit 해도 조건으로 한 번만)
+            touched = row is not None and row[1] < now - TOUCH and conn.execute(
+                "UPDATE llm_cache SET last_hit_at=?, hits=hits+1 WHERE key=? AND last_hit_at < ?",
+                (now, cache_key, now - TOUCH)).rowcount
+    except sqlite3.Error:
+        _count("errors")
+        return None
+    if row is None:
+        _count("misses")
+        return None
+    with _lock:
+        _stats["hits"] += 1
+        _stats["touched"] += 1 if touched else 0
+        _hit_ms_total += (time.perf_counter() - started) * 1000
+    return row[0]
+
+
+def bypassed():
+    _count("bypassed")
+
+
+def put(cache_key: str, feature: str, model: str, response: str):
+    if not response:
+        return
+    now = time.time()
+    try:
+        with database.get_db() as conn:
+            conn.execute("""
+                INSERT INTO llm_cache (key, feature, model, response, created_at, last_hit_at, hits)
+                VALUES (?, ?, ?, ?, ?, ?, 0)
+                ON CONFLICT(key) DO UPDATE SET
+                    response=excluded.response, created_at=excluded.created_at, last_hit_at=excluded.last_hit_at
+            """, (cache_key, feature, model, response, now, now))
+            evicted = _evict(conn, now)
+    except sqlite3.Error:
+        _count("errors")
+        return
+    _count("stored")
+    if evicted:
+        _count("evicted", evicted)
+
+
+def _evict(conn: sqlite3.Connection, now: float) -> int:
+    n = conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - TTL, )).rowcount
+    n += conn.execute("""
+        DELETE FROM llm_cache WHERE key IN (
+            SELECT key FROM llm_cache ORDER BY last_hit_at DESC LIMIT -1 OFFSET ?
+        )
+    """, (MAX_ROWS, )).rowcount
+    return n
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        out: Dict[str, Any] = dict(_stats)
+        hit_ms_total = _hit_ms_total
+    lookups = out["hits"] + out["misses"]
+    out["hit_rate"] = round(out["hits"] / lookups, 3) if lookups else 0.0
+    out["hit_ms_avg"] = round(hit_ms_total / out["hits"], 2) if out["hits"] else 0.0
+    out["features"] = sorted(FEATURES)
+    return out
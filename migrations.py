@@ -0,0 +1,630 @@
+"""
+버전 관리되는 스키마 마이그레이션.
+
+- schema_version 테이블에 적용된 버전을 기록하고, MIGRATIONS 를 순서대로 한 번씩만 적용
+- 프로세스당 DB 파일별로 한 번만 검사 (Streamlit rerun 마다 PRAGMA 조회 X)
+- 여러 프로세스(uvicorn 워커 + Streamlit)가 동시에 떠도 BEGIN IMMEDIATE 로 직렬화
+
+새 스키마 변경은 함수 하나를 만들고 MIGRATIONS 맨 끝에 (다음 번호, 이름, 함수)로 추가한다.
+이미 배포된 마이그레이션은 절대 수정하지 말 것.
+"""
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Callable, List, Set, Tuple
+
+import db_pool
+import history_blobs
+from url_canon import online_item_key
+
+log = logging.getLogger(__name__)
+
+
+def _has_column(conn, table: str, column: str) -> bool:
+    cols = [r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+    return column in cols
+
+def _add_column_if_missing(conn, table: str, column: str, ddl_type: str) -> bool:
+    if _has_column(conn, table, column):
+        return False
+    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}")
+    return True
+
+
+# ---------------------------------------------------------------
+# 0001: 기본 테이블 (구 init_db)
+# ---------------------------------------------------------------
+def _m0001_base_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            password TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS stores (
+            store_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT,
+            store_name TEXT,
+            category TEXT,
+            sub_category TEXT,
+            address TEXT,
+            target TEXT,
+            signature TEXT,
+            strengths TEXT,
+            keywords TEXT,
+            review_url TEXT,
+            insta_url TEXT,
+            FOREIGN KEY(username) REFERENCES users(username)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT,
+            store_id INTEGER,
+            feature TEXT,
+            title TEXT,
+            input_text TEXT,
+            output_text TEXT,
+            created_at TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS store_checklist (
+            store_id INTEGER PRIMARY KEY,
+            has_keywords INTEGER DEFAULT 0,
+            has_review_url INTEGER DEFAULT 0,
+            has_insta_url INTEGER DEFAULT 0,
+            has_place_desc INTEGER DEFAULT 0,
+            has_menu_guide INTEGER DEFAULT 0,
+            has_way_guide INTEGER DEFAULT 0,
+            has_parking_guide INTEGER DEFAULT 0,
+            has_hours INTEGER DEFAULT 0,
+            has_phone INTEGER DEFAULT 0,
+            has_address INTEGER DEFAULT 0,
+            has_news INTEGER DEFAULT 0,
+            last_review_reply_at TEXT,
+            last_insta_caption_at TEXT,
+            last_blog_post_at TEXT,
+            last_event_plan_at TEXT,
+            last_place_qa_at TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS favorites (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT,
+            store_id INTEGER,
+            group_name TEXT,
+            title TEXT,
+            content TEXT,
+            created_at TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS todo_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT,
+            store_id INTEGER,
+            todo_group TEXT,
+            todo_text TEXT,
+            status TEXT,      -- DONE / SKIP
+            created_at TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS app_state (
+            k TEXT PRIMARY KEY,
+            v TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS suppliers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            store_id INTEGER,
+            name TEXT,
+            phone TEXT,
+            items TEXT,
+            created_at TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS online_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            store_id INTEGER,
+            alias TEXT,       -- 예: 칵테일새우
+            mall_name TEXT,   -- 예: 쿠팡, 배민상회
+            url TEXT,         -- 상품 링크
+            memo TEXT,        -- 예: 2만원 이하면 사기
+            created_at TEXT
+        )
+    """)
+
+
+# ---------------------------------------------------------------
+# 0002: 그동안 init_db / fix_database_schema / ensure_online_items_price_columns
+#       에서 매번 검사하던 추가 컬럼들 (예전 DB 파일 호환)
+# ---------------------------------------------------------------
+_LEGACY_COLUMNS = [
+    ("stores", "sub_category", "TEXT"),
+
+    ("store_checklist", "review_sync_at", "TEXT"),
+    ("store_checklist", "review_unreplied_count", "INTEGER DEFAULT -1"),
+    ("store_checklist", "review_sync_status", "TEXT"),
+    ("store_checklist", "review_sync_nonce", "TEXT"),
+    ("store_checklist", "last_ad_analysis_at", "TEXT"),
+    ("store_checklist", "last_place_news_at", "TEXT"),
+    ("store_checklist", "has_menu_guide", "INTEGER DEFAULT 0"),
+    ("store_checklist", "has_hours", "INTEGER DEFAULT 0"),
+    ("store_checklist", "has_phone", "INTEGER DEFAULT 0"),
+    ("store_checklist", "has_address", "INTEGER DEFAULT 0"),
+    ("store_checklist", "has_news", "INTEGER DEFAULT 0"),
+    ("store_checklist", "audit_json", "TEXT"),
+    ("store_checklist", "last_scout_at", "TEXT"),
+
+    ("online_items", "is_fixed", "INTEGER DEFAULT 0"),
+    ("online_items", "mode", "TEXT DEFAULT 'search'"),
+    ("online_items", "query", "TEXT"),
+    ("online_items", "price_sync_at", "TEXT"),
+    ("online_items", "price_sync_status", "TEXT"),
+    ("online_items", "price_sync_nonce", "TEXT"),
+    ("online_items", "last_opened_at", "TEXT"),
+    ("online_items", "last_confirmed_at", "TEXT"),
+    ("online_items", "last_confirmed_price", "INTEGER"),
+    ("online_items", "last_confirmed_title", "TEXT"),
+    ("online_items", "last_confirmed_url", "TEXT"),
+]
+
+def _m0002_legacy_columns(conn):
+    for table, column, ddl_type in _LEGACY_COLUMNS:
+        _add_column_if_missing(conn, table, column, ddl_type)
+    # 날짜 칸은 기존 행을 '지금'으로 채워서 추가 (구 fix_database_schema 동작)
+    if _add_column_if_missing(conn, "online_items", "last_updated", "TEXT"):
+        conn.execute("UPDATE online_items SET last_updated=? WHERE last_updated IS NULL",
+                     (datetime.now().isoformat(), ))
+
+
+# ---------------------------------------------------------------
+# 0003: 자주 쓰는 조회용 보조 인덱스 (index_advisor.py 로 검증)
+#   stores.store_id / history·suppliers·online_items.id 는 rowid 이므로 인덱스 끝에 id 를
+#   따로 넣지 않아도 같은 키 안에서는 id 순서로 정렬되어 있다.
+# ---------------------------------------------------------------
+_INDEXES = [
+    # get_user_stores: WHERE username=? ORDER BY store_id
+    "CREATE INDEX IF NOT EXISTS idx_stores_username ON stores(username)",
+    # get_recent_history: WHERE username=? AND store_id=? [AND feature=?] ORDER BY id DESC
+    "CREATE INDEX IF NOT EXISTS idx_history_user_store ON history(username, store_id)",
+    "CREATE INDEX IF NOT EXISTS idx_history_user_store_feature ON history(username, store_id, feature)",
+    # get_suppliers: WHERE store_id=? ORDER BY id DESC
+    "CREATE INDEX IF NOT EXISTS idx_suppliers_store ON suppliers(store_id)",
+    # get_online_items(order="recent") / count / 중복 정리: WHERE store_id=? ORDER BY is_fixed DESC, id DESC
+    "CREATE INDEX IF NOT EXISTS idx_online_items_store_fixed ON online_items(store_id, is_fixed)",
+    # get_online_items(order="alias"): WHERE store_id=? ORDER BY is_fixed DESC, alias ASC
+    "CREATE INDEX IF NOT EXISTS idx_online_items_store_fixed_alias ON online_items(store_id, is_fixed DESC, alias)",
+    # get_today_done_groups: WHERE username=? AND store_id=? AND status='DONE' ...
+    "CREATE INDEX IF NOT EXISTS idx_todo_events_user_store_status ON todo_events(username, store_id, status, created_at)",
+]
+
+def _m0003_hot_query_indexes(conn):
+    for ddl in _INDEXES:
+        conn.execute(ddl)
+
+
+# ---------------------------------------------------------------
+# 0004: history 전문 검색 (FTS5 trigram)
+#   - trigram 이라 한글도 부분 문자열(3글자 이상)로 검색됨
+#   - 외부 콘텐츠(view) 방식: 본문은 history 에만 저장, FTS 에는 색인만
+#   - scope 컬럼에 사용자/매장 구분자를 넣어 MATCH 단계에서 매장별로 좁힘
+#   - FTS5/trigram 미지원 SQLite 면 건너뛰고 LIKE 검색으로 동작
+# ---------------------------------------------------------------
+HISTORY_SCOPE_SQL = "char(31) || {t}.username || char(30) || {t}.store_id || char(31)"
+
+def _m0004_history_fts(conn):
+    try:
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5("
+            "title, input_text, output_text, scope, "
+            "content='history_fts_src', content_rowid='id', tokenize='trigram')")
+    except sqlite3.OperationalError as e:
+        log.warning("FTS5 trigram 미지원, 전문 검색 생략: %s", e)
+        return
+    conn.execute(f"""
+        CREATE VIEW IF NOT EXISTS history_fts_src AS
+        SELECT id, title, input_text, output_text, {HISTORY_SCOPE_SQL.format(t="history")} AS scope
+        FROM history
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS history_fts_ai AFTER INSERT ON history BEGIN
+            INSERT INTO history_fts(rowid, title, input_text, output_text, scope)
+            VALUES (new.id, new.title, new.input_text, new.output_text, {HISTORY_SCOPE_SQL.format(t="new")});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS history_fts_ad AFTER DELETE ON history BEGIN
+            INSERT INTO history_fts(history_fts, rowid, title, input_text, output_text, scope)
+            VALUES ('delete', old.id, old.title, old.input_text, old.output_text, {HISTORY_SCOPE_SQL.format(t="old")});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS history_fts_au AFTER UPDATE ON history BEGIN
+            INSERT INTO history_fts(history_fts, rowid, title, input_text, output_text, scope)
+            VALUES ('delete', old.id, old.title, old.input_text, old.output_text, {HISTORY_SCOPE_SQL.format(t="old")});
+            INSERT INTO history_fts(rowid, title, input_text, output_text, scope)
+            VALUES (new.id, new.title, new.input_text, new.output_text, {HISTORY_SCOPE_SQL.format(t="new")});
+        END
+    """)
+    # 기존 history 행 색인
+    conn.execute("INSERT INTO history_fts(history_fts) VALUES ('rebuild')")
+
+
+# ---------------------------------------------------------------
+# 0005: online_items.canonical_url + (store_id, canonical_url) UNIQUE
+#   - 추적 파라미터/모바일 주소 차이를 없앤 URL (URL 이 없으면 "alias:상품명")
+#   - 기존 중복은 지우지 않고 최신 행(id 가 큰 쪽)만 값을 받는다.
+#     나머지는 NULL 로 남고 '중복 링크 정리'(dedupe_online_items) 때 삭제됨
+# ---------------------------------------------------------------
+def _m0005_online_items_canonical_url(conn):
+    _add_column_if_missing(conn, "online_items", "canonical_url", "TEXT")
+    seen = set()
+    updates = []
+    for r in conn.execute("SELECT id, store_id, alias, url FROM online_items ORDER BY id DESC").fetchall():
+        k = (r[1], online_item_key(r[2], r[3]))
+        if k in seen:
+            continue
+        seen.add(k)
+        updates.append((k[1], r[0]))
+    conn.executemany("UPDATE online_items SET canonical_url=? WHERE id=?", updates)
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_online_items_store_canonical "
+        "ON online_items(store_id, canonical_url)")
+
+
+# ---------------------------------------------------------------
+# 0006: history 보관(archive) 테이블 (retention.py)
+#   - 오래된 history 행을 옮겨 담는 곳. 본문은 zlib 압축 BLOB, 나머지 컬럼은 그대로
+#   - id 는 history 의 id 그대로 (AUTOINCREMENT 라 재사용되지 않음)
+#   - FTS 색인에는 없음 (history 에서 지워질 때 트리거가 색인도 지움)
+# ---------------------------------------------------------------
+def _m0006_history_archive(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS history_archive (
+            id INTEGER PRIMARY KEY,
+            username TEXT,
+            store_id INTEGER,
+            feature TEXT,
+            title TEXT,
+            input_z BLOB,
+            output_z BLOB,
+            created_at TEXT,
+            archived_at TEXT
+        )
+    """)
+    # get_recent_history(include_archive=True): WHERE username=? AND store_id=? ... ORDER BY id DESC
+    # (자주 안 읽으므로 feature 는 인덱스 없이 걸러냄)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_history_archive_user_store ON history_archive(username, store_id)")
+    # 보관 대상 찾기: WHERE created_at < ? [AND feature ...] - 오래된 행만 범위로 읽음
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_history_created ON history(created_at)")
+
+
+# ---------------------------------------------------------------
+# 0007: history 본문을 history_blobs 로 (history_blobs.py)
+#   - history / history_archive 에 input_ref, output_ref (sha256) 추가, 기존 본문은 옮기고 비움
+#   - history_full / history_archive_full 뷰: 예전과 같은 컬럼(input_text, output_text)으로 풀어서 보여줌
+#   - refcount 트리거 + FTS 트리거/뷰를 본문 참조 기준으로 다시 만듦
+#     (색인 내용 자체는 같으므로 FTS rebuild 는 필요 없음)
+#   - 뷰(history_full / history_archive_full / history_fts_src)는 history_unpack SQL 함수를 부르므로
+#     db_pool 로 연 커넥션에서만 읽을 수 있다 (sqlite3 CLI 등에서는 "no such function").
+#     FTS 트리거도 같은 이유로 0012 에서 없앰
+# ---------------------------------------------------------------
+def _history_text_sql(t: str, col: str) -> str:
+    return (f"COALESCE({t}.{col}_text, "
+            f"(SELECT history_unpack(body) FROM history_blobs WHERE hash = {t}.{col}_ref))")
+
+def _m0007_history_blobs(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS history_blobs (
+            hash TEXT PRIMARY KEY,
+            body BLOB NOT NULL,
+            raw_size INTEGER,
+            refcount INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    # gc(): WHERE refcount <= 0
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_history_blobs_orphan ON history_blobs(refcount) WHERE refcount <= 0")
+    for table in ("history", "history_archive"):
+        _add_column_if_missing(conn, table, "input_ref", "TEXT")
+        _add_column_if_missing(conn, table, "output_ref", "TEXT")
+
+    has_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name='history_fts'").fetchone() is not None
+    for trg in ("history_fts_ai", "history_fts_ad", "history_fts_au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trg}")
+
+    # 기존 본문 옮기기 (트리거 없이, refcount 는 여기서 직접 계산)
+    def move(table: str, read_sql: str, unpack):
+        rows = conn.execute(read_sql).fetchall()
+        for row_id, input_v, output_v in rows:
+            refs = []
+            for v in (unpack(input_v), unpack(output_v)):
+                h = history_blobs.put(conn, v)
+                if h:
+                    conn.execute("UPDATE history_blobs SET refcount = refcount + 1 WHERE hash=?", (h, ))
+                refs.append(h)
+            conn.execute(f"UPDATE {table} SET input_ref=?, output_ref=? WHERE id=?", (*refs, row_id))
+        return len(rows)
+    move("history", "SELECT id, input_text, output_text FROM history WHERE input_ref IS NULL AND output_ref IS NULL",
+         lambda v: v)
+    conn.execute("UPDATE history SET input_text=NULL, output_text=NULL WHERE input_ref IS NOT NULL OR output_ref IS NOT NULL")
+    move("history_archive", "SELECT id, input_z, output_z FROM history_archive WHERE input_ref IS NULL AND output_ref IS NULL",
+         history_blobs.history_unpack)
+    conn.execute("UPDATE history_archive SET input_z=NULL, output_z=NULL WHERE input_ref IS NOT NULL OR output_ref IS NOT NULL")
+
+    conn.execute("""
+        CREATE VIEW IF NOT EXISTS history_full AS
+        SELECT h.id, h.username, h.store_id, h.feature, h.title,
+               COALESCE(h.input_text, history_unpack(bi.body)) AS input_text,
+               COALESCE(h.output_text, history_unpack(bo.body)) AS output_text,
+               h.created_at
+        FROM history h
+        LEFT JOIN history_blobs bi ON bi.hash = h.input_ref
+        LEFT JOIN history_blobs bo ON bo.hash = h.output_ref
+    """)
+    conn.execute("""
+        CREATE VIEW IF NOT EXISTS history_archive_full AS
+        SELECT a.id, a.username, a.store_id, a.feature, a.title,
+               COALESCE(history_unpack(a.input_z), history_unpack(bi.body)) AS input_text,
+               COALESCE(history_unpack(a.output_z), history_unpack(bo.body)) AS output_text,
+               a.created_at
+        FROM history_archive a
+        LEFT JOIN history_blobs bi ON bi.hash = a.input_ref
+        LEFT JOIN history_blobs bo ON bo.hash = a.output_ref
+    """)
+
+    for table in ("history", "history_archive"):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_blob_ai AFTER INSERT ON {table} BEGIN
+                UPDATE history_blobs SET refcount = refcount + 1 WHERE hash = new.input_ref;
+                UPDATE history_blobs SET refcount = refcount + 1 WHERE hash = new.output_ref;
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_blob_ad AFTER DELETE ON {table} BEGIN
+                UPDATE history_blobs SET refcount = refcount - 1 WHERE hash = old.input_ref;
+                UPDATE history_blobs SET refcount = refcount - 1 WHERE hash = old.output_ref;
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_blob_au AFTER UPDATE OF input_ref, output_ref ON {table} BEGIN
+                UPDATE history_blobs SET refcount = refcount - 1 WHERE hash = old.input_ref;
+                UPDATE history_blobs SET refcount = refcount - 1 WHERE hash = old.output_ref;
+                UPDATE history_blobs SET refcount = refcount + 1 WHERE hash = new.input_ref;
+                UPDATE history_blobs SET refcount = refcount + 1 WHERE hash = new.output_ref;
+            END
+        """)
+
+    if not has_fts:
+        return
+    conn.execute("DROP VIEW IF EXISTS history_fts_src")
+    conn.execute(f"""
+        CREATE VIEW history_fts_src AS
+        SELECT h.id, h.title,
+               COALESCE(h.input_text, history_unpack(bi.body)) AS input_text,
+               COALESCE(h.output_text, history_unpack(bo.body)) AS output_text,
+               {HISTORY_SCOPE_SQL.format(t="h")} AS scope
+        FROM history h
+        LEFT JOIN history_blobs bi ON bi.hash = h.input_ref
+        LEFT JOIN history_blobs bo ON bo.hash = h.output_ref
+    """)
+    new_cols = f"new.title, {_history_text_sql('new', 'input')}, {_history_text_sql('new', 'output')}"
+    old_cols = f"old.title, {_history_text_sql('old', 'input')}, {_history_text_sql('old', 'output')}"
+    conn.execute(f"""
+        CREATE TRIGGER history_fts_ai AFTER INSERT ON history BEGIN
+            INSERT INTO history_fts(rowid, title, input_text, output_text, scope)
+            VALUES (new.id, {new_cols}, {HISTORY_SCOPE_SQL.format(t="new")});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER history_fts_ad AFTER DELETE ON history BEGIN
+            INSERT INTO history_fts(history_fts, rowid, title, input_text, output_text, scope)
+            VALUES ('delete', old.id, {old_cols}, {HISTORY_SCOPE_SQL.format(t="old")});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER history_fts_au AFTER UPDATE ON history BEGIN
+            INSERT INTO history_fts(history_fts, rowid, title, input_text, output_text, scope)
+            VALUES ('delete', old.id, {old_cols}, {HISTORY_SCOPE_SQL.format(t="old")});
+            INSERT INTO history_fts(rowid, title, input_text, output_text, scope)
+            VALUES (new.id, {new_cols}, {HISTORY_SCOPE_SQL.format(t="new")});
+        END
+    """)
+
+
+# ---------------------------------------------------------------
+# 0008: todo_events.event_date (YYYY-MM-DD, created_at 의 날짜 부분)
+#   - get_today_done_groups 가 substr(created_at, 1, 10) 대신 event_date = ? 로 찾게
+#   - 생성 컬럼 대신 일반 컬럼: shard_tool split 이 모든 컬럼을 그대로 INSERT 하므로
+#   - 기존 (username, store_id, status, created_at) 인덱스는 이 조회 전용이라 새 인덱스로 대체
+# ---------------------------------------------------------------
+def _m0008_todo_event_date(conn):
+    _add_column_if_missing(conn, "todo_events", "event_date", "TEXT")
+    conn.execute("UPDATE todo_events SET event_date = substr(created_at, 1, 10) WHERE event_date IS NULL")
+    conn.execute("DROP INDEX IF EXISTS idx_todo_events_user_store_status")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_todo_events_user_store_date "
+        "ON todo_events(username, store_id, event_date, status)")
+
+
+# ---------------------------------------------------------------
+# 0009: 가격 관측 기록 (set_price_sync_result 의 OK 결과마다 1행)
+#   - price_observations: 원본 시계열 (append-only)
+#   - price_daily: 상품별 하루 단위 min/max/sum/n. 관측 INSERT 트리거가 바로 누적하므로
+#     7/30/90일 통계는 원본 대신 하루 1행짜리 집계만 읽는다 (database.get_price_stats)
+#   - 링크가 지워지면 (삭제/전체 삭제/중복 정리 모두) 트리거로 같이 지움
+# ---------------------------------------------------------------
+def _m0009_price_observations(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS price_observations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_id INTEGER NOT NULL,
+            store_id INTEGER,
+            observed_at TEXT NOT NULL,
+            price INTEGER,
+            title TEXT,
+            url TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_price_observations_item ON price_observations(item_id, observed_at)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS price_daily (
+            item_id INTEGER NOT NULL,
+            store_id INTEGER,
+            day TEXT NOT NULL,
+            min_price INTEGER,
+            max_price INTEGER,
+            sum_price INTEGER,
+            n INTEGER,
+            PRIMARY KEY (item_id, day)
+        )
+    """)
+    # get_price_stats: WHERE store_id=? AND day >= ?
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_price_daily_store_day ON price_daily(store_id, day)")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS price_observations_ai AFTER INSERT ON price_observations
+        WHEN new.price IS NOT NULL BEGIN
+            INSERT INTO price_daily (item_id, store_id, day, min_price, max_price, sum_price, n)
+            VALUES (new.item_id, new.store_id, substr(new.observed_at, 1, 10), new.price, new.price, new.price, 1)
+            ON CONFLICT(item_id, day) DO UPDATE SET
+                min_price = MIN(min_price, excluded.min_price),
+                max_price = MAX(max_price, excluded.max_price),
+                sum_price = sum_price + excluded.sum_price,
+                n = n + 1;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS online_items_price_ad AFTER DELETE ON online_items BEGIN
+            DELETE FROM price_observations WHERE item_id = old.id;
+            DELETE FROM price_daily WHERE item_id = old.id;
+        END
+    """)
+    # 지금까지 확인된 마지막 가격을 첫 관측으로
+    conn.execute("""
+        INSERT INTO price_observations (item_id, store_id, observed_at, price, title, url)
+        SELECT id, store_id, last_confirmed_at, last_confirmed_price, last_confirmed_title, last_confirmed_url
+        FROM online_items
+        WHERE last_confirmed_price IS NOT NULL AND last_confirmed_at IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM price_observations p WHERE p.item_id = online_items.id)
+    """)
+
+
+# ---------------------------------------------------------------
+# 0010: stores / store_checklist 행 버전 (rev)
+#   - 행이 바뀔 때마다 트리거가 +1 (UPSERT 의 DO UPDATE 포함)
+#   - /api/dashboard 가 본문을 다시 계산하지 않고 ETag 를 만들 수 있게
+#   - WHEN new.rev = old.rev: 트리거 자신의 UPDATE 로 다시 올라가지 않게
+# ---------------------------------------------------------------
+def _m0010_row_versions(conn):
+    for table, key in (("stores", "store_id"), ("store_checklist", "store_id")):
+        _add_column_if_missing(conn, table, "rev", "INTEGER NOT NULL DEFAULT 0")
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_rev_au AFTER UPDATE ON {table}
+            WHEN new.rev = old.rev BEGIN
+                UPDATE {table} SET rev = old.rev + 1 WHERE {key} = new.{key};
+            END
+        """)
+
+
+# ---------------------------------------------------------------
+# 0011: LLM 응답 캐시 (llm_cache.py)
+#   - key = sha256(모델, 정규화한 메시지, 파라미터). 메인 DB 에만 쓰지만 스키마는 모든 파일이 같게
+#   - last_hit_at: LRU 로 지울 순서 / created_at: TTL 만료
+# ---------------------------------------------------------------
+def _m0011_llm_cache(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            feature TEXT,
+            model TEXT,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_hit_at REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_hit ON llm_cache(last_hit_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache(created_at)")
+
+
+# ---------------------------------------------------------------
+# 0012: history FTS 트리거 제거 (색인은 database.py 가 직접 갱신)
+#   - 0007 의 FTS 트리거는 history_unpack 을 불러서, 함수가 없는 커넥션(sqlite3 CLI, 백업/복구 스크립트)
+#     에서는 history INSERT/DELETE 자체가 실패했다. 남는 트리거는 refcount 만 세는 순수 SQL
+#   - 색인 추가: save_history (본문을 이미 알고 있음) / 삭제: retention 이 지우기 전에 unindex_history
+#   - 앱 밖에서 history 를 직접 고쳤다면 색인이 어긋날 수 있음 → rebuild_history_fts (또는
+#     db_pool 커넥션에서 INSERT INTO history_fts(history_fts) VALUES ('rebuild'))
+# ---------------------------------------------------------------
+def _m0012_history_fts_no_triggers(conn):
+    for trg in ("history_fts_ai", "history_fts_ad", "history_fts_au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trg}")
+
+
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "base_tables", _m0001_base_tables),
+    (2, "legacy_columns", _m0002_legacy_columns),
+    (3, "hot_query_indexes", _m0003_hot_query_indexes),
+    (4, "history_fts", _m0004_history_fts),
+    (5, "online_items_canonical_url", _m0005_online_items_canonical_url),
+    (6, "history_archive", _m0006_history_archive),
+    (7, "history_blobs", _m0007_history_blobs),
+    (8, "todo_event_date", _m0008_todo_event_date),
+    (9, "price_observations", _m0009_price_observations),
+    (10, "row_versions", _m0010_row_versions),
+    (11, "llm_cache", _m0011_llm_cache),
+    (12, "history_fts_no_triggers", _m0012_history_fts_no_triggers),
+]
+
+
+def current_version(conn) -> int:
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+def migrate(path: str) -> int:
+    """대기 중인 마이그레이션을 적용하고 최종 버전을 반환."""
+    with db_pool.connection(path) as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT,
+                applied_at TEXT
+            )
+        """)
+        for version, name, fn in MIGRATIONS:
+            if version <= current_version(conn):
+                continue
+            # 다른 프로세스와 경쟁할 수 있으므로 쓰기 락을 잡은 뒤 한 번 더 확인
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if version > current_version(conn):
+                    fn(conn)
+                    conn.execute(
+                        "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                        (version, name, datetime.now().isoformat()))
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return current_version(conn)
+
+
+_done: Set[str] = set()
+_lock = threading.Lock()
+
+def ensure_schema(path: str):
+    """프로세스당 한 번만 migrate() 실행. 이후 호출은 set 조회 1번."""
+    if path in _done:
+        return
+    with _lock:
+        if path in _done:
+            return
+        migrate(path)
+        _done.add(path)
@@ -0,0 +1,119 @@
+"""
+주문 입력 → 후보 거래처/링크 고르기 (render_order 프롬프트 크기 제한용).
+
+예전에는 등록된 거래처/링크 전부를 프롬프트에 넣어서, 목록이 길수록 토큰/지연/비용이 같이 늘었다.
+여기서 주문 줄마다 거래처 취급품목 / 링크 별칭과 문자 n-gram 으로 점수를 매겨
+줄마다 상위 TOP_K 개만 남긴다. 주문 줄 수도 MAX_LINES 로 자르므로 프롬프트 크기는 목록 크기와 무관하다.
+
+- 점수: 글자 2-gram Dice 계수 (띄어쓰기/수량/단위 제거 후). 한쪽이 다른 쪽을 그대로 포함하면 1.0
+  ('생연어3' ↔ '연어', '위생장갑' ↔ '니트릴 위생장갑 100매')
+- 1글자 품목('회', '김')은 그 글자 자체를 gram 으로 (포함 여부로만 맞음)
+- 후보는 n-gram 역색인으로만 찾음 (공통 글자가 하나도 없는 항목은 점수 계산 X)
+
+    OWNERS_ORDER_TOP_K        5     주문 줄 1개당 거래처/링크 각각 최대 후보 수
+    OWNERS_ORDER_MIN_SCORE    0.2   이보다 낮으면 후보에서 뺌
+    OWNERS_ORDER_MAX_LINES    30    주문 줄 최대 개수 (넘는 줄은 후보 검색 X)
+
+벤치마크: python bench_order.py
+"""
+import os
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Mapping, Sequence, Set, Tuple
+
+TOP_K = int(os.environ.get("OWNERS_ORDER_TOP_K", "5"))
+MIN_SCORE = float(os.environ.get("OWNERS_ORDER_MIN_SCORE", "0.2"))
+MAX_LINES = int(os.environ.get("OWNERS_ORDER_MAX_LINES", "30"))
+
+# 주문 줄 나누기: 쉼표/줄바꿈/'그리고'/'및'/'랑'
+_LINE_SPLIT_RE = re.compile(r"[,\n;/]+|\s+(?:그리고|및)\s+|(?<=\S)(?:이랑|랑)\s+")
+# 수량 + 단위, 요청 문구 (품목 이름이 아닌 부분)
+_QTY_RE = re.compile(r"\d+(?:[.,]\d+)?\s*(?:kg|g|l|ml|개|박스|box|봉|봉지|팩|병|캔|마리|판|묶음|포|통|매|장|세트|ea|키로|근|상자|짝|단)?",
+                     re.IGNORECASE)
+_NOISE_RE = re.compile(r"(?:에서|에)(?=\s|$)|링크|찾아\s*줘|찾아|주문|부탁|해\s*줘|주세요")
+_KEEP_RE = re.compile(r"[^0-9a-z가-힣]+")
+
+
+def normalize(text: str) -> str:
+    text = _QTY_RE.sub(" ", (text or "").lower())
+    text = _NOISE_RE.sub(" ", text)
+    return _KEEP_RE.sub("", text)
+
+
+def _grams(t: str) -> Set[str]:
+    return {t[i:i + 2] for i in range(len(t) - 1)} or {t}
+
+
+def grams(text: str) -> Set[str]:
+    return _grams(normalize(text))
+
+
+def _score(q: str, qg: Set[str], t: str, tg: Set[str]) -> float:
+    if not q or not t:
+        return 0.0
+    if t in q or q in t:
+        return 1.0
+    return 2 * len(qg & tg) / (len(qg) + len(tg))
+
+
+def score(query: str, term: str) -> float:
+    q, t = normalize(query), normalize(term)
+    return _score(q, _grams(q), t, _grams(t))
+
+
+def split_lines(order_text: str) -> List[str]:
+    return [p.strip() for p in _LINE_SPLIT_RE.split(order_text or "") if normalize(p)][:MAX_LINES]
+
+
+class _Index:
+    """항목마다 검색어 여러 개 (거래처: 이름 + 취급품목 각각, 링크: 별칭)"""
+
+    def __init__(self, terms_per_row: Sequence[Iterable[str]]):
+        self.terms: List[Tuple[int, str, Set[str]]] = []
+        self.postings: Dict[str, Set[int]] = defaultdict(set)
+        for row_idx, terms in enumerate(terms_per_row):
+            for term in terms:
+                t = normalize(term)
+                if not t:
+                    continue
+                tg = _grams(t)
+                term_idx = len(self.terms)
+                self.terms.append((row_idx, t, tg))
+                for g in tg:
+                    self.postings[g].add(term_idx)
+
+    def top(self, line: str, k: int) -> List[Tuple[float, int]]:
+        q = normalize(line)
+        qg = _grams(q)
+        candidates: Set[int] = set()
+        for g in qg | set(q):  # 글자 1개도 찾아야 1글자 품목이 걸림
+            candidates |= self.postings.get(g, set())
+        best: Dict[int, float] = {}
+        for term_idx in candidates:
+            row_idx, t, tg = self.terms[term_idx]
+            s = _score(q, qg, t, tg)
+            if s >= MIN_SCORE and s > best.get(row_idx, 0.0):
+                best[row_idx] = s
+        return sorted(((s, r) for r, s in best.items()), key=lambda x: (-x[0], x[1]))[:k]
+
+
+def supplier_terms(s: Mapping[str, Any]) -> List[str]:
+    items = [i.strip() for i in re.split(r"[,/·\n]+", s["items"] or "") if i.strip()]
+    return [s["name"] or ""] + items
+
+
+def link_terms(l: Mapping[str, Any]) -> List[str]:
+    return [l["alias"] or ""]
+
+
+def select_candidates(order_text: str, suppliers: Sequence[Mapping[str, Any]], links: Sequence[Mapping[str, Any]],
+                      k: int = TOP_K) -> Tuple[List[Mapping[str, Any]], List[Mapping[str, Any]]]:
+    """주문 줄마다 상위 k 개씩 모은 (거래처, 링크). 원래 목록 순서 유지"""
+    lines = split_lines(order_text)
+    sup_idx, link_idx = _Index([supplier_terms(s) for s in suppliers]), _Index([link_terms(l) for l in links])
+    keep_sup: Set[int] = set()
+    keep_link: Set[int] = set()
+    for line in lines:
+        keep_sup.update(r for _, r in sup_idx.top(line, k))
+        keep_link.update(r for _, r in link_idx.top(line, k))
+    return [suppliers[i] for i in sorted(keep_sup)], [links[i] for i in sorted(keep_link)]
@@ -0,0 +1,138 @@
+"""
+콘텐츠 생성 프롬프트 (views.py 와 api.py 가 같이 씀).
+
+문구를 바꾸면 Streamlit 화면과 API(/api/generate/..., Next.js / mobile_app) 결과가 같이 바뀐다.
+매장 정보는 stores 행의 값을 그대로 받는다 (cat_label 은 category_label() 로 만든 값).
+"""
+from typing import Any, Mapping, Optional
+
+MODEL = "gpt-4o-mini"
+
+REVIEW_TONES = [
+    "🥰 친절하고 감성적으로 (이모지 포함)", "👔 정중하고 전문적으로 (신뢰감)",
+    "🤣 유쾌하고 위트있게 (동네 형/누나처럼)", "🛡️ 클레임 대응 (차분하고 공감하며)",
+]
+REVIEW_LENGTHS = ["짧고 간결하게", "보통", "길고 정성스럽게"]
+
+WAY_GUIDE_TONE = """
+[작성 지침]
+1. 감정적인 표현(친절한, 맛있는 등)을 배제할 것.
+2. 내비게이션처럼 정확한 미터(m)와 방향(좌회전/우회전) 위주로 서술할 것.
+3. 랜드마크(편의점, 은행 등)를 기준으로 설명할 것.
+4. 예시: '사당역 10번 출구에서 150m 직진 후 스타벅스 골목으로 진입. 1층에 위치.'
+"""
+
+
+def category_label(store: Mapping[str, Any]) -> str:
+    sub = (store["sub_category"] or "").strip()
+    return store["category"] + (f" · {sub}" if sub else "")
+
+
+def messages(prompt: str):
+    return [{"role": "user", "content": prompt}]
+
+
+def place_keywords(u_name, u_addr, cat_label, u_sig) -> str:
+    return f"매장:{u_name}, 지역:{u_addr}, 업종:{cat_label}, 메뉴:{u_sig}. 네이버 플레이스용 SEO 키워드 5개 추천 (형식: #키워드1 #키워드2...)"
+
+
+def place_description(u_name, cat_label, u_addr, phone, hours, u_str, u_sig, u_target) -> str:
+    return "\n".join([
+        f"매장:{u_name}, 업종:{cat_label}, 주소:{u_addr}, 전화:{phone}, 시간:{hours},",
+        f"특징:{u_str}, 메뉴:{u_sig}, 타겟:{u_target}. 네이버 플레이스 상세설명. 신뢰감 있고 전문적인 톤으로 작성.",
+    ])
+
+
+def way_guide(u_name, cat_label, u_addr, lat=None, lng=None) -> str:
+    if lng and lat:
+        return f"매장:{u_name}, 업종:{cat_label}, 주소:{u_addr}, 좌표:({lat},{lng}). {WAY_GUIDE_TONE}"
+    return f"매장:{u_name}, 업종:{cat_label}, 주소:{u_addr}. {WAY_GUIDE_TONE}"
+
+
+def parking_guide(u_name, cat_label, u_addr, pk_opt, pk_detail) -> str:
+    return f"매장:{u_name}, 업종:{cat_label}, 주소:{u_addr}. 주차상태:{pk_opt}, 상세:{pk_detail}. 주차 안내 문구. 간결하고 명확하게."
+
+
+def place_qa(u_name, question) -> str:
+    return f"네이버 스마트플레이스 전문가로서 답변: {question}. 매장:{u_name}. 전문적이고 간결하게."
+
+
+def review_reply(u_name, cat_label, u_sig, review, tone, length, keywords: Optional[str] = "") -> str:
+    return "\n".join([
+        f"역할: {cat_label} 매장 '{u_name}'의 센스 있는 사장님.",
+        "상황: 손님 리뷰에 대한 답글 작성.",
+        "",
+        "[매장 정보]",
+        f"- 업종: {cat_label}",
+        f"- 대표메뉴: {u_sig}",
+        "",
+        "[손님 리뷰]",
+        f'"{review}"',
+        "",
+        "[작성 지침]",
+        f"1. 말투: {tone}",
+        f"2. 길이: {length}",
+        f"3. 필수 포함 내용: {keywords if keywords else '없음 (문맥에 맞게 자연스럽게 마무리)'}",
+        "4. 고객의 리뷰 내용을 구체적으로 언급하여 '복붙' 느낌이 나지 않게 할 것.",
+    ])
+
+
+def blog_recruit(u_name, cat_label, benefit) -> str:
+    return f"매장:{u_name}, 업종:{cat_label}, 혜택:{benefit}. 블로그 체험단 모집글. 자연스러운 모집 문구 + 참여 조건 + 방문 안내 포함."
+
+
+def insta_caption(u_name, cat_label, description, u_sig, u_addr) -> str:
+    return f"매장:{u_name}, 업종:{cat_label}, 설명:{description}, 메뉴:{u_sig}, 지역:{u_addr}. 인스타 감성 캡션 1개 + 해시태그 12개."
+
+
+def event_plan(u_name, cat_label, u_addr, u_sig, u_str, u_target, goal, theme, period) -> str:
+    return "\n".join([
+        f"매장:{u_name}",
+        f"업종:{cat_label}",
+        f"주소:{u_addr}",
+        f"대표메뉴:{u_sig}",
+        f"강점:{u_str}",
+        f"타겟:{u_target}",
+        "",
+        f"목표:{goal}",
+        f"주제:{theme}",
+        f"기간:{period}",
+        "",
+        "오프라인 매장용 이벤트 기획안을 만들어줘.",
+        "포함: (1) 이벤트 한줄 컨셉 (2) 혜택/구성 (3) 참여 방법 (4) 홍보 문구 2개 (5) 주의사항",
+        "톤: 간결하고 실행가능하게.",
+    ])
+
+
+def _won(price) -> str:
+    return (format(int(price), ",") + "원") if price else "가격미확인"
+
+
+def order_parse(order_text, suppliers, links) -> str:
+    """발주 입력 → JSON 주문서. suppliers / links 는 order_match.select_candidates 로 고른 후보만"""
+    sup_lines = [f"- [문자거래처] {s['name']} (취급품목: {s['items']}, 전화: {s['phone']})" for s in suppliers]
+    link_lines = [
+        f"- [온라인링크] {l['alias']} (쇼핑몰: {l['mall_name']}, 가격: {_won(l.get('last_confirmed_price'))}, URL: {l['url']})"
+        for l in links
+    ]
+    return "\n".join([
+        "당신은 자재 발주 관리자입니다.",
+        "[사용자 주문]",
+        order_text,
+        "",
+        "[등록된 거래처 정보]",
+        *sup_lines,
+        "",
+        "[등록된 온라인 링크 정보]",
+        *link_lines,
+        "",
+        "[지시사항 - 융통성 있게 매칭하세요]",
+        "1. 사용자의 주문 품목을 '등록된 정보'와 대조하여 매칭하세요.",
+        "2. **[핵심] 완벽하게 똑같지 않아도 됩니다.** 의미가 통하면 매칭하세요.",
+        "    - 예: '연어' 거래처가 있으면, 사용자가 '연어3', '생연어'라고 써도 매칭 성공!",
+        "3. **[절대 원칙] 사용자가 입력한 '수량(숫자)'은 절대 삭제하지 마세요.**",
+        "    - '연어3' -> target: '연어 3' (O)",
+        "    - '참이슬 3박스' -> target: '참이슬 3박스' (O)",
+        "4. JSON Array 형태로만 출력하세요. (설명 금지)",
+        '예시: [{"type": "sms", "supplier": "00수산", "target": "연어 3마리", "phone": "..."}, {"type": "link", ...}]',
+    ])
@@ -0,0 +1,211 @@
+"""
+비밀번호 해시 (PBKDF2) - 전용 프로세스 풀 + 대기열 상한.
+
+PBKDF2 12만 회는 CPU 를 수십 ms 쓰므로, 로그인이 몰리면 API 스레드풀/Streamlit 이 같이 멈춘다.
+해시 계산은 별도 프로세스에서 하고, 대기열이 가득 차면 기다리지 않고 HashBusy 를 낸다
+(api.py 는 503 + Retry-After, Streamlit 은 "잠시 후 다시 시도").
+
+    OWNERS_HASH_WORKERS       2        해시 프로세스 수 (0 이면 호출한 스레드에서 바로 계산: 스크립트/점검용)
+    OWNERS_HASH_QUEUE         16       실행 중 + 대기 중 상한
+    OWNERS_HASH_TIMEOUT       10       초. 결과를 기다리는 최대 시간 (넘으면 HashBusy)
+    OWNERS_PBKDF2_ITERATIONS  120000   새로 만드는 해시의 반복 횟수
+
+저장 형식 (반복 횟수가 해시 안에 있어서, 값을 바꿔도 기존 해시는 그대로 검증된다):
+    pbkdf2_sha256$<iterations>$<salt b64>$<dk b64>    현재
+    <b64(salt16 + dk32)>                              예전 형식, 120000 회 고정
+로그인에 성공했을 때 needs_rehash() 면 auth.py 가 현재 설정으로 다시 저장한다.
+
+이 모듈은 표준 라이브러리만 쓴다 (해시 프로세스가 spawn 으로 이 모듈만 import 하도록).
+spawn 은 실행 중인 메인 스크립트도 다시 import 하므로, auth 를 쓰는 스크립트는
+if __name__ == "__main__": 가드를 두거나 OWNERS_HASH_WORKERS=0 으로 실행할 것.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Deque, Dict, Optional
+
+WORKERS = int(os.environ.get("OWNERS_HASH_WORKERS", "2"))
+QUEUE_LIMIT = int(os.environ.get("OWNERS_HASH_QUEUE", "16"))
+TIMEOUT = float(os.environ.get("OWNERS_HASH_TIMEOUT", "10"))
+ITERATIONS = int(os.environ.get("OWNERS_PBKDF2_ITERATIONS", "120000"))
+
+SCHEME = "pbkdf2_sha256"
+LEGACY_ITERATIONS = 120_000
+SALT_BYTES = 16
+
+
+class HashBusy(RuntimeError):
+    """해시 대기열이 가득 참 / TIMEOUT 안에 결과가 안 옴 (잠시 후 재시도)"""
+
+
+# ---------------------------------------------------------------
+# 해시 계산 (해시 프로세스에서 실행)
+# ---------------------------------------------------------------
+def _pbkdf2(pw: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", pw.encode("utf-8"), salt, iterations)
+
+def make_hash(pw: str, iterations: int = ITERATIONS) -> str:
+    salt = os.urandom(SALT_BYTES)
+    dk = _pbkdf2(pw, salt, iterations)
+    return "$".join([SCHEME, str(iterations), base64.b64encode(salt).decode(), base64.b64encode(dk).decode()])
+
+def _parse(stored: str):
+    """(iterations, salt, dk). 알 수 없는 형식이면 ValueError"""
+    if stored.startswith(SCHEME + "$"):
+        _, iterations, salt, dk = stored.split("$")
+        return int(iterations), base64.b64decode(salt), base64.b64decode(dk)
+    raw = base64.b64decode(stored.encode("utf-8"))
+    if len(raw) < SALT_BYTES + 32:
+        raise ValueError("not a password hash")
+    return LEGACY_ITERATIONS, raw[:SALT_BYTES], raw[SALT_BYTES:]
+
+def check_hash(pw: str, stored: str) -> bool:
+    try:
+        iterations, salt, dk = _parse(stored or "")
+    except (ValueError, TypeError):
+        return False
+    return hmac.compare_digest(dk, _pbkdf2(pw, salt, iterations))
+
+def is_hash(stored: str) -> bool:
+    try:
+        _parse(stored or "")
+        return True
+    except (ValueError, TypeError):
+        return False
+
+def needs_rehash(stored: str) -> bool:
+    """예전 형식이거나 현재 설정과 반복 횟수가 다르면 True"""
+    if not (stored or "").startswith(SCHEME + "$"):
+        return True
+    try:
+        return _parse(stored)[0] != ITERATIONS
+    except (ValueError, TypeError):
+        return True
+
+def _timed(fn: Callable, args: tuple, submitted_at: float):
+    started = time.time()
+    result = fn(*args)
+    return result, started - submitted_at, time.time() - started
+
+
+# ---------------------------------------------------------------
+# 프로세스 풀 + 대기열 상한 + 지표
+# ---------------------------------------------------------------
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_lock = threading.Lock()
+_pending = 0
+_rejected = 0
+_completed = 0
+_abandoned = 0  # TIMEOUT 으로 기다리기를 포기한 요청
+_hash_ms: Deque[float] = deque(maxlen=1000)
+_wait_ms: Deque[float] = deque(maxlen=1000)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor, _executor_pid, _pending
+    if _executor is None or _executor_pid != os.getpid():
+        with _lock:
+            if _executor is None or _executor_pid != os.getpid():
+                # spawn: 앱 프로세스의 스레드/커넥션을 fork 로 복사하지 않게
+                _executor = ProcessPoolExecutor(max_workers=WORKERS,
+                                                mp_context=multiprocessing.get_context("spawn"))
+                _executor_pid = os.getpid()
+                _pending = 0
+    return _executor
+
+
+def _finish(fut: Future):
+    global _pending, _completed
+    with _lock:
+        _pending -= 1
+        if not fut.cancelled() and fut.exception() is None:
+            _completed += 1
+            _, wait, took = fut.result()
+            _wait_ms.append(wait * 1000)
+            _hash_ms.append(took * 1000)
+
+
+def submit(fn: Callable, *args) -> Future:
+    """fn(*args) 를 해시 프로세스에서 실행. 결과는 (값, 대기 초, 계산 초)"""
+    global _pending, _rejected
+    executor = _get_executor()
+    with _lock:
+        if _pending >= QUEUE_LIMIT:
+            _rejected += 1
+            raise HashBusy(f"비밀번호 처리 대기열 초과 ({QUEUE_LIMIT})")
+        _pending += 1
+    try:
+        fut = executor.submit(_timed, fn, args, time.time())
+    except BaseException:
+        with _lock:
+            _pending -= 1
+        raise
+    fut.add_done_callback(_finish)
+    return fut
+
+
+def _abandon(fut: Future) -> HashBusy:
+    # 아직 대기 중이면 취소 (이미 계산 중이면 끝날 때 _finish 가 _pending 을 내림)
+    global _abandoned
+    fut.cancel()
+    with _lock:
+        _abandoned += 1
+    return HashBusy(f"비밀번호 처리 시간 초과 ({TIMEOUT:g}초)")
+
+
+def run(fn: Callable, *args) -> Any:
+    """동기 호출용 (Streamlit / DB 스레드)"""
+    if WORKERS <= 0:
+        return fn(*args)
+    fut = submit(fn, *args)
+    try:
+        return fut.result(timeout=TIMEOUT)[0]
+    except FutureTimeout:
+        raise _abandon(fut) from None
+
+
+async def run_async(fn: Callable, *args) -> Any:
+    """async 엔드포인트용: 기다리는 동안 이벤트 루프/스레드를 잡지 않음"""
+    if WORKERS <= 0:
+        return fn(*args)
+    fut = submit(fn, *args)
+    try:
+        result = await asyncio.wait_for(asyncio.wrap_future(fut), TIMEOUT)
+    except asyncio.TimeoutError:
+        raise _abandon(fut) from None
+    return result[0]
+
+
+def _pct(values, p: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return round(s[min(len(s) - 1, int(len(s) * p))], 1)
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        hash_ms, wait_ms = list(_hash_ms), list(_wait_ms)
+    return {
+        "workers": WORKERS, "queue_limit": QUEUE_LIMIT, "iterations": ITERATIONS,
+        "pending": _pending, "completed": _completed, "rejected": _rejected, "abandoned": _abandoned,
+        "hash_ms_p50": _pct(hash_ms, 0.5), "hash_ms_p95": _pct(hash_ms, 0.95),
+        "queue_wait_ms_p50": _pct(wait_ms, 0.5), "queue_wait_ms_p95": _pct(wait_ms, 0.95),
+    }
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        ex, _executor = _executor, None
+    if ex is not None:
+        ex.shutdown(wait=False, cancel_futures=True)
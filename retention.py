@@ -0,0 +1,175 @@
+"""
+history 보관 정책 (오래된 생성 기록을 압축 보관함으로 옮기기).
+
+history 는 LLM 입력/출력 전문을 계속 쌓아서 가장 빨리 커지는 테이블이다. 자주 읽는 것은
+최근 기록뿐이므로, 기능별 보관 기간이 지난 행은 history_archive 로 옮겨서 history 를 작게 유지한다.
+본문은 history_blobs 참조를 그대로 넘기고, 참조가 없어진 본문은 정리 단계에서 지운다. 보관된 행은 get_recent_history(..., include_archive=True) 로만 보인다.
+
+    OWNERS_HISTORY_HOT_DAYS          90    기본 보관 기간 (POLICIES 에 없는 기능)
+    OWNERS_RETENTION_INTERVAL_HOURS  24    정기 실행 간격 (모든 프로세스 통틀어 1번)
+    OWNERS_RETENTION_BATCH           500   트랜잭션 1개에 옮기는 최대 행 수 (쓰기 락 짧게)
+
+    python retention.py            # 지금 바로 1회 (보관 + 정리)
+    python retention.py --vacuum   # + 빈 페이지가 많으면 VACUUM (쓰기가 잠시 멈춤, 한가할 때)
+"""
+import logging
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import database
+import db_pool
+import history_blobs
+
+log = logging.getLogger(__name__)
+
+HOT_DAYS = int(os.environ.get("OWNERS_HISTORY_HOT_DAYS", "90"))
+INTERVAL_HOURS = float(os.environ.get("OWNERS_RETENTION_INTERVAL_HOURS", "24"))
+BATCH_SIZE = int(os.environ.get("OWNERS_RETENTION_BATCH", "500"))
+VACUUM_FREE_RATIO = 0.25  # 빈 페이지가 이 비율 이상일 때만 VACUUM
+
+# 기능별 보관 기간 (일). 다시 볼 일이 적은 것은 짧게, 가게 정보성 문구는 길게
+POLICIES: Dict[str, int] = {
+    "REVIEW": 60,
+    "QA": 60,
+    "INSTA": 90,
+    "BLOG": 90,
+    "EVENT": 180,
+    "PLACE": 365,
+}
+
+_LAST_RUN_KEY = "history_retention_at"
+
+
+def _cutoffs(now: datetime) -> List[Tuple[str, List[Optional[str]]]]:
+    """(조건 SQL, 파라미터) 목록: 정책이 있는 기능은 각자, 나머지는 HOT_DAYS"""
+    out = []
+    for feature, days in POLICIES.items():
+        out.append(("created_at < ? AND feature = ?", [(now - timedelta(days=days)).isoformat(), feature]))
+    marks = ", ".join("?" for _ in POLICIES)
+    out.append((f"created_at < ? AND (feature IS NULL OR feature NOT IN ({marks}))",
+                [(now - timedelta(days=HOT_DAYS)).isoformat(), *POLICIES]))
+    return out
+
+
+def archive_shard(path: str, now: Optional[datetime] = None) -> int:
+    """DB 파일 1개의 오래된 history 를 보관함으로 이동. 옮긴 행 수 반환."""
+    now = now or datetime.now()
+    archived_at = now.isoformat()
+    moved = 0
+    for cond, params in _cutoffs(now):
+        while True:
+            # 배치마다 트랜잭션을 나눠서 앱의 쓰기가 오래 기다리지 않게
+            with db_pool.connection(path) as conn:
+                ids = [r[0] for r in conn.execute(
+                    f"SELECT id FROM history WHERE {cond} ORDER BY created_at LIMIT ?", (*params, BATCH_SIZE))]
+                if not ids:
+                    break
+                id_list = ", ".join("?" for _ in ids)
+                # 이미 보관된 id 는 건드리지 않음 (REPLACE 는 기존 행을 지워서 refcount 트리거가 한 번 더 돎)
+                conn.execute(f"""
+                    INSERT OR IGNORE INTO history_archive
+                        (id, username, store_id, feature, title, input_z, output_z, input_ref, output_ref,
+                         created_at, archived_at)
+                    SELECT id, username, store_id, feature, title,
+                           history_pack(input_text), history_pack(output_text), input_ref, output_ref, created_at, ?
+                    FROM history WHERE id IN ({id_list})
+                """, (archived_at, *ids))
+                database.unindex_history(conn, ids)  # 색인 트리거 없음 (migrations 0012)
+                conn.execute(f"DELETE FROM history WHERE id IN ({id_list})", ids)
+            moved += len(ids)
+            if len(ids) < BATCH_SIZE:
+                break
+    return moved
+
+
+def compact_shard(path: str, vacuum: bool = False) -> Dict[str, int]:
+    """보관 후 정리: FTS 세그먼트 병합, 통계 갱신, WAL 비우기, (선택) VACUUM"""
+    with db_pool.connection(path) as conn:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name='history_fts'").fetchone():
+            conn.execute("INSERT INTO history_fts(history_fts) VALUES ('optimize')")
+        orphans = history_blobs.gc(conn)
+        conn.execute("PRAGMA optimize")
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    vacuumed = 0
+    if vacuum and pages and free / pages >= VACUUM_FREE_RATIO:
+        with db_pool.connection(path) as conn:
+            conn.commit()
+            conn.execute("VACUUM")
+        vacuumed = 1
+    with db_pool.connection(path) as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return {"pages": pages, "free_pages": free, "vacuumed": vacuumed, "blobs_freed": orphans}
+
+
+def run_pass(vacuum: bool = False, now: Optional[datetime] = None) -> Dict[str, Dict[str, int]]:
+    """모든 DB 파일(샤드 포함)에 보관 + 정리 1회"""
+    report = {}
+    for path in database.iter_shard_paths():
+        moved = archive_shard(path, now)
+        report[path] = {"archived": moved, **compact_shard(path, vacuum)}
+    return report
+
+
+def _claim_run(now: datetime) -> bool:
+    """여러 프로세스 중 한 곳만 이번 주기를 실행하도록 app_state 에 시각을 기록 (BEGIN IMMEDIATE 로 직렬화)"""
+    with database.get_db() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT v FROM app_state WHERE k=?", (_LAST_RUN_KEY, )).fetchone()
+        if row and row[0] and datetime.fromisoformat(row[0]) > now - timedelta(hours=INTERVAL_HOURS):
+            return False
+        conn.execute("INSERT INTO app_state (k, v) VALUES (?, ?) ON CONFLICT(k) DO UPDATE SET v=excluded.v",
+                     (_LAST_RUN_KEY, now.isoformat()))
+    return True
+
+
+def _scheduler_loop(check_seconds: float):
+    while not _scheduler_stop.is_set():
+        try:
+            if _claim_run(datetime.now()):
+                report = run_pass()
+                log.info("history retention: %d rows archived", sum(r["archived"] for r in report.values()))
+        except Exception:
+            log.exception("history retention 실패")
+        _scheduler_stop.wait(check_seconds)
+
+
+_scheduler_thread: Optional[threading.Thread] = None
+_scheduler_lock = threading.Lock()
+_scheduler_stop = threading.Event()
+
+def start_scheduler(check_seconds: float = 3600):
+    """백그라운드 스레드로 정기 실행 (프로세스당 1번만 시작, 실제 실행은 주기당 1곳)"""
+    global _scheduler_thread
+    with _scheduler_lock:
+        if _scheduler_thread is not None or INTERVAL_HOURS <= 0:
+            return
+        _scheduler_stop.clear()
+        _scheduler_thread = threading.Thread(target=_scheduler_loop, args=(check_seconds, ),
+                                             name="history-retention", daemon=True)
+        _scheduler_thread.start()
+
+
+def stop_scheduler(timeout: float = 5):
+    """다음 확인 대기를 깨워서 스레드 종료 (실행 중인 보관 작업은 끝까지 하고 멈춤)"""
+    global _scheduler_thread
+    with _scheduler_lock:
+        t, _scheduler_thread = _scheduler_thread, None
+    if t is not None:
+        _scheduler_stop.set()
+        t.join(timeout)
+
+
+def main(argv):
+    database.init_db()
+    for path, r in run_pass(vacuum="--vacuum" in argv).items():
+        print(f"{path}: archived={r['archived']} blobs_freed={r['blobs_freed']} "
+              f"pages={r['pages']} free={r['free_pages']} vacuumed={r['vacuumed']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
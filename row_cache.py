@@ -0,0 +1,109 @@
+"""
+프로세스 내 read-through 캐시 (LRU + TTL) - database.py 의 매장/체크리스트/거래처/링크 조회용.
+
+    OWNERS_CACHE_TTL    10     초. 다른 프로세스(API 워커 <-> Streamlit)의 쓰기는 이 시간 안에 반영
+    OWNERS_CACHE_SIZE   2048   캐시별 최대 키 수 (넘으면 가장 오래 안 쓴 키부터 버림)
+                               0 이면 캐시 끔
+
+같은 프로세스의 쓰기는 database.py 의 writer 가 커밋 직후 해당 키만 지운다.
+읽는 중인 키마다 세대(generation) 번호를 두어, 커밋 전에 읽기 시작한 값이 지운 뒤에 들어오는 일을 막는다.
+세대 번호는 그 키를 읽는 중일 때만 필요하므로 마지막 읽기가 끝나면 지운다 (동시에 읽는 키 수만큼만 남음).
+stats() 로 캐시별 hit/miss 를 볼 수 있다.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+CACHE_TTL = float(os.environ.get("OWNERS_CACHE_TTL", "10"))
+CACHE_SIZE = int(os.environ.get("OWNERS_CACHE_SIZE", "2048"))
+
+
+class RowCache:
+    def __init__(self, name: str, maxsize: int = CACHE_SIZE, ttl: float = CACHE_TTL):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._gen: Dict[Hashable, int] = {}
+        self._loading: Dict[Hashable, int] = {}  # 키별 진행 중인 loader 수
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        if self.maxsize <= 0:
+            return loader()
+        now = time.monotonic()
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None and hit[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return hit[1]
+            self.misses += 1
+            gen = self._gen.get(key, 0)
+            self._loading[key] = self._loading.get(key, 0) + 1
+        loaded = False
+        try:
+            value = loader()
+            loaded = True
+        finally:
+            with self._lock:
+                # 읽는 동안 invalidate 됐으면 (더 새 값이 커밋됨) 저장하지 않음
+                if loaded and self._gen.get(key, 0) == gen:
+                    self._data[key] = (now + self.ttl, value)
+                    self._data.move_to_end(key)
+                    while len(self._data) > self.maxsize:
+                        self._data.popitem(last=False)
+                left = self._loading[key] - 1
+                if left:
+                    self._loading[key] = left
+                else:
+                    del self._loading[key]
+                    self._gen.pop(key, None)
+        return value
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+            if key in self._loading:
+                self._gen[key] = self._gen.get(key, 0) + 1
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            # 읽는 중인 키는 세대를 올려서, 끝난 뒤 지운 값을 다시 넣지 않게 함
+            for key in self._loading:
+                self._gen[key] = self._gen.get(key, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+_caches: Dict[str, RowCache] = {}
+
+
+def cache(name: str) -> RowCache:
+    if name not in _caches:
+        _caches[name] = RowCache(name)
+    return _caches[name]
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return {name: c.stats() for name, c in _caches.items()}
+
+
+def clear_all():
+    for c in _caches.values():
+        c.clear()
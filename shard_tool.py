@@ -0,0 +1,102 @@
+"""
+샤드 모드 관리 도구 (database.py 0. 저장소 라우팅 참고).
+
+    OWNERS_DB_SHARDS=user python shard_tool.py split    # 메인 DB 의 매장 데이터를 샤드로 복사
+    OWNERS_DB_SHARDS=user python shard_tool.py stats    # 샤드 목록 + 전체 합계
+
+split 은 INSERT OR IGNORE 라 여러 번 실행해도 된다 (id 그대로 복사).
+메인 DB 의 원본 행은 지우지 않으므로, 확인 후 앱을 샤드 모드로 재시작하면 된다.
+history 는 트리거 없이 복사되므로 샤드마다 전문 검색 색인을 다시 만든다 (migrations 0012).
+복사가 끝나면 테이블별로 (메인 DB 의 주인 있는 행 수) <= (샤드 합계) 인지 확인하고, 모자라면 실패로 끝난다.
+"""
+import sys
+from collections import defaultdict
+
+import database
+import db_pool
+import history_blobs
+
+# (테이블, 소유자를 찾는 방법): username 컬럼이 있으면 그대로, 없으면 store_id → stores.username
+_TENANT_TABLES = [
+    ("store_checklist", "store_id"),
+    ("history", "username"),
+    ("history_archive", "username"),  # retention 이 이미 보관한 행
+    ("todo_events", "username"),
+    ("suppliers", "store_id"),
+    ("online_items", "store_id"),
+    ("price_observations", "store_id"),  # price_daily 는 INSERT 트리거가 샤드에서 다시 누적
+]
+
+
+def _copy_history_blobs(main, conn, rows):
+    """history / history_archive 행이 참조하는 본문을 먼저 복사 (refcount 는 INSERT 트리거가 샤드 기준으로 다시 센다)"""
+    refs = {r[c] for r in rows for c in ("input_ref", "output_ref") if r.get(c)}
+    for h in refs:
+        b = main.execute("SELECT body, raw_size FROM history_blobs WHERE hash=?", (h, )).fetchone()
+        if b:
+            conn.execute("INSERT OR IGNORE INTO history_blobs (hash, body, raw_size, refcount) VALUES (?, ?, ?, 0)",
+                         (h, b["body"], b["raw_size"]))
+
+
+def split() -> dict:
+    if not database.sharding_enabled():
+        raise SystemExit("OWNERS_DB_SHARDS 를 설정한 뒤 실행하세요 (user 또는 버킷 수)")
+    database.init_db()
+    copied = defaultdict(int)
+    with database.get_db() as main:
+        history_blobs.require_codec(main)
+        owners = {r["store_id"]: r["username"] for r in main.execute("SELECT store_id, username FROM stores")}
+        for table, key in _TENANT_TABLES:
+            cols = [r[1] for r in main.execute(f"PRAGMA table_info({table})")]
+            by_user = defaultdict(list)
+            for row in main.execute(f"SELECT {', '.join(cols)} FROM {table}"):
+                user = row[key] if key == "username" else owners.get(row[key])
+                if user:
+                    by_user[user].append(tuple(row))
+            sql = f"INSERT OR IGNORE INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})"
+            for user, rows in by_user.items():
+                with database.get_tenant_db(user) as conn:
+                    if table in ("history", "history_archive"):
+                        _copy_history_blobs(main, conn, [dict(zip(cols, r)) for r in rows])
+                    conn.executemany(sql, rows)
+                    if table == "history":
+                        database.rebuild_history_fts(conn)
+                copied[table] += len(rows)
+    verify(copied)
+    return dict(copied)
+
+
+def verify(expected: dict):
+    """샤드 합계가 메인 DB 에서 옮긴 행 수보다 적으면 SystemExit (split 을 다시 돌려도 됨)"""
+    missing = []
+    for table, n in expected.items():
+        got = sum(r[0] for r in database.iter_all_shards(f"SELECT COUNT(*) FROM {table}"))
+        if got < n:
+            missing.append(f"{table}: 메인 {n} / 샤드 {got}")
+    if missing:
+        raise SystemExit("샤드 복사 행 수 불일치\n" + "\n".join(missing))
+
+
+def stats():
+    for path in database.iter_shard_paths():
+        print(path)
+    for table, n in database.fleet_table_counts().items():
+        print(f"{table:<16} {n:>10}")
+
+
+def main(argv):
+    cmd = argv[1] if len(argv) > 1 else "stats"
+    if cmd == "split":
+        for table, n in split().items():
+            print(f"{table:<16} {n:>10} rows")
+    elif cmd == "stats":
+        stats()
+    else:
+        print(__doc__)
+        return 1
+    db_pool.close_all_pools()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
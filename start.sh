@@ -10,10 +10,18 @@ if [ ! -d "frontend/node_modules" ]; then
     cd frontend && npm install && cd ..
 fi
 
-# 3. Start Servers
+# 3. DB 동시성 설정 (db_pool.py 상단 설명 / bench_db.py 측정치 참고)
+export OWNERS_DB_JOURNAL_MODE="${OWNERS_DB_JOURNAL_MODE:-WAL}"
+export OWNERS_DB_BUSY_TIMEOUT_MS="${OWNERS_DB_BUSY_TIMEOUT_MS:-5000}"
+export OWNERS_DB_SYNCHRONOUS="${OWNERS_DB_SYNCHRONOUS:-NORMAL}"
+# 조회 캐시: 다른 프로세스의 쓰기가 보이기까지 최대 TTL 초 (row_cache.py)
+export OWNERS_CACHE_TTL="${OWNERS_CACHE_TTL:-10}"
+API_WORKERS="${API_WORKERS:-4}"
+
+# 4. Start Servers
 echo "🚀 Starting Servers..."
 # Start FastAPI in background
-uvicorn api:app --host 0.0.0.0 --port 8000 & 
+uvicorn api:app --host 0.0.0.0 --port 8000 --workers "$API_WORKERS" & 
 
 # Start Streamlit in background
 streamlit run streamlit_app.py --server.port 8501 &
@@ -2,7 +2,6 @@ import streamlit as st
 import time
 import os
 import requests
-import sqlite3
 import streamlit.components.v1 as components
 from datetime import datetime
 
@@ -10,12 +9,14 @@ from datetime import datetime
 from constants import STYLES, MAIN_CATEGORIES, SUBCATS_FOOD_CAFE, PLACE_REQUIRED_FIELDS
 from utils import naver_button, get_missing_fields, days_since, now_iso
 from database import (
-    DB_PATH, init_db, fix_database_schema, set_app_state, get_app_state,
+    init_db, set_app_state, get_app_state, set_tenant, tenant, store_owner,
     get_user_stores, get_store_info, get_checklist, refresh_checklist_from_store,
     add_store, update_store, get_store, update_checklist_flags, set_review_sync_pending, set_review_sync_result,
     set_price_sync_result, mark_price_sync_fail, save_history, mark_task_done
 )
 from auth import verify_user, create_user, username_exists, seed_admin
+from pw_hash import HashBusy
+import retention
 from services import calc_az_progress
 from views import (
     render_place, render_review, render_blog, render_insta, render_event, render_order
@@ -50,11 +51,17 @@ NAVER_CLIENT_SECRET = os.environ.get("NAVER_CLIENT_SECRET")
 # OPENAI_API_KEY handled in views.py / services.py
 
 # =========================
-# 0.5) Init DB (Schema Check) - MUST BE EARLY
+# 0.5) Init DB (Schema Migration) - MUST BE EARLY
 # =========================
-init_db()
-seed_admin()
-fix_database_schema()
+@st.cache_resource
+def bootstrap_db():
+    # 프로세스당 1회만 실행 (rerun 때는 캐시된 결과 반환)
+    init_db()
+    seed_admin()
+    retention.start_scheduler()
+    return True
+
+bootstrap_db()
 
 # =========================
 # 1) Session & Route Control
@@ -124,7 +131,9 @@ def handle_review_sync_qp_global():
             
             # DB Update
             # (See database.py -> set_review_sync_result updates 'review_sync_status', 'review_unreplied_count', 'review_sync_at')
-            ok = set_review_sync_result(store_id, nonce, status, unreplied)
+            # 콜백 탭은 로그인 세션이 아닐 수 있으므로 매장 주인 기준으로 기록
+            with tenant(store_owner(store_id) or st.session_state.username):
+                ok = set_review_sync_result(store_id, nonce, status, unreplied)
             
             if ok:
                 st.toast(f"✅ 동기화 완료! 미답변 리뷰 {unreplied}건이 반영되었습니다.", icon="🎉")
@@ -162,19 +171,20 @@ def handle_scout_qp_global():
             audit_json = _qp_get("audit_json") or "{}"
             
             # Update DB (checklist)
-            update_checklist_flags(store_id, 
-                has_place_desc=has_desc,
-                has_menu_guide=has_menu,
-                has_keywords=has_keywords,
-                has_parking_guide=has_parking,
-                has_way_guide=has_way,
-                has_hours=has_hours,
-                has_phone=has_phone,
-                has_address=has_address,
-                has_news=has_news,
-                audit_json=audit_json,
-                last_scout_at=now_iso() # Record timestamp
-            )
+            with tenant(store_owner(store_id) or st.session_state.username):
+                update_checklist_flags(store_id, 
+                    has_place_desc=has_desc,
+                    has_menu_guide=has_menu,
+                    has_keywords=has_keywords,
+                    has_parking_guide=has_parking,
+                    has_way_guide=has_way,
+                    has_hours=has_hours,
+                    has_phone=has_phone,
+                    has_address=has_address,
+                    has_news=has_news,
+                    audit_json=audit_json,
+                    last_scout_at=now_iso() # Record timestamp
+                )
             
             # Detailed Feedback Toast
             msg_found = []
@@ -213,11 +223,6 @@ def handle_scout_qp_global():
         # Streamlit query params persistence is tricky. 
         # But user wants no popup, so just toast is fine.
 
-# Run Global Handlers
-handle_price_qp_global()
-handle_review_sync_qp_global()
-handle_scout_qp_global()
-
 # =========================
 # 2) Dev/Auto Login Logic
 # =========================
@@ -257,6 +262,14 @@ if st.session_state.page in PROTECTED_PAGES:
         st.session_state.page = "LOGIN"
         st.rerun()
 
+# 매장 데이터 DB 라우팅 (샤드 모드용). 실행마다 현재 로그인 사용자로 갱신
+set_tenant(st.session_state.username if st.session_state.auth else None)
+
+# Run Global Handlers (확장 프로그램 콜백) - tenant 가 정해진 뒤에 실행해야 샤드 모드에서 기록됨
+handle_price_qp_global()
+handle_review_sync_qp_global()
+handle_scout_qp_global()
+
 # =========================
 # 3) Public Pages
 # =========================
@@ -290,13 +303,18 @@ elif st.session_state.page == "LOGIN":
 
             st.markdown("<br>", unsafe_allow_html=True)
             if st.button("접속", type="primary", use_container_width=True):
-                if verify_user(username, password):
+                try:
+                    ok = verify_user(username, password)
+                except HashBusy:
+                    ok = None
+                    st.warning("접속이 몰리고 있습니다. 잠시 후 다시 시도해 주세요.")
+                if ok:
                     st.session_state.auth = True
                     st.session_state.username = username
                     st.session_state.store_id = None
                     set_app_state("last_login_user", username)
                     go_to("DASHBOARD")
-                else:
+                elif ok is False:
                     st.error("계정 확인 필요")
 
             if st.button("취소", type="secondary", use_container_width=True):
@@ -322,7 +340,11 @@ elif st.session_state.page == "SIGNUP":
                 elif username_exists(new_user.strip()):
                     st.error("이미 존재하는 아이디입니다.")
                 else:
-                    create_user(new_user.strip(), new_pw)
+                    try:
+                        create_user(new_user.strip(), new_pw)
+                    except HashBusy:
+                        st.warning("가입 요청이 몰리고 있습니다. 잠시 후 다시 시도해 주세요.")
+                        st.stop()
                     st.session_state.auth = True
                     st.session_state.username = new_user.strip()
                     st.session_state.store_id = None
@@ -866,7 +888,3 @@ elif st.session_state.page in PROTECTED_PAGES:
                     render_insta(u_name, cat_label, u_sig, u_addr, u_insta_url)
                 elif st.session_state.page == "EVENT":
                     render_event(u_name, cat_label, u_addr, u_sig, u_str, u_target)
-
-init_db()
-seed_admin()
-fix_database_schema()
\ No newline at end of file
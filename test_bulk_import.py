@@ -0,0 +1,34 @@
+"""bulk_import: 헤더 줄 인식 / 구분자 / 검증 / 중복 처리"""
+import bulk_import
+from conftest import new_store
+
+
+def test_header_row_detected():
+    text = "상품명\t쇼핑몰\t링크\n연어\t쿠팡\tcoupang.com/vp/products/1"
+    rows = bulk_import.parse_rows(text, bulk_import.ONLINE_ITEM_COLUMNS)
+    assert rows == [(2, {"alias": "연어", "mall_name": "쿠팡", "url": "coupang.com/vp/products/1"})]
+
+
+def test_first_row_without_header_is_data():
+    text = "참치상회,010-1234-5678,참치,연어\n"
+    rows = bulk_import.parse_rows(text, bulk_import.SUPPLIER_COLUMNS)
+    # 마지막 컬럼(취급품목)의 쉼표는 다시 합침
+    assert rows == [(1, {"name": "참치상회", "phone": "010-1234-5678", "items": "참치,연어"})]
+
+
+def test_one_matching_header_name_is_not_enough():
+    text = "품목,없음,없음\n"
+    assert len(bulk_import.parse_rows(text, bulk_import.SUPPLIER_COLUMNS)) == 1
+
+
+def test_import_online_items_statuses(fresh_db):
+    sid = new_store(fresh_db)
+    text = ("alias\tmall\turl\n"
+            "연어\t쿠팡\thttps://m.coupang.com/vm/products/1?src=1\n"
+            "연어 2\t쿠팡\thttps://www.coupang.com/vp/products/1\n"
+            "\t쿠팡\thttps://example.com/x\n")
+    results = bulk_import.import_online_items(sid, text)
+    assert [r["status"] for r in results] == ["added", "duplicate", "invalid"]
+    assert results[2]["reason"] == "상품명 없음"
+    assert bulk_import.summarize(results) == {"added": 1, "duplicate": 1, "invalid": 1}
+    assert len(fresh_db.get_online_items(sid)) == 1
@@ -0,0 +1,43 @@
+"""/api/dashboard ETag: 행 버전(rev)이 실제로 값이 바뀔 때만 올라가는지"""
+import pytest
+
+from conftest import new_store
+
+
+def _version(db, username="kim"):
+    return db.get_dashboard_row(username)[2]
+
+
+@pytest.mark.parametrize("db_fixture", ["fresh_db", "sharded_db"])
+def test_noop_refresh_keeps_version(request, db_fixture):
+    db = request.getfixturevalue(db_fixture)
+    sid = new_store(db, "kim")
+    db.refresh_checklist_from_store("kim", sid)
+    before = _version(db)
+
+    # Streamlit 은 실행마다 같은 값으로 다시 씀
+    for _ in range(3):
+        db.refresh_checklist_from_store("kim", sid)
+        with db.tenant("kim"):
+            db.update_checklist_flags(sid, has_review_url=0)
+    assert _version(db) == before
+
+    with db.tenant("kim"):
+        db.update_checklist_flags(sid, has_keywords=1)
+    changed = _version(db)
+    assert changed != before
+
+    db.update_store("kim", sid, "새이름", "음식점/카페", "한식", "서울", "", "연어덮밥", "", "", "", "")
+    assert _version(db) != changed
+
+
+def test_etag_header_roundtrip(fresh_db):
+    api = pytest.importorskip("api")
+    db = fresh_db
+    sid = new_store(db, "kim")
+    db.refresh_checklist_from_store("kim", sid)
+    etag = api.dashboard_etag("kim", _version(db))
+    db.refresh_checklist_from_store("kim", sid)
+    assert api.etag_matches(etag, api.dashboard_etag("kim", _version(db)))
+    assert api.etag_matches(f"W/{etag}", etag)
+    assert not api.etag_matches(None, etag)
@@ -0,0 +1,49 @@
+"""history_blobs: 트리거는 history_unpack 없이 동작 / 색인은 앱이 갱신 / 뷰는 풀 커넥션 전용"""
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+import history_blobs
+import retention
+from conftest import new_store
+
+
+def _search(db, sid, kw):
+    return [r["output_text"] for r in db.search_history("kim", sid, kw)]
+
+
+def test_raw_connection_can_write_history(fresh_db):
+    db = fresh_db
+    sid = new_store(db, "kim")
+    db.save_history("kim", sid, "REVIEW", "답글", "맛있어요", "연어덮밥 감사합니다")
+
+    raw = sqlite3.connect(db.DB_PATH)  # history_unpack 미등록 (sqlite3 CLI 와 같음)
+    with raw:
+        raw.execute("INSERT INTO history (username, store_id, feature, title, created_at) "
+                    "VALUES ('kim', ?, 'QA', '수동', '2024-01-01')", (sid, ))
+        raw.execute("DELETE FROM history WHERE title='수동'")
+    with pytest.raises(sqlite3.OperationalError):
+        raw.execute("SELECT * FROM history_full").fetchall()
+    with pytest.raises(RuntimeError):
+        history_blobs.require_codec(raw)
+    raw.close()
+
+    with db.get_db() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM history_blobs WHERE refcount <= 0").fetchone()[0] == 0
+
+
+def test_fts_follows_save_and_archive(fresh_db):
+    db = fresh_db
+    if not db.has_history_fts("kim"):
+        pytest.skip("FTS5 trigram 미지원 SQLite")
+    sid = new_store(db, "kim")
+    db.save_history("kim", sid, "REVIEW", "답글", "맛있어요", "연어덮밥 감사합니다")
+    assert _search(db, sid, "연어덮밥") == ["연어덮밥 감사합니다"]
+
+    later = datetime.now() + timedelta(days=max(retention.POLICIES.values()) + 1)
+    assert retention.archive_shard(db.DB_PATH, now=later) == 1
+    assert _search(db, sid, "연어덮밥") == []
+    with db.get_db() as conn:
+        # 색인과 원본이 맞는지 (어긋나면 integrity-check 가 실패)
+        conn.execute("INSERT INTO history_fts(history_fts, rank) VALUES ('integrity-check', 1)")
@@ -0,0 +1,37 @@
+"""llm_cache: hit 은 읽기만, last_hit_at 은 TOUCH 간격으로만 갱신"""
+import time
+
+import llm_cache
+
+
+def _last_hit(db, key):
+    with db.get_db() as conn:
+        return conn.execute("SELECT last_hit_at FROM llm_cache WHERE key=?", (key, )).fetchone()[0]
+
+
+def test_hit_touches_lazily(fresh_db, monkeypatch):
+    db = fresh_db
+    key = llm_cache.key("m", [{"role": "user", "content": "키워드 추천"}], {})
+    llm_cache.put(key, "place_keywords", "m", "연어, 덮밥")
+    stored = _last_hit(db, key)
+    touched = llm_cache.stats()["touched"]
+
+    # TOUCH 안에서는 몇 번을 읽어도 쓰지 않음
+    for _ in range(5):
+        assert llm_cache.get(key) == "연어, 덮밥"
+    assert _last_hit(db, key) == stored
+    assert llm_cache.stats()["touched"] == touched
+
+    # TOUCH 가 지나면 한 번만 갱신
+    monkeypatch.setattr(llm_cache, "TOUCH", 0.0)
+    time.sleep(0.01)
+    assert llm_cache.get(key) == "연어, 덮밥"
+    assert _last_hit(db, key) > stored
+    assert llm_cache.stats()["touched"] == touched + 1
+
+
+def test_expired_is_miss(fresh_db, monkeypatch):
+    key = llm_cache.key("m", [{"role": "user", "content": "길 안내"}], {})
+    llm_cache.put(key, "way_guide", "m", "2번 출구")
+    monkeypatch.setattr(llm_cache, "TTL", -1.0)
+    assert llm_cache.get(key) is None
@@ -0,0 +1,77 @@
+"""migrations: 새 DB / 마이그레이션 전 DB(저장소의 owners_v9.db) 를 최신 버전으로, 다시 돌려도 그대로"""
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+import database
+import db_pool
+import migrations
+import row_cache
+
+LATEST = migrations.MIGRATIONS[-1][0]
+BASELINE = os.path.join(os.path.dirname(__file__), "owners_v9.db")  # schema_version 이 생기기 전 형태 (0001 이전 init_db 로 만든 파일)
+
+
+def _tables(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def baseline(tmp_path, monkeypatch):
+    path = str(tmp_path / "baseline.db")
+    shutil.copy(BASELINE, path)
+    # 0004 (FTS) / 0005 (canonical_url) / 0007 (blobs) 이 옮길 예전 행
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("INSERT INTO history (username, store_id, feature, title, input_text, output_text, created_at) "
+                     "VALUES ('admin', 1, 'REVIEW', '리뷰 답글', '맛있어요', '연어덮밥 감사합니다', '2024-01-01 10:00:00')")
+        for i, url in enumerate(["https://m.coupang.com/vm/products/1?src=1042503",
+                                 "https://www.coupang.com/vp/products/1"]):
+            conn.execute("INSERT INTO online_items (store_id, alias, mall_name, url, created_at) VALUES (1, ?, '쿠팡', ?, '')",
+                         (f"연어{i}", url))
+    conn.close()
+    monkeypatch.setattr(database, "DB_PATH", path)
+    monkeypatch.setattr(database, "SHARD_MODE", "")
+    monkeypatch.setattr(database, "_shard_paths", {})
+    database.set_tenant(None)
+    yield path
+    row_cache.clear_all()
+    db_pool.close_all_pools()
+
+
+def test_fresh_db_reaches_latest(tmp_path):
+    path = str(tmp_path / "new.db")
+    try:
+        assert migrations.migrate(path) == LATEST
+        assert {"users", "stores", "history", "history_archive", "price_daily", "llm_cache"} <= _tables(path)
+        assert migrations.migrate(path) == LATEST
+        with db_pool.connection(path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0] == len(migrations.MIGRATIONS)
+    finally:
+        db_pool.close_all_pools()
+
+
+def test_baseline_db_keeps_data(baseline):
+    with db_pool.connection(baseline) as conn:
+        before = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                  for t in ("users", "stores", "suppliers", "store_checklist", "history", "online_items")}
+
+    assert migrations.migrate(baseline) == LATEST
+    assert migrations.migrate(baseline) == LATEST  # 두 번째는 아무것도 안 함
+
+    with db_pool.connection(baseline) as conn:
+        after = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in before}
+        canon = [r[0] for r in conn.execute("SELECT canonical_url FROM online_items ORDER BY id")]
+    assert after == before
+    # 같은 상품 링크 2개 중 최신 행만 canonical_url 을 가짐 (UNIQUE 인덱스)
+    assert canon == [None, "https://www.coupang.com/vp/products/1"]
+
+    rows = database.get_recent_history("admin", 1, None, "", 10)
+    assert [r["output_text"] for r in rows] == ["연어덮밥 감사합니다"]
+    assert database.search_history("admin", 1, "연어덮밥")
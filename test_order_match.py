@@ -0,0 +1,41 @@
+"""order_match: 주문 줄마다 맞는 거래처/링크만 후보로 남는지"""
+import order_match
+
+SUPPLIERS = [
+    {"name": "바다수산", "items": "생연어, 광어, 우럭", "phone": "010-1"},
+    {"name": "하이트상사", "items": "참이슬, 카스", "phone": "010-2"},
+    {"name": "청과물", "items": "대파, 양파, 마늘", "phone": "010-3"},
+    {"name": "김가네", "items": "김", "phone": "010-4"},
+]
+LINKS = [
+    {"alias": "니트릴 위생장갑 100매", "url": "https://example.com/1"},
+    {"alias": "키친타올 6롤", "url": "https://example.com/2"},
+    {"alias": "종이컵 1000개", "url": "https://example.com/3"},
+]
+
+
+def test_split_lines():
+    assert order_match.split_lines("참이슬 3박스, 생연어 2kg\n대파 1단 그리고 양파") == \
+        ["참이슬 3박스", "생연어 2kg", "대파 1단", "양파"]
+
+
+def test_normalize_strips_quantity_and_request():
+    assert order_match.normalize("쿠팡에서 위생장갑 링크 찾아줘") == "쿠팡위생장갑"
+    assert order_match.normalize("생연어 2kg") == "생연어"
+
+
+def test_select_candidates_keeps_only_matches_in_order():
+    sups, links = order_match.select_candidates("참이슬 3박스, 연어 2kg, 위생장갑 찾아줘", SUPPLIERS, LINKS)
+    assert [s["name"] for s in sups] == ["바다수산", "하이트상사"]
+    assert [l["alias"] for l in links] == ["니트릴 위생장갑 100매"]
+
+
+def test_single_char_item_matches():
+    sups, _ = order_match.select_candidates("김 2봉", SUPPLIERS, LINKS)
+    assert "김가네" in [s["name"] for s in sups]
+
+
+def test_top_k_limits_candidates():
+    many = [{"name": f"거래처{i}", "items": "연어", "phone": ""} for i in range(20)]
+    sups, _ = order_match.select_candidates("연어", many, [], k=3)
+    assert len(sups) == 3
@@ -0,0 +1,36 @@
+"""가격 기록: 관측 누적 / 기간 통계 / 캐시 격리"""
+from conftest import new_store
+
+
+def _observe(db, item_id, price):
+    nonce = db.set_price_sync_pending(item_id)
+    assert db.set_price_sync_result(item_id, nonce, price, "연어 1kg", "https://example.com/a")
+
+
+def _item(db):
+    sid = new_store(db, "kim")
+    db.add_online_item(sid, "연어", "쿠팡", "https://example.com/a")
+    return sid, db.get_online_items(sid)[0]["id"]
+
+
+def test_observations_roll_up(fresh_db):
+    db = fresh_db
+    sid, item_id = _item(db)
+    for price in ("12,000", "10000", "14000"):
+        _observe(db, item_id, price)
+    _observe(db, item_id, "가격 없음")  # 숫자가 아니면 관측으로 남기지 않음
+
+    assert [r["price"] for r in db.get_price_history(item_id)] == [14000, 10000, 12000]
+    week = db.get_price_stats(sid)[item_id][7]
+    assert week == {"min": 10000, "max": 14000, "avg": 12000, "n": 3}
+
+
+def test_price_stats_returns_copy(fresh_db):
+    db = fresh_db
+    sid, item_id = _item(db)
+    _observe(db, item_id, "12000")
+
+    stats = db.get_price_stats(sid)
+    stats[item_id][7]["min"] = 0
+    stats[item_id].clear()
+    assert db.get_price_stats(sid)[item_id][7]["min"] == 12000
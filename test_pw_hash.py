@@ -0,0 +1,52 @@
+"""pw_hash: 저장 형식 / 예전 형식 / needs_rehash / 시간 초과 → HashBusy"""
+import asyncio
+import base64
+import hashlib
+import os
+import time
+
+import pytest
+
+import pw_hash
+
+
+def test_format_roundtrip():
+    h = pw_hash.make_hash("비밀번호1", iterations=1000)
+    scheme, iterations, _, _ = h.split("$")
+    assert (scheme, iterations) == ("pbkdf2_sha256", "1000")
+    assert pw_hash.check_hash("비밀번호1", h)
+    assert not pw_hash.check_hash("비밀번호2", h)
+    assert pw_hash.is_hash(h)
+    assert not pw_hash.is_hash("plain-text")
+    assert not pw_hash.check_hash("x", "")
+
+
+def test_legacy_hash_and_rehash(monkeypatch):
+    salt = os.urandom(16)
+    legacy = base64.b64encode(salt + hashlib.pbkdf2_hmac("sha256", b"pw", salt, 120_000)).decode()
+    assert pw_hash.check_hash("pw", legacy)
+    assert pw_hash.needs_rehash(legacy)
+
+    monkeypatch.setattr(pw_hash, "ITERATIONS", 2000)
+    assert pw_hash.needs_rehash(pw_hash.make_hash("pw", iterations=1000))
+    assert not pw_hash.needs_rehash(pw_hash.make_hash("pw", iterations=2000))
+
+
+@pytest.fixture
+def slow_pool(monkeypatch):
+    monkeypatch.setattr(pw_hash, "WORKERS", 1)
+    monkeypatch.setattr(pw_hash, "TIMEOUT", 0.2)
+    yield
+    pw_hash.shutdown()
+
+
+def test_run_timeout_is_hash_busy(slow_pool):
+    before = pw_hash.stats()["abandoned"]
+    with pytest.raises(pw_hash.HashBusy):
+        pw_hash.run(time.sleep, 3)
+    assert pw_hash.stats()["abandoned"] == before + 1
+
+
+def test_run_async_timeout_is_hash_busy(slow_pool):
+    with pytest.raises(pw_hash.HashBusy):
+        asyncio.run(pw_hash.run_async(time.sleep, 3))
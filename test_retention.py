@@ -0,0 +1,45 @@
+"""retention: 보관 재시도 시 refcount 유지 / 스케줄러 종료"""
+from datetime import datetime, timedelta
+
+import retention
+from conftest import new_store
+
+
+def _refcounts(db):
+    with db.get_db() as conn:
+        return dict(conn.execute("SELECT hash, refcount FROM history_blobs").fetchall())
+
+
+def test_archive_retry_keeps_refcounts(fresh_db):
+    db = fresh_db
+    sid = new_store(db, "kim")
+    db.save_history("kim", sid, "REVIEW", "답글", "같은 입력", "출력")
+    db.save_history("kim", sid, "REVIEW", "답글", "같은 입력", "출력2")
+    before = _refcounts(db)
+
+    # 보관 INSERT 뒤 history DELETE 전에 멈춘 것처럼 같은 id 가 양쪽에 있는 상태
+    with db.get_db() as conn:
+        conn.execute("""
+            INSERT INTO history_archive (id, username, store_id, feature, title, input_ref, output_ref, created_at)
+            SELECT id, username, store_id, feature, title, input_ref, output_ref, created_at
+            FROM history ORDER BY id LIMIT 1
+        """)
+
+    later = datetime.now() + timedelta(days=max(retention.POLICIES.values()) + 1)
+    retention.archive_shard(db.DB_PATH, now=later)
+    with db.get_db() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM history").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM history_archive").fetchone()[0] == 2
+    assert _refcounts(db) == before
+    rows = db.get_archived_history("kim", sid, None, "", 10)
+    assert sorted(r["output_text"] for r in rows) == ["출력", "출력2"]
+
+
+def test_stop_scheduler(fresh_db, monkeypatch):
+    monkeypatch.setattr(retention, "INTERVAL_HOURS", 24)
+    retention.start_scheduler(check_seconds=60)
+    thread = retention._scheduler_thread
+    assert thread is not None and thread.is_alive()
+    retention.stop_scheduler()
+    assert not thread.is_alive()
+    assert retention._scheduler_thread is None
@@ -0,0 +1,57 @@
+"""row_cache: 무효화 / 읽는 중 무효화 / 세대 번호가 쌓이지 않는지"""
+import threading
+
+import pytest
+
+from row_cache import RowCache
+
+
+def test_invalidate_reloads():
+    c = RowCache("t", maxsize=8, ttl=60)
+    calls = []
+    load = lambda: calls.append(1) or len(calls)
+    assert c.get_or_load("a", load) == 1
+    assert c.get_or_load("a", load) == 1
+    c.invalidate("a")
+    assert c.get_or_load("a", load) == 2
+    assert c.stats()["invalidations"] == 1
+
+
+def test_invalidate_during_load_is_not_stored():
+    c = RowCache("t", maxsize=8, ttl=60)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "old"
+
+    t = threading.Thread(target=c.get_or_load, args=("a", slow))
+    t.start()
+    started.wait(5)
+    c.invalidate("a")  # 읽는 중에 새 값이 커밋됨
+    release.set()
+    t.join()
+    assert c.get_or_load("a", lambda: "new") == "new"
+
+
+def test_generations_do_not_grow():
+    c = RowCache("t", maxsize=4, ttl=60)
+    for i in range(1000):
+        c.get_or_load(i, lambda: i)
+        c.invalidate(i)
+        c.invalidate(("never-loaded", i))
+    assert not c._gen and not c._loading
+    assert len(c._data) <= 4
+
+
+def test_loader_error_releases_key():
+    c = RowCache("t", maxsize=4, ttl=60)
+
+    def boom():
+        raise ValueError("db")
+
+    with pytest.raises(ValueError):
+        c.get_or_load("a", boom)
+    assert not c._loading
+    assert c.get_or_load("a", lambda: 1) == 1
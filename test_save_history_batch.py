@@ -0,0 +1,28 @@
+"""save_history_batch: 기록 + 할일 + 체크리스트가 한 트랜잭션 (API 스트리밍 생성 저장)"""
+import sqlite3
+
+import pytest
+
+from conftest import new_store
+
+
+def test_saves_everything_under_owner_shard(sharded_db):
+    db = sharded_db
+    sid = new_store(db, "kim")
+    db.set_tenant(None)  # API 는 세션 tenant 없이 부름
+    db.save_history_batch("kim", sid, "EVENT", "이벤트 기획", [("입력", "결과")], ("event", "이벤트 기획 생성"),
+                          last_event_plan_at="2024-01-01T00:00:00")
+    with db.tenant("kim"):
+        assert [r["output_text"] for r in db.get_recent_history("kim", sid, None, "", 5)] == ["결과"]
+        assert db.get_checklist(sid)["last_event_plan_at"] == "2024-01-01T00:00:00"
+        assert "event" in db.get_today_done_groups("kim", sid)
+
+
+def test_failure_leaves_nothing(fresh_db):
+    db = fresh_db
+    sid = new_store(db, "kim")
+    with pytest.raises(sqlite3.OperationalError):
+        db.save_history_batch("kim", sid, "EVENT", "이벤트 기획", [("입력", "결과")], ("event", "이벤트 기획 생성"),
+                              no_such_flag=1)
+    assert db.get_recent_history("kim", sid, None, "", 5) == []
+    assert "event" not in db.get_today_done_groups("kim", sid)
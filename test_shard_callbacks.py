@@ -0,0 +1,55 @@
+"""샤드 모드에서 확장 프로그램 콜백(리뷰 동기화 / 플레이스 스캔 / 가격 스캔)이 주인 샤드에 기록되는지"""
+import pytest
+
+from conftest import new_store
+
+
+def test_review_sync_callback_without_session_tenant(sharded_db):
+    db = sharded_db
+    sid = new_store(db, "kim")
+    with db.tenant("kim"):
+        nonce = db.set_review_sync_pending(sid)
+
+    # 콜백 탭: 로그인 세션 없음 → tenant 가 없으면 조용히 넘어가지 않고 실패해야 함
+    db.set_tenant(None)
+    with pytest.raises(RuntimeError):
+        db.set_review_sync_result(sid, nonce, "OK", 3)
+
+    # streamlit_app.handle_review_sync_qp_global 과 같은 방식: 매장 주인 기준
+    assert db.store_owner(sid) == "kim"
+    with db.tenant(db.store_owner(sid)):
+        assert db.set_review_sync_result(sid, nonce, "OK", 3)
+        ck = db.get_checklist(sid)
+    assert ck["review_unreplied_count"] == 3
+    assert ck["review_sync_status"] == "OK"
+
+
+def test_scout_callback_writes_owner_shard(sharded_db):
+    db = sharded_db
+    kim, lee = new_store(db, "kim"), new_store(db, "lee", "다른매장")
+    with db.tenant(db.store_owner(kim)):
+        db.update_checklist_flags(kim, has_hours=1, last_scout_at=db.now_iso())
+    with db.tenant("kim"):
+        assert db.get_checklist(kim)["has_hours"] == 1
+    with db.tenant("lee"):
+        assert db.get_checklist(lee)["has_hours"] == 0
+
+
+def test_price_callback_uses_session_tenant(sharded_db):
+    db = sharded_db
+    sid = new_store(db, "kim")
+    with db.tenant("kim"):
+        db.add_online_item(sid, "연어", "쿠팡", "https://example.com/a")
+        item = db.get_online_items(sid)[0]
+        nonce = db.set_price_sync_pending(item["id"])
+
+    # tenant 없이 불리면 False 로 삼키지 않고 실패
+    db.set_tenant(None)
+    with pytest.raises(RuntimeError):
+        db.set_price_sync_result(item["id"], nonce, "12,000", "연어 1kg", "https://example.com/a")
+
+    # 가격 콜백은 item_id 만 오므로 로그인 세션의 tenant 로 기록 (set_tenant 뒤에 핸들러 실행)
+    db.set_tenant("kim")
+    assert db.set_price_sync_result(item["id"], nonce, "12,000", "연어 1kg", "https://example.com/a")
+    assert db.get_online_items(sid)[0]["last_confirmed_price"] == 12000
+
@@ -0,0 +1,31 @@
+"""url_canon: 같은 상품 링크가 같은 canonical URL 이 되는지"""
+import pytest
+
+from url_canon import canonical_url, online_item_key
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://m.coupang.com/vm/products/123?itemId=4&src=1042503&q=새우", "https://www.coupang.com/vp/products/123?itemId=4"),
+    ("coupang.com/vp/products/123/?vendorItemId=9&itemId=4#reviews",
+     "https://www.coupang.com/vp/products/123?itemId=4&vendorItemId=9"),
+    ("http://m.smartstore.naver.com/shop/products/55?NaPm=ct%3Dabc&n_media=1",
+     "https://smartstore.naver.com/shop/products/55"),
+    ("https://item.gmarket.co.kr/Item?goodscode=777&ver=1", "https://item.gmarket.co.kr/Item?goodscode=777"),
+    ("https://www.example.com//shop/?utm_source=x&b=2&a=1&fbclid=z", "https://example.com/shop?a=1&b=2"),
+    ("https://example.com:8080/p", "https://example.com:8080/p"),
+    ("  ", ""),
+])
+def test_canonical_url(url, expected):
+    assert canonical_url(url) == expected
+
+
+def test_coupang_search_page_keeps_query():
+    # 상품 페이지가 아니면 쇼핑몰 규칙(파라미터 제거)을 적용하지 않음
+    assert canonical_url("https://www.coupang.com/np/search?q=연어&src=1") == \
+        canonical_url("https://www.coupang.com/np/search?q=연어")
+    assert "q=" in canonical_url("https://www.coupang.com/np/search?q=연어")
+
+
+def test_online_item_key_falls_back_to_alias():
+    assert online_item_key(" 생 연어 ", "") == "alias:생 연어"
+    assert online_item_key("연어", "https://m.coupang.com/vm/products/1") == "https://www.coupang.com/vp/products/1"
@@ -0,0 +1,83 @@
+"""
+상품 링크 정규화 (중복 링크 판단용).
+
+같은 상품인데 추적 파라미터, 모바일 주소, http/https 차이로 URL 문자열이 달라지는 경우를
+하나의 canonical URL 로 모은다. online_items.canonical_url 에 저장되고
+(store_id, canonical_url) UNIQUE 인덱스로 중복 등록을 막는다.
+규칙을 바꾸면 기존 행의 canonical_url 을 다시 계산하는 마이그레이션도 추가할 것.
+
+    canonical_url("https://m.coupang.com/vm/products/123?itemId=4&src=1042503&q=새우")
+    -> "https://www.coupang.com/vp/products/123?itemId=4"
+"""
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 어느 쇼핑몰이든 지우는 추적/광고 파라미터
+_TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "igshid", "napm", "nacn", "ref", "referrer",
+    "src", "spec", "addtag", "ctag", "lptag", "itime", "pagetype", "pagevalue",
+    "wpcid", "wref", "wtime", "redirect", "isaddedcart", "traceid", "sourcetype",
+    "clickeventid", "searchid", "rank", "frm", "tr", "trtype", "inflow",
+}
+_TRACKING_PREFIXES = ("utm_", "n_", "nt_", "_ga")
+
+# 쇼핑몰별 규칙: (host 패턴, 대표 host, 상품 페이지 경로, 상품을 구분하는 파라미터)
+#   상품 페이지면 지정 파라미터만 남기고(빈 set = 전부 제거), 검색 페이지 등은 공통 규칙만 적용
+_MALL_RULES = [
+    # 쿠팡: m.coupang.com/vm/products/1 == www.coupang.com/vp/products/1 (?q= 는 검색어 추적)
+    (re.compile(r"(^|\.)coupang\.com$"), "www.coupang.com", re.compile(r"^/v[pm]/products/"), {"itemid", "vendoritemid"}),
+    # 네이버 스마트스토어/브랜드스토어: 경로(스토어/상품번호)만으로 구분
+    (re.compile(r"(^|\.)smartstore\.naver\.com$"), "smartstore.naver.com", re.compile(r"/products/"), set()),
+    (re.compile(r"(^|\.)brand\.naver\.com$"), "brand.naver.com", re.compile(r"/products/"), set()),
+    # 11번가
+    (re.compile(r"(^|\.)11st\.co\.kr$"), "www.11st.co.kr", re.compile(r"/products/"), set()),
+    # G마켓 / 옥션: goodscode / itemno 로 구분
+    (re.compile(r"(^|\.)gmarket\.co\.kr$"), "item.gmarket.co.kr", re.compile(r"^/item", re.I), {"goodscode"}),
+    (re.compile(r"(^|\.)auction\.co\.kr$"), "itempage3.auction.co.kr", re.compile(r"^/detailview", re.I), {"itemno"}),
+]
+
+
+def _is_tracking(key: str) -> bool:
+    k = key.lower()
+    return k in _TRACKING_PARAMS or k.startswith(_TRACKING_PREFIXES)
+
+
+def canonical_url(url: str) -> str:
+    """비교용 URL. 빈 값이면 "" 반환."""
+    url = "".join((url or "").split())
+    if not url:
+        return ""
+    if "://" not in url:
+        url = "https://" + url.lstrip("/")
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    if len(path) > 1:
+        path = path.rstrip("/")
+    params = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k)]
+
+    for host_re, mall_host, product_re, keep in _MALL_RULES:
+        if host_re.search(host):
+            if mall_host == "www.coupang.com":
+                path = path.replace("/vm/products/", "/vp/products/")
+            if product_re.search(path):
+                host = mall_host
+                params = [(k, v) for k, v in params if k.lower() in keep]
+            break
+    else:
+        if host.startswith(("www.", "m.")):
+            host = host.split(".", 1)[1]
+
+    # http/https, 파라미터 순서, #fragment 차이는 같은 상품으로 본다
+    return urlunsplit(("https", host, path, urlencode(sorted(params)), ""))
+
+
+def online_item_key(alias: str, url: str) -> str:
+    """online_items.canonical_url 값: 정규화 URL (URL 이 없으면 상품명)."""
+    c = canonical_url(url)
+    return c if c else "alias:" + " ".join((alias or "").split())
@@ -5,35 +5,51 @@ import urllib.parse
 import json
 import pandas as pd
 import re
-from openai import OpenAI
+from typing import Optional
 
+import llm
+import order_match
+import prompts
 from constants import CATEGORY_PROFILES
 from database import (
-    save_history, update_checklist_flags, save_todo_event, now_iso,
+    save_history, save_history_batch, update_checklist_flags, save_todo_event, now_iso,
     get_suppliers, get_online_items, get_store, add_supplier, update_supplier, delete_supplier,
-    delete_online_item, add_online_item, set_price_sync_pending, set_price_sync_result, mark_price_sync_fail,
-    ensure_online_items_price_columns, DB_PATH
+    delete_online_item, set_price_sync_pending, set_price_sync_result, mark_price_sync_fail,
+    count_online_items, update_online_item, update_online_item_url,
+    delete_all_online_items, dedupe_online_items, get_price_stats
 )
+from bulk_import import import_online_items, import_suppliers, summarize
 from utils import get_naver_coordinates, naver_button, insta_button
-import sqlite3
 
-# OpenAI Client Setup (Centralized Assistant Model)
-def get_client():
-    # Priority 1: Streamlit Secrets (Recommended for Replit/Cloud)
-    key = None
+# OpenAI 설정: 키는 처음 한 번만 읽어서 llm.py 에 넘김 (클라이언트는 llm.py 가 프로세스당 1개 유지)
+def llm_ready() -> bool:
+    if not llm.available():
+        try:
+            if "OPENAI_API_KEY" in st.secrets:
+                llm.configure(st.secrets["OPENAI_API_KEY"])
+        except Exception:
+            pass
+    return llm.available()
+
+def stream_llm(prompt: str, cache: Optional[str] = None, refresh: bool = False) -> str:
+    """답변을 받는 대로 화면에 흘려 보여주고, 다 받으면 지우고 전체 문자열 반환
+    (결과는 호출한 쪽이 session_state 에 넣고 원래 자리의 text_area 등으로 다시 그림)
+    실패하면 안내 문구를 보여주고 이번 실행을 멈춤 - 저장(save_history 등) 단계로 넘어가지 않게.
+    cache: 응답 캐시를 쓰는 기능 이름 (llm_cache.py), refresh: 캐시 무시하고 새로 생성"""
+    box = st.empty()
     try:
-        if "OPENAI_API_KEY" in st.secrets:
-            key = st.secrets["OPENAI_API_KEY"]
-    except:
-        pass
-    
-    # Priority 2: Environment Variables
-    if not key:
-        key = os.environ.get("OPENAI_API_KEY")
-    
-    if key and key.strip() and key.strip() != "여기에_키를_붙여넣으세요":
-        return OpenAI(api_key=key.strip())
-    return None
+        with box.container(border=True):
+            text = st.write_stream(llm.ask_stream(prompt, cache=cache, refresh=refresh))
+    except llm.LLMRateLimited as e:
+        box.empty()
+        st.warning(f"⚠️ {e}")
+        st.stop()
+    except llm.LLMError as e:
+        box.empty()
+        st.error(f"🤖 AI 응답 실패: {e}")
+        st.stop()
+    box.empty()
+    return text
 
 def render_place(u_name, u_addr, cat_label, u_sig, u_str, u_target):
     st.subheader("네이버 플레이스 셋팅")
@@ -43,19 +59,17 @@ def render_place(u_name, u_addr, cat_label, u_sig, u_str, u_target):
 
     with st.expander("STEP 2. 상세 정보 생성", expanded=True):
         st.markdown("#### 1. 대표 키워드 생성(5개)")
-        if st.button("키워드 추출", type="primary", use_container_width=True, key="place_kw_btn"):
-            if not client:
+        gen_col, regen_col = st.columns([4, 1])
+        gen = gen_col.button("키워드 추출", type="primary", use_container_width=True, key="place_kw_btn")
+        regen = regen_col.button("🔄 새로", use_container_width=True, key="place_kw_regen", help="저장된 결과 대신 새로 생성")
+        if gen or regen:
+            if not llm_ready():
                 st.error("🤖 서버 설정 오류: 관리자에게 OpenAI API Key 설정을 요청하세요.")
                 return
-            with st.spinner("분석 중..."):
-                prompt = f"매장:{u_name}, 지역:{u_addr}, 업종:{cat_label}, 메뉴:{u_sig}. 네이버 플레이스용 SEO 키워드 5개 추천 (형식: #키워드1 #키워드2...)"
-                res = cur_client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                st.session_state.p_keywords = res.choices[0].message.content
-                save_history(st.session_state.username, st.session_state.store_id, "PLACE", "플레이스 키워드", f"{u_name} / {cat_label} / {u_addr} / {u_sig}", st.session_state.p_keywords)
-                update_checklist_flags(st.session_state.store_id, has_keywords=1)
+            prompt = prompts.place_keywords(u_name, u_addr, cat_label, u_sig)
+            st.session_state.p_keywords = stream_llm(prompt, cache="place_keywords", refresh=regen)
+            save_history(st.session_state.username, st.session_state.store_id, "PLACE", "플레이스 키워드", f"{u_name} / {cat_label} / {u_addr} / {u_sig}", st.session_state.p_keywords)
+            update_checklist_flags(st.session_state.store_id, has_keywords=1)
 
         if st.session_state.get("p_keywords"):
             st.text_area("결과", value=st.session_state.p_keywords, height=80, key="place_kw_out")
@@ -65,21 +79,13 @@ def render_place(u_name, u_addr, cat_label, u_sig, u_str, u_target):
         in_phone = st.text_input("대표 번호", placeholder="02-xxxx-xxxx", key="place_phone")
         in_time = st.text_input("영업 시간", placeholder="매일 10:00 - 22:00", key="place_time")
         if st.button("상세 설명 생성", type="primary", use_container_width=True, key="place_desc_btn"):
-            if not client:
+            if not llm_ready():
                 st.error("🤖 서버 설정 오류: 관리자에게 OpenAI API Key 설정을 요청하세요.")
                 return
-            with st.spinner("작성 중..."):
-                prompt = f"""
-                매장:{u_name}, 업종:{cat_label}, 주소:{u_addr}, 전화:{in_phone}, 시간:{in_time},
-                특징:{u_str}, 메뉴:{u_sig}, 타겟:{u_target}. 네이버 플레이스 상세설명. 신뢰감 있고 전문적인 톤으로 작성.
-                """
-                res = cur_client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                st.session_state.p_desc = res.choices[0].message.content
-                save_history(st.session_state.username, st.session_state.store_id, "PLACE", "플레이스 상세설명", f"전화:{in_phone} / 시간:{in_time}", st.session_state.p_desc)
-                update_checklist_flags(st.session_state.store_id, has_place_desc=1)
+            prompt = prompts.place_description(u_name, cat_label, u_addr, in_phone, in_time, u_str, u_sig, u_target)
+            st.session_state.p_desc = stream_llm(prompt)
+            save_history(st.session_state.username, st.session_state.store_id, "PLACE", "플레이스 상세설명", f"전화:{in_phone} / 시간:{in_time}", st.session_state.p_desc)
+            update_checklist_flags(st.session_state.store_id, has_place_desc=1)
 
         if st.session_state.get("p_desc"):
             st.text_area("결과", value=st.session_state.p_desc, height=250, key="place_desc_out")
@@ -87,9 +93,11 @@ def render_place(u_name, u_addr, cat_label, u_sig, u_str, u_target):
         st.markdown("---")
         st.markdown("#### 3. 찾아오시는 길 생성")
         in_addr = st.text_input("매장 주소", value=u_addr, key="place_addr")
-        if st.button("길 안내 문구 생성", type="primary", use_container_width=True, key="place_way_btn"):
-            client = get_client()
-            if not client:
+        gen_col, regen_col = st.columns([4, 1])
+        gen = gen_col.button("길 안내 문구 생성", type="primary", use_container_width=True, key="place_way_btn")
+        regen = regen_col.button("🔄 새로", use_container_width=True, key="place_way_regen", help="저장된 결과 대신 새로 생성")
+        if gen or regen:
+            if not llm_ready():
                 st.error("🤖 AI 서버 연결 실패: .streamlit/secrets.toml 파일에 올바른 API 키가 입력되어 있는지 확인해주세요.")
                 return
             with st.spinner("경로 분석 중..."):
@@ -102,24 +110,10 @@ def render_place(u_name, u_addr, cat_label, u_sig, u_str, u_target):
                 nsecret = os.environ.get("NAVER_CLIENT_SECRET")
                 
                 lng, lat, _ = get_naver_coordinates(in_addr, nid, nsecret)
-                tone_prompt = """
-                [작성 지침]
-                1. 감정적인 표현(친절한, 맛있는 등)을 배제할 것.
-                2. 내비게이션처럼 정확한 미터(m)와 방향(좌회전/우회전) 위주로 서술할 것.
-                3. 랜드마크(편의점, 은행 등)를 기준으로 설명할 것.
-                4. 예시: '사당역 10번 출구에서 150m 직진 후 스타벅스 골목으로 진입. 1층에 위치.'
-                """
-                if lng and lat:
-                    prompt = f"매장:{u_name}, 업종:{cat_label}, 주소:{u_addr}, 좌표:({lat},{lng}). {tone_prompt}"
-                else:
-                    prompt = f"매장:{u_name}, 업종:{cat_label}, 주소:{u_addr}. {tone_prompt}"
-                res = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                st.session_state.p_way = res.choices[0].message.content
-                save_history(st.session_state.username, st.session_state.store_id, "PLACE", "찾아오시는 길", in_addr, st.session_state.p_way)
-                update_checklist_flags(st.session_state.store_id, has_way_guide=1)
+            prompt = prompts.way_guide(u_name, cat_label, u_addr, lat, lng)
+            st.session_state.p_way = stream_llm(prompt, cache="way_guide", refresh=regen)
+            save_history(st.session_state.username, st.session_state.store_id, "PLACE", "찾아오시는 길", in_addr, st.session_state.p_way)
+            update_checklist_flags(st.session_state.store_id, has_way_guide=1)
 
         if st.session_state.get("p_way"):
             st.text_area("결과", value=st.session_state.p_way, height=120, key="place_way_out")
@@ -130,19 +124,17 @@ def render_place(u_name, u_addr, cat_label, u_sig, u_str, u_target):
         pk_detail = ""
         if pk_opt == "가능":
             pk_detail = st.text_input("주차장 상세 위치", placeholder="예: 건물 뒤 3대 가능", key="place_pk_detail")
-        if st.button("주차 안내 문구 생성", type="primary", use_container_width=True, key="place_pk_btn"):
-            if not client:
+        gen_col, regen_col = st.columns([4, 1])
+        gen = gen_col.button("주차 안내 문구 생성", type="primary", use_container_width=True, key="place_pk_btn")
+        regen = regen_col.button("🔄 새로", use_container_width=True, key="place_pk_regen", help="저장된 결과 대신 새로 생성")
+        if gen or regen:
+            if not llm_ready():
                 st.error("OpenAI API Key가 필요합니다.")
                 return
-            with st.spinner("분석 중..."):
-                prompt = f"매장:{u_name}, 업종:{cat_label}, 주소:{u_addr}. 주차상태:{pk_opt}, 상세:{pk_detail}. 주차 안내 문구. 간결하고 명확하게."
-                res = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                st.session_state.p_parking = res.choices[0].message.content
-                save_history(st.session_state.username, st.session_state.store_id, "PLACE", "주차 안내", f"{pk_opt} / {pk_detail}", st.session_state.p_parking)
-                update_checklist_flags(st.session_state.store_id, has_parking_guide=1)
+            prompt = prompts.parking_guide(u_name, cat_label, u_addr, pk_opt, pk_detail)
+            st.session_state.p_parking = stream_llm(prompt, cache="parking_guide", refresh=regen)
+            save_history(st.session_state.username, st.session_state.store_id, "PLACE", "주차 안내", f"{pk_opt} / {pk_detail}", st.session_state.p_parking)
+            update_checklist_flags(st.session_state.store_id, has_parking_guide=1)
 
         if st.session_state.get("p_parking"):
             st.text_area("결과", value=st.session_state.p_parking, height=80, key="place_pk_out")
@@ -156,19 +148,13 @@ def render_place(u_name, u_addr, cat_label, u_sig, u_str, u_target):
         q_input = st.text_input("질문 입력", placeholder="예: 플레이스 순위 올리는 법", key="place_qa_in")
         if st.button("질문하기", type="primary", use_container_width=True, key="place_qa_btn"):
             if q_input.strip():
-                client = get_client()
-                if not client:
+                if not llm_ready():
                     st.error("🤖 AI 서버 연결 실패: .streamlit/secrets.toml 확인 필요")
                     return
-                with st.spinner("답변 작성 중..."):
-                    prompt = f"네이버 스마트플레이스 전문가로서 답변: {q_input}. 매장:{u_name}. 전문적이고 간결하게."
-                    res = client.chat.completions.create(
-                        model="gpt-4o-mini",
-                        messages=[{"role": "user", "content": prompt}]
-                    )
-                    st.session_state.place_qa_res = res.choices[0].message.content
-                    save_history(st.session_state.username, st.session_state.store_id, "QA", "플레이스 Q&A", q_input, st.session_state.place_qa_res)
-                    update_checklist_flags(st.session_state.store_id, last_place_qa_at=now_iso())
+                prompt = prompts.place_qa(u_name, q_input)
+                st.session_state.place_qa_res = stream_llm(prompt)
+                save_history(st.session_state.username, st.session_state.store_id, "QA", "플레이스 Q&A", q_input, st.session_state.place_qa_res)
+                update_checklist_flags(st.session_state.store_id, last_place_qa_at=now_iso())
             else:
                 st.error("질문을 입력해 주세요.")
 
@@ -194,11 +180,8 @@ def render_review(u_name, cat_label, u_sig, u_review_url):
     with col1:
         with st.container(border=True):
             st.markdown("#### ⚙️ 답글 설정")
-            tone = st.selectbox("어떤 말투로 쓸까요?", [
-                "🥰 친절하고 감성적으로 (이모지 포함)", "👔 정중하고 전문적으로 (신뢰감)",
-                "🤣 유쾌하고 위트있게 (동네 형/누나처럼)", "🛡️ 클레임 대응 (차분하고 공감하며)"
-            ], index=0)
-            length = st.radio("글 길이", ["짧고 간결하게", "보통", "길고 정성스럽게"], index=1, horizontal=True)
+            tone = st.selectbox("어떤 말투로 쓸까요?", prompts.REVIEW_TONES, index=0)
+            length = st.radio("글 길이", prompts.REVIEW_LENGTHS, index=1, horizontal=True)
             keywords = st.text_input("꼭 넣고 싶은 말 (선택)", placeholder="예: 다음주 신메뉴 출시 / 단체석 완비")
 
     with col2:
@@ -210,41 +193,16 @@ def render_review(u_name, cat_label, u_sig, u_review_url):
                 if not u_rev.strip():
                     st.error("리뷰 내용을 입력해 주세요!")
                 else:
-                    client = get_client()
-                    if not client:
+                    if not llm_ready():
                         st.error("🤖 서버 설정 오류: .streamlit/secrets.toml 확인 필요")
                         return
-                    with st.spinner("사장님의 마음을 담아 작성 중... ✍️"):
-                        prompt = f"""
-                        역할: {cat_label} 매장 '{u_name}'의 센스 있는 사장님.
-                        상황: 손님 리뷰에 대한 답글 작성.
-
-                        [매장 정보]
-                        - 업종: {cat_label}
-                        - 대표메뉴: {u_sig}
-
-                        [손님 리뷰]
-                        "{u_rev}"
-
-                        [작성 지침]
-                        1. 말투: {tone}
-                        2. 길이: {length}
-                        3. 필수 포함 내용: {keywords if keywords else "없음 (문맥에 맞게 자연스럽게 마무리)"}
-                        4. 고객의 리뷰 내용을 구체적으로 언급하여 '복붙' 느낌이 나지 않게 할 것.
-                        """
-                        try:
-                            res = client.chat.completions.create(
-                                model="gpt-4o-mini",
-                                messages=[{"role": "user", "content": prompt}]
-                            )
-                            out = res.choices[0].message.content
-                            st.session_state.res_rev = out
-                            save_history(st.session_state.username, st.session_state.store_id, "REVIEW", "리뷰 답글", u_rev, out)
-                            update_checklist_flags(st.session_state.store_id, last_review_reply_at=now_iso())
-                            save_todo_event(st.session_state.username, st.session_state.store_id, "review", "리뷰 답글 생성", "DONE")
-                            st.success("생성 완료!")
-                        except Exception as e:
-                            st.error(f"오류 발생: {str(e)}")
+                    prompt = prompts.review_reply(u_name, cat_label, u_sig, u_rev, tone, length, keywords)
+                    out = stream_llm(prompt)
+                    st.session_state.res_rev = out
+                    save_history(st.session_state.username, st.session_state.store_id, "REVIEW", "리뷰 답글", u_rev, out)
+                    update_checklist_flags(st.session_state.store_id, last_review_reply_at=now_iso())
+                    save_todo_event(st.session_state.username, st.session_state.store_id, "review", "리뷰 답글 생성", "DONE")
+                    st.success("생성 완료!")
 
     if st.session_state.get("res_rev"):
         st.markdown("---")
@@ -252,18 +210,84 @@ def render_review(u_name, cat_label, u_sig, u_review_url):
         st.info("마음에 들면 복사해서 네이버 답글창에 붙여넣으세요!")
         st.code(st.session_state.res_rev, language="text")
 
+    render_review_batch(u_name, cat_label, u_sig, tone, length, keywords)
+
+REVIEW_BATCH_MAX = 200
+
+def split_reviews(text: str):
+    """빈 줄로 구분된 리뷰 여러 개 → 리스트"""
+    return [r.strip() for r in re.split(r"\n\s*\n", text or "") if r.strip()]
+
+def reviews_from_upload(up_file):
+    df = read_bulk_upload(up_file).fillna("")
+    col = next((c for c in df.columns if str(c).strip().lower() in ("리뷰", "review", "내용")), df.columns[0])
+    return [str(v).strip() for v in df[col] if str(v).strip()]
+
+def render_review_batch(u_name, cat_label, u_sig, tone, length, keywords):
+    """여러 리뷰를 한 번에: 동시에 llm.CONCURRENCY 개씩 생성, 끝나는 대로 표에 채움, 저장은 마지막에 트랜잭션 1개"""
+    with st.expander("📚 여러 리뷰 한 번에 답글 만들기", expanded=False):
+        st.caption(f"리뷰를 빈 줄로 구분해서 붙여넣거나 엑셀/CSV('리뷰' 열)를 올려주세요. 한 번에 최대 {REVIEW_BATCH_MAX}개. 말투/길이 설정은 위와 같습니다.")
+        batch_text = st.text_area("리뷰 여러 개 붙여넣기", height=200, key="rev_batch_in",
+                                  placeholder="음식이 맛있어요!\n\n주차가 좀 불편했어요 ㅠㅠ\n\n직원분이 친절해요")
+        up = st.file_uploader("또는 파일 업로드", type=["xlsx", "csv"], key="rev_batch_file")
+
+        if st.button("✨ 일괄 답글 생성", type="primary", use_container_width=True, key="rev_batch_btn"):
+            reviews = split_reviews(batch_text)
+            if up is not None:
+                try:
+                    reviews += reviews_from_upload(up)
+                except Exception as e:
+                    st.error(f"파일을 읽을 수 없습니다: {e}")
+                    return
+            if not reviews:
+                st.error("리뷰 내용을 입력해 주세요!")
+                return
+            if len(reviews) > REVIEW_BATCH_MAX:
+                st.warning(f"{len(reviews)}개 중 앞의 {REVIEW_BATCH_MAX}개만 생성합니다.")
+                reviews = reviews[:REVIEW_BATCH_MAX]
+            if not llm_ready():
+                st.error("🤖 서버 설정 오류: .streamlit/secrets.toml 확인 필요")
+                return
+
+            rows = [{"리뷰": r, "답글": "", "상태": "⏳ 대기"} for r in reviews]
+            bar = st.progress(0.0, text=f"0 / {len(rows)}")
+            table = st.empty()
+            table.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+            batch_prompts = [prompts.review_reply(u_name, cat_label, u_sig, r, tone, length, keywords) for r in reviews]
+            for n, (i, out, err) in enumerate(llm.ask_many(batch_prompts), start=1):
+                rows[i]["답글"], rows[i]["상태"] = (out, "✅ 완료") if err is None else ("", f"❌ {err}")
+                bar.progress(n / len(rows), text=f"{n} / {len(rows)}")
+                table.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+            done = [(r["리뷰"], r["답글"]) for r in rows if r["답글"]]
+            if done:
+                save_history_batch(st.session_state.username, st.session_state.store_id, "REVIEW", "리뷰 답글", done,
+                                   todo=("review", "리뷰 답글 생성"), last_review_reply_at=now_iso())
+            st.session_state.res_rev_batch = rows
+            table.empty()
+            bar.empty()
+            failed = len(rows) - len(done)
+            if failed:
+                st.warning(f"{len(done)}개 완료, {failed}개 실패 (실패한 리뷰만 다시 붙여넣어 생성해 주세요)")
+            else:
+                st.success(f"{len(done)}개 답글 생성 완료!")
+
+        if st.session_state.get("res_rev_batch"):
+            df = pd.DataFrame(st.session_state.res_rev_batch)
+            st.dataframe(df, use_container_width=True, hide_index=True)
+            st.download_button("📥 CSV 로 받기", df.to_csv(index=False).encode("utf-8-sig"),
+                               file_name="review_replies.csv", mime="text/csv", key="rev_batch_dl")
+
 def render_blog(u_name, cat_label, u_ben):  # Added u_ben as arg? No main.py logic was: u_ben = st.text_input. So it's inside.
     st.subheader("체험단 모집")
     # Need to handle inputs inside here as in main.py
     u_ben_input = st.text_input("혜택", placeholder="예: 2인 식사 제공 / 디저트 제공 / 시술 1회 제공", key="blog_in")
     if st.button("공고 생성", type="primary", use_container_width=True, key="blog_btn"):
-        client = get_client()
-        if not client:
+        if not llm_ready():
             st.error("🤖 서버 설정 오류: .streamlit/secrets.toml 확인 필요")
             return
-        prompt = f"매장:{u_name}, 업종:{cat_label}, 혜택:{u_ben_input}. 블로그 체험단 모집글. 자연스러운 모집 문구 + 참여 조건 + 방문 안내 포함."
-        res = client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": prompt}])
-        out = res.choices[0].message.content
+        prompt = prompts.blog_recruit(u_name, cat_label, u_ben_input)
+        out = stream_llm(prompt)
         st.session_state.res_blo = out
         save_history(st.session_state.username, st.session_state.store_id, "BLOG", "체험단 모집", u_ben_input, out)
         update_checklist_flags(st.session_state.store_id, last_blog_post_at=now_iso())
@@ -279,13 +303,11 @@ def render_insta(u_name, cat_label, u_sig, u_addr, u_insta_url):
 
     u_cap = st.text_input("사진 설명", placeholder="예: 오늘 만든 딸기 생크림 케이크 / 점심 특선 / 회식 추천 세트", key="ins_in")
     if st.button("캡션 생성", type="primary", use_container_width=True, key="ins_btn"):
-        client = get_client()
-        if not client:
+        if not llm_ready():
             st.error("🤖 서버 설정 오류: .streamlit/secrets.toml 확인 필요")
             return
-        prompt = f"매장:{u_name}, 업종:{cat_label}, 설명:{u_cap}, 메뉴:{u_sig}, 지역:{u_addr}. 인스타 감성 캡션 1개 + 해시태그 12개."
-        res = client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": prompt}])
-        out = res.choices[0].message.content
+        prompt = prompts.insta_caption(u_name, cat_label, u_cap, u_sig, u_addr)
+        out = stream_llm(prompt)
         st.session_state.res_ins = out
         save_history(st.session_state.username, st.session_state.store_id, "INSTA", "인스타 캡션", u_cap, out)
         update_checklist_flags(st.session_state.store_id, last_insta_caption_at=now_iso(), has_insta_url=1 if (u_insta_url or "").strip() else 0)
@@ -301,27 +323,11 @@ def render_event(u_name, cat_label, u_addr, u_sig, u_str, u_target):
     u_period = st.text_input("기간", placeholder="예: 이번 주 금~일 / 2월 한달 / 매주 월~목", key="evt_period")
 
     if st.button("이벤트 기획 생성", type="primary", use_container_width=True, key="evt_btn"):
-        if not client:
+        if not llm_ready():
             st.error("OpenAI API Key가 필요합니다.")
             return
-        prompt = f"""
-        매장:{u_name}
-        업종:{cat_label}
-        주소:{u_addr}
-        대표메뉴:{u_sig}
-        강점:{u_str}
-        타겟:{u_target}
-
-        목표:{u_goal}
-        주제:{u_theme}
-        기간:{u_period}
-
-        오프라인 매장용 이벤트 기획안을 만들어줘.
-        포함: (1) 이벤트 한줄 컨셉 (2) 혜택/구성 (3) 참여 방법 (4) 홍보 문구 2개 (5) 주의사항
-        톤: 간결하고 실행가능하게.
-        """
-        res = client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": prompt}])
-        out = res.choices[0].message.content
+        prompt = prompts.event_plan(u_name, cat_label, u_addr, u_sig, u_str, u_target, u_goal, u_theme, u_period)
+        out = stream_llm(prompt)
         st.session_state.res_evt = out
         save_history(st.session_state.username, st.session_state.store_id, "EVENT", "이벤트 기획", f"{u_goal} / {u_theme} / {u_period}", out)
         update_checklist_flags(st.session_state.store_id, last_event_plan_at=now_iso())
@@ -330,9 +336,24 @@ def render_event(u_name, cat_label, u_addr, u_sig, u_str, u_target):
     if st.session_state.get("res_evt"):
         st.text_area("결과", value=st.session_state.res_evt, height=350, key="evt_out")
 
-def render_order():
-    ensure_online_items_price_columns()
+def read_bulk_upload(up_file):
+    """업로드 파일(xlsx/csv) → DataFrame (모든 값은 문자열로)"""
+    if up_file.name.lower().endswith(".csv"):
+        return pd.read_csv(up_file, dtype=str)
+    return pd.read_excel(up_file, dtype=str)
+
+def render_bulk_result(results):
+    s = summarize(results)
+    if s["added"]:
+        st.success(f"{s['added']}개 등록 완료!")
+    if s["duplicate"] or s["invalid"]:
+        st.warning(f"건너뜀: 중복 {s['duplicate']}개 / 오류 {s['invalid']}개")
+        skipped = [r for r in results if r["status"] != "added"]
+        st.dataframe(pd.DataFrame(skipped), use_container_width=True, hide_index=True)
+    if not results:
+        st.info("등록할 행이 없습니다.")
 
+def render_order():
     # -----------------------------------------------------------
     # [1] 가격 스캔 결과 처리
     # -----------------------------------------------------------
@@ -360,11 +381,7 @@ def render_order():
             if p_status == "OK":
                 set_price_sync_result(item_id, nonce, price, title, url)
                 if url and url.startswith("http"):
-                    conn = sqlite3.connect(DB_PATH)
-                    c = conn.cursor()
-                    c.execute("UPDATE online_items SET url=? WHERE id=?", (url, item_id))
-                    conn.commit()
-                    conn.close()
+                    update_online_item_url(item_id, url)
                 st.toast(f"✅ 가격({price}원) 및 링크 업데이트 완료!", icon="🔗")
             else:
                 mark_price_sync_fail(item_id)
@@ -388,12 +405,7 @@ def render_order():
 
     # Counts for Badges (Fetch Fresh)
     suppliers_count = len(get_suppliers(st.session_state.store_id))
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("SELECT COUNT(*) FROM online_items WHERE store_id = ?", (st.session_state.store_id, ))
-        links_count = c.fetchone()[0]
-        conn.close()
+    try: links_count = count_online_items(st.session_state.store_id)
     except: links_count = 0
     
     # Render Segmented Control
@@ -418,15 +430,10 @@ def render_order():
     if tab_id == "order":
         suppliers = get_suppliers(st.session_state.store_id)
 
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
         try:
-            c.execute("SELECT * FROM online_items WHERE store_id = ? ORDER BY is_fixed DESC, alias ASC", (st.session_state.store_id, ))
-            links = [dict(row) for row in c.fetchall()]
+            links = get_online_items(st.session_state.store_id, order="alias")
         except:
             links = get_online_items(st.session_state.store_id)
-        conn.close()
 
         store_info = get_store(st.session_state.store_id)
         my_store_name = store_info['store_name'] if store_info else "사장"
@@ -444,55 +451,19 @@ def render_order():
             order_text = st.text_area("주문 내용 입력", height=100, placeholder="예: 참이슬 3박스, 연어 5kg...")
 
             if st.button("AI 주문서 생성 ✨", type="primary", use_container_width=True):
-                client = get_client()
                 if not order_text.strip():
                     st.error("주문할 내용을 입력해주세요.")
                 else:
-                    if not client:
+                    if not llm_ready():
                          st.error("🤖 서버 설정 오류: .streamlit/secrets.toml 파일에 OpenAI API Key 설정을 확인해주세요.")
                          return
                     with st.spinner("🤖 데이터를 분석 중입니다..."):
                         try:
-                            sup_list_str = "\n".join([
-                                f"- [문자거래처] {s['name']} (취급품목: {s['items']}, 전화: {s['phone']})"
-                                for s in suppliers
-                            ])
-
-                            link_list_str = "\n".join([
-                                f"- [온라인링크] {l['alias']} (쇼핑몰: {l['mall_name']}, "
-                                f"가격: {(format(int(l.get('last_confirmed_price', 0)), ',') + '원') if l.get('last_confirmed_price') else '가격미확인'}, "
-                                f"URL: {l['url']})"
-                                for l in links
-                            ])
-
-                            prompt = f"""
-                            당신은 자재 발주 관리자입니다.
-                            [사용자 주문]
-                            {order_text}
-
-                            [등록된 거래처 정보]
-                            {sup_list_str}
-
-                            [등록된 온라인 링크 정보]
-                            {link_list_str}
-
-                            [지시사항 - 융통성 있게 매칭하세요]
-                            1. 사용자의 주문 품목을 '등록된 정보'와 대조하여 매칭하세요.
-                            2. **[핵심] 완벽하게 똑같지 않아도 됩니다.** 의미가 통하면 매칭하세요.
-                                - 예: '연어' 거래처가 있으면, 사용자가 '연어3', '생연어'라고 써도 매칭 성공!
-                            3. **[절대 원칙] 사용자가 입력한 '수량(숫자)'은 절대 삭제하지 마세요.**
-                                - '연어3' -> target: '연어 3' (O)
-                                - '참이슬 3박스' -> target: '참이슬 3박스' (O)
-                            4. JSON Array 형태로만 출력하세요. (설명 금지)
-                            예시: [{{"type": "sms", "supplier": "00수산", "target": "연어 3마리", "phone": "..."}}, {{"type": "link", ...}}]
-                            """
-
-                            res = client.chat.completions.create(
-                                model="gpt-4o-mini",
-                                messages=[{"role": "user", "content": prompt}]
-                            )
-
-                            clean_json = res.choices[0].message.content.strip()
+                            # 등록된 거래처/링크 전부가 아니라 주문 줄마다 비슷한 후보만 (order_match.py)
+                            cand_sups, cand_links = order_match.select_candidates(order_text, suppliers, links)
+                            prompt = prompts.order_parse(order_text, cand_sups, cand_links)
+
+                            clean_json = llm.ask(prompt).strip()
                             if "```" in clean_json:
                                 clean_json = clean_json.replace("```json", "").replace("```", "").strip()
 
@@ -573,11 +544,10 @@ def render_order():
                                             </a>
                                         </div>
                                         """, unsafe_allow_html=True)
+                        except llm.LLMRateLimited:
+                            st.warning("⚠️ AI 사용 한도가 초과되었습니다. (잠시 후 다시 시도해주세요)")
                         except Exception as e:
-                            if "429" in str(e):
-                                st.warning("⚠️ AI 사용 한도가 초과되었습니다. (잠시 후 다시 시도해주세요)")
-                            else:
-                                st.error(f"오류: {e}")
+                            st.error(f"오류: {e}")
 
     # ==============================================================================
     # TAB 2: 거래처 관리
@@ -613,6 +583,15 @@ def render_order():
                         time.sleep(1) # Visual feedback
                         st.rerun()
 
+        with st.expander("➕ 엑셀/텍스트 일괄 등록", expanded=False):
+            with st.form("sup_bulk_form"):
+                raw_sup = st.text_area("내용 입력 (거래처명 [탭] 전화번호 [탭] 취급품목)", height=150)
+                up_sup = st.file_uploader("또는 엑셀/CSV 파일", type=["xlsx", "csv"], key="sup_bulk_file")
+                if st.form_submit_button("일괄 등록"):
+                    data = read_bulk_upload(up_sup) if up_sup else raw_sup
+                    if up_sup or raw_sup.strip():
+                        render_bulk_result(import_suppliers(st.session_state.store_id, data))
+
         st.markdown("---")
 
         suppliers = get_suppliers(st.session_state.store_id)
@@ -656,11 +635,7 @@ def render_order():
             else:
                 c_del1, c_del2 = st.columns(2)
                 if c_del1.button("진짜 삭제?", type="primary", use_container_width=True):
-                    conn = sqlite3.connect(DB_PATH)
-                    c = conn.cursor()
-                    c.execute("DELETE FROM online_items WHERE store_id=?", (st.session_state.store_id,))
-                    conn.commit()
-                    conn.close()
+                    delete_all_online_items(st.session_state.store_id)
                     st.session_state.confirm_delete_all = False
                     st.success("삭제 완료")
                     st.rerun()
@@ -670,52 +645,28 @@ def render_order():
 
         with col_top2:
             if st.button("🧹 중복 링크 정리", type="secondary", use_container_width=True):
-                conn = sqlite3.connect(DB_PATH)
-                conn.row_factory = sqlite3.Row
-                c = conn.cursor()
-                c.execute("SELECT * FROM online_items WHERE store_id=? ORDER BY id DESC", (st.session_state.store_id,))
-                items = [dict(r) for r in c.fetchall()]
-                seen = set()
-                dels = []
-                for it in items:
-                    u = (it['url'] or "").strip()
-                    k = u if u else it['alias']
-                    if k in seen: dels.append(it['id'])
-                    else: seen.add(k)
-                if dels:
-                    for did in dels: c.execute("DELETE FROM online_items WHERE id=?", (did,))
-                    conn.commit()
-                    st.success(f"{len(dels)}개 정리 완료")
+                removed = dedupe_online_items(st.session_state.store_id)
+                if removed:
+                    st.success(f"{removed}개 정리 완료")
                     time.sleep(1)
                     st.rerun()
                 else: st.toast("중복 없음")
-                conn.close()
 
         with st.expander("➕ 엑셀/텍스트 등록", expanded=False):
             with st.form("excel_upload_form"):
                 raw_text = st.text_area("내용 입력 (상품명 [탭] 쇼핑몰 [탭] 링크)", height=150)
+                up_file = st.file_uploader("또는 엑셀/CSV 파일", type=["xlsx", "csv"])
                 if st.form_submit_button("등록"):
-                    if raw_text.strip():
-                        lines = raw_text.strip().split('\n')
-                        cnt = 0
-                        for line in lines:
-                            parts = line.split('\t')
-                            if len(parts) >= 3:
-                                add_online_item(st.session_state.store_id, parts[0], parts[1], parts[2])
-                                cnt += 1
-                        st.success(f"{cnt}개 등록 완료!")
-                        st.rerun()
+                    data = read_bulk_upload(up_file) if up_file else raw_text
+                    if up_file or raw_text.strip():
+                        render_bulk_result(import_online_items(st.session_state.store_id, data))
 
         st.markdown("---")
 
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        try:
-            c.execute("SELECT * FROM online_items WHERE store_id = ? ORDER BY is_fixed DESC, id DESC", (st.session_state.store_id, ))
-            links_db = [dict(row) for row in c.fetchall()]
+        try: links_db = get_online_items(st.session_state.store_id, order="recent")
         except: links_db = []
-        conn.close()
+        try: price_stats = get_price_stats(st.session_state.store_id)
+        except: price_stats = {}
 
         if not links_db: st.info("등록된 링크가 없습니다.")
 
@@ -747,13 +698,21 @@ def render_order():
                 if _status == 'OK' and _last_p:
                     _fmt_price = f"{int(_last_p):,}"
                     _fmt_date = _last_t[:16].replace('T', ' ') if _last_t else ""
+                    _p30 = price_stats.get(l['id'], {}).get(30)
+                    _low_html = ""
+                    _badge = "최신"
+                    if _p30 and _p30["n"] > 1:
+                        _low_html = f'<div style="color:#999; font-size:11px;">30일 최저 {_p30["min"]:,}원 · 평균 {_p30["avg"]:,}원</div>'
+                        if int(_last_p) <= _p30["min"]:
+                            _badge = "30일 최저가"
                     st.markdown(f"""
                         <div style="background-color:#1a1a1a; border-left:4px solid #03C75A; padding:10px; margin:10px 0; display:flex; justify-content:space-between; align-items:center;">
                             <div>
                                 <div style="color:#03C75A; font-weight:bold; font-size:17px;">💰 {_fmt_price}원</div>
+                                {_low_html}
                                 <div style="color:#666; font-size:11px;">{_fmt_date} 확인</div>
                             </div>
-                            <div style="background:#03C75A; color:white; font-size:10px; padding:2px 6px; border-radius:4px;">최신</div>
+                            <div style="background:#03C75A; color:white; font-size:10px; padding:2px 6px; border-radius:4px;">{_badge}</div>
                         </div>
                     """, unsafe_allow_html=True)
                 elif _status == 'PENDING':
@@ -788,10 +747,8 @@ def render_order():
                         eu = st.text_input("URL", value=l['url'])
                         ef = st.checkbox("상단 고정", value=is_pinned)
                         if st.form_submit_button("저장"):
-                            conn = sqlite3.connect(DB_PATH)
-                            cur = conn.cursor()
-                            cur.execute("UPDATE online_items SET alias=?, mall_name=?, url=?, is_fixed=? WHERE id=?", (ea, em, eu, 1 if ef else 0, l['id']))
-                            conn.commit()
-                            conn.close()
-                            st.success("수정됨")
-                            st.rerun()
+                            if update_online_item(l['id'], ea, em, eu, 1 if ef else 0):
+                                st.success("수정됨")
+                                st.rerun()
+                            else:
+                                st.error("이미 같은 링크가 등록되어 있습니다.")